@@ -15,9 +15,23 @@ from .models import Profile
 from menus.models import Menu
 
 from budgets.models import MealPlan, BudgetSpend
+from caching.services import get_or_compute
+from searches.services import trending_keywords
 
 
 MEAL_LABELS = ["มื้อเช้า", "มื้อเที่ยง", "มื้อเย็น"]
+HOME_MENUS_LIMIT = 12
+HOME_MENUS_TTL = 600  # วินาที (เมนูเปลี่ยน -> เวอร์ชัน Menu เพิ่ม -> key ใหม่ทันที)
+
+
+def _home_menus(budget: int) -> list:
+    return get_or_compute(
+        "home:menus",
+        {"budget": budget},
+        lambda: list(Menu.objects.filter(price__lte=budget).order_by('-created_at')[:HOME_MENUS_LIMIT]),
+        depends_on=[Menu],
+        timeout=HOME_MENUS_TTL,
+    )
 
 
 def _meal_status_for_date(user, the_date, plan=None):
@@ -59,16 +73,14 @@ def home_view(request):
     except (TypeError, ValueError):
         budget = 50
 
-    menus = (
-        Menu.objects.filter(price__lte=budget)
-        .order_by('-created_at')[:12]
-    )
+    menus = _home_menus(budget)
 
     ctx = {
         'budget': budget,
         'menus': menus,
         'today_meal_status': None,
         'today_date': None,
+        'trending_searches': trending_keywords(),
     }
 
     if request.user.is_authenticated:
@@ -1,3 +1,105 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from menus.models import Menu
+from recipes.models import Recipe
+from .models import BudgetSpend, DailyBudget, MealPlan
+from .views import RECIPES_PER_MENU, _suggest_recipes
+
+# จำนวน query ที่แต่ละหน้าใช้ (ต้องเท่ากันทั้งข้อมูลน้อยและข้อมูลเยอะ)
+# ถ้าเลขเปลี่ยน = มี query ต่อแถว/ต่อวันเพิ่มเข้ามา -> แก้ view ไม่ใช่แก้เลข
+BUDGET_TABLE_QUERIES = 5        # session, user, แผนที่ใช้อยู่, งบรายวัน, รายการใช้จ่าย
+BUDGET_TABLE_NO_PLAN_QUERIES = 4
+DAY_DETAIL_QUERIES = 6          # session, user, แผน, งบของวัน, รายการใช้จ่าย, สูตรแนะนำ
+
+MEALS = ["มื้อเช้า", "มื้อเที่ยง", "มื้อเย็น"]
+
+
+class BudgetQueryCountTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(username="budget-user")
+        self.client.force_login(self.user)
+        self.today = timezone.localdate()
+
+    def seed_plan(self, days, spends_per_day):
+        plan = MealPlan.objects.create(user=self.user, start_date=self.today, days=days, budget_per_day=300)
+        menus = [Menu.objects.create(name=f"ข้าวผัดหมู {i}", price=50) for i in range(spends_per_day)]
+        for d in range(days):
+            date = self.today + timedelta(days=d)
+            DailyBudget.objects.create(user=self.user, date=date, amount=300, plan=plan)
+            for i, menu in enumerate(menus):
+                BudgetSpend.objects.create(
+                    user=self.user, date=date, amount=50, menu=menu, plan=plan, note=MEALS[i % len(MEALS)],
+                )
+        session = self.client.session
+        session["active_plan_id"] = plan.id
+        session.save()
+        return plan
+
+    def seed_recipes(self, n):
+        for i in range(n):
+            Recipe.objects.create(title=f"ข้าวผัด สูตร {i}", description="ผัดกับหมู", created_by=self.user)
+
+    def test_budget_table_small_plan(self):
+        self.seed_plan(days=1, spends_per_day=1)
+        with self.assertNumQueries(BUDGET_TABLE_QUERIES):
+            response = self.client.get(reverse("budgets:home"))
+        self.assertEqual(response.status_code, 200)
+
+    def test_budget_table_large_plan(self):
+        self.seed_plan(days=30, spends_per_day=6)
+        with self.assertNumQueries(BUDGET_TABLE_QUERIES):
+            response = self.client.get(reverse("budgets:home"))
+        self.assertEqual(len(response.context["rows"]), 30)
+        self.assertEqual(response.context["total_spent"], 30 * 6 * 50)
+
+    def test_budget_table_without_plan(self):
+        for d in range(7):
+            BudgetSpend.objects.create(user=self.user, date=self.today + timedelta(days=d), amount=40, note=MEALS[0])
+        with self.assertNumQueries(BUDGET_TABLE_NO_PLAN_QUERIES):
+            response = self.client.get(reverse("budgets:home"))
+        self.assertEqual(response.context["total_spent"], 7 * 40)
+
+    def test_day_detail_small(self):
+        self.seed_plan(days=1, spends_per_day=1)
+        self.seed_recipes(1)
+        with self.assertNumQueries(DAY_DETAIL_QUERIES):
+            response = self.client.get(reverse("budgets:day_detail", args=[self.today.isoformat()]))
+        self.assertEqual(len(response.context["suggested_recipes"]), 1)
+
+    def test_day_detail_large(self):
+        self.seed_plan(days=1, spends_per_day=12)
+        self.seed_recipes(20)
+        with self.assertNumQueries(DAY_DETAIL_QUERIES):
+            response = self.client.get(reverse("budgets:day_detail", args=[self.today.isoformat()]))
+        self.assertEqual(response.context["spent_sum"], 12 * 50)
+        self.assertLessEqual(len(response.context["suggested_recipes"]), 12)
+
+
+class SuggestRecipesTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(username="cook")
+
+    def test_common_token_does_not_starve_other_menus(self):
+        somtam = Recipe.objects.create(title="ส้มตำปู", description="ตำใส่ปูดอง", created_by=self.user)
+        Recipe.objects.filter(pk=somtam.pk).update(created_at=timezone.now() - timedelta(days=30))
+        # สูตรข้าวผัดใหม่ ๆ เยอะกว่าโควตา candidate เดิม (100 แถวรวม) -> ส้มตำเก่าเคยหลุด
+        Recipe.objects.bulk_create([
+            Recipe(title=f"ข้าวผัด สูตร {i}", description="ผัดกับหมู", created_by=self.user) for i in range(120)
+        ])
+
+        with self.assertNumQueries(1):
+            suggested = _suggest_recipes(["ข้าวผัดหมู", "ส้มตำไทย", "ข้าวผัดหมู"])
+        titles = [r.title for r in suggested]
+        self.assertEqual(len(titles), RECIPES_PER_MENU + 1)
+        self.assertEqual(titles[-1], "ส้มตำปู")
+        self.assertTrue(all(t.startswith("ข้าวผัด") for t in titles[:-1]))
 
-# Create your tests here.
+    def test_no_tokens(self):
+        self.assertEqual(_suggest_recipes(["", "  "]), [])
@@ -3,13 +3,15 @@ from __future__ import annotations
 from datetime import timedelta, date
 from typing import Optional
 
-from django.db.models import Sum, Q, Count
+from django.db.models import BooleanField, Count, ExpressionWrapper, F, Q, Sum, Window
+from django.db.models.functions import RowNumber
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.utils import timezone
 from django.views.decorators.http import require_POST
 
+from caching.services import get_or_compute, invalidate
 from .models import DailyBudget, BudgetSpend, MealPlan
 from .forms import DailyBudgetForm
 from menus.models import Menu
@@ -97,6 +99,7 @@ def filter_by_plan(qs, plan: dict | None):
 
 # ----------------- helpers -----------------
 MEAL_LABELS = ["มื้อเช้า", "มื้อเที่ยง", "มื้อเย็น"]
+WEEKLY_SUMMARY_TTL = 900  # วินาที (งบ/รายจ่าย/แผนของผู้ใช้เปลี่ยน -> key ใหม่ทันที)
 
 
 def _monday(d: date) -> date:
@@ -140,16 +143,8 @@ def _safe_get_or_create_daily(request, use_date: date, plan: Optional[MealPlan]
     ), True
 
 
-def _meal_status_for_date(request, the_date: date, plan: Optional[MealPlan]):
-    qs = BudgetSpend.objects.filter(
-        user=request.user,
-        date=the_date,
-        note__in=MEAL_LABELS,
-    )
-    if plan:
-        qs = qs.filter(plan=plan)
-
-    done_set = set(qs.values_list("note", flat=True))
+def _meal_status_from_notes(notes):
+    done_set = set(notes)
     done_labels = [x for x in MEAL_LABELS if x in done_set]
     missing_labels = [x for x in MEAL_LABELS if x not in done_set]
 
@@ -205,20 +200,28 @@ def budget_table(request):
         range_start = start_date
         range_end = start_date + timedelta(days=6)
 
+    # ดึงทั้งช่วงทีเดียว แล้วแบ่งรายวันใน Python (จำนวน query ไม่โตตามจำนวนวันของแผน)
+    budgets_qs = DailyBudget.objects.filter(user=request.user, date__range=[range_start, range_end])
+    spends_qs = BudgetSpend.objects.filter(user=request.user, date__range=[range_start, range_end])
+    if plan_mode:
+        budgets_qs = budgets_qs.filter(plan=plan)
+        spends_qs = spends_qs.filter(plan=plan)
+
+    budget_by_day = {
+        row["date"]: row["total"]
+        for row in budgets_qs.order_by().values("date").annotate(total=Sum("amount"))
+    }
+    spends_by_day = {}
+    for spend in spends_qs.select_related("menu"):
+        spends_by_day.setdefault(spend.date, []).append(spend)
+
     rows = []
     current = range_start
     total_budget = 0.0
     total_spent = 0.0
 
     while current <= range_end:
-        budgets_qs = DailyBudget.objects.filter(user=request.user, date=current)
-        spends_qs = BudgetSpend.objects.filter(user=request.user, date=current)
-
-        if plan_mode:
-            budgets_qs = budgets_qs.filter(plan=plan)
-            spends_qs = spends_qs.filter(plan=plan)
-
-        day_budget = budgets_qs.aggregate(total=Sum("amount"))["total"]
+        day_budget = budget_by_day.get(current)
 
         # fallback: plan_mode แต่ยังไม่สร้าง DailyBudget
         if plan_mode and day_budget is None:
@@ -226,15 +229,14 @@ def budget_table(request):
         if day_budget is None:
             day_budget = 0
 
-        day_spent = spends_qs.aggregate(total=Sum("amount"))["total"] or 0
+        spends_list = spends_by_day.get(current, [])
+        day_spent = sum(sp.amount for sp in spends_list)
         day_remain = float(day_budget) - float(day_spent)
 
         total_budget += float(day_budget)
         total_spent += float(day_spent)
 
-        spends_list = list(spends_qs.select_related("menu"))
-
-        meal_status = _meal_status_for_date(request, current, plan if plan_mode else None)
+        meal_status = _meal_status_from_notes(sp.note for sp in spends_list)
         badge_text, badge_class = _meal_badge(meal_status)
 
         rows.append({
@@ -279,33 +281,15 @@ def budget_table(request):
     return render(request, "budgets/budget_table.html", context)
 
 
-@login_required
-def weekly_summary(request):
-    """
-    สรุป 7 วัน/ช่วงแผน:
-    - อิง DailyBudget + BudgetSpend ตามช่วงวันเดียวกัน
-    - จำนวนมื้อ นับจาก BudgetSpend.note (มื้อเช้า/เที่ยง/เย็น) เท่านั้น
-    """
-    today = timezone.localdate()
-
-    plan = _get_active_plan(request)
+def _weekly_summary_data(user_id: int, plan: Optional[MealPlan], start_date: date, end_date: date, today: date) -> dict:
+    """ตัวเลขทั้งหมดของหน้าสรุป (แยกออกมาเพื่อ cache ทั้งก้อน)"""
     plan_mode = bool(plan)
-    start_param = request.GET.get("start")
-
-    if plan_mode:
-        start_date = plan.start_date
-        end_date = plan.start_date + timedelta(days=max(plan.days, 1) - 1)
-    else:
-        start_date = _parse_date_or_today(start_param)
-        start_date = _monday(start_date)
-        end_date = start_date + timedelta(days=6)
-
     budgets_qs = DailyBudget.objects.filter(
-        user=request.user,
+        user_id=user_id,
         date__range=[start_date, end_date],
     )
     spends_qs = BudgetSpend.objects.filter(
-        user=request.user,
+        user_id=user_id,
         date__range=[start_date, end_date],
     )
 
@@ -393,31 +377,64 @@ def weekly_summary(request):
 
     match_score = _calc_match_score(total_budget, total_spent)
 
-    prev_start = next_start = None
-    if not plan_mode:
-        prev_start = start_date - timedelta(days=7)
-        next_start = start_date + timedelta(days=7)
-
-    context = {
-        "plan_mode": plan_mode,
-        "plan": plan,
-        "start_date": start_date,
-        "end_date": end_date,
+    return {
         "rows": rows,
-
         "total_budget": round(total_budget, 2),
         "daily_average": daily_average,
         "total_spent": round(total_spent, 2),
         "remaining": round(remaining, 2),
         "over_amount": round(over_amount, 2),
         "under_amount": round(under_amount, 2),
-
         "total_meals": total_meals,
         "meals_by_type": meals_by_type,
         "expensive_menus": expensive_menus,
         "cheap_menus": cheap_menus,
         "match_score": match_score,
+    }
 
+
+@login_required
+def weekly_summary(request):
+    """
+    สรุป 7 วัน/ช่วงแผน:
+    - อิง DailyBudget + BudgetSpend ตามช่วงวันเดียวกัน
+    - จำนวนมื้อ นับจาก BudgetSpend.note (มื้อเช้า/เที่ยง/เย็น) เท่านั้น
+    """
+    today = timezone.localdate()
+
+    plan = _get_active_plan(request)
+    plan_mode = bool(plan)
+    start_param = request.GET.get("start")
+
+    if plan_mode:
+        start_date = plan.start_date
+        end_date = plan.start_date + timedelta(days=max(plan.days, 1) - 1)
+    else:
+        start_date = _parse_date_or_today(start_param)
+        start_date = _monday(start_date)
+        end_date = start_date + timedelta(days=6)
+
+    # สรุปคำนวณครั้งเดียวต่อ (ผู้ใช้, แผน, ช่วงวัน, วันนี้) จนกว่างบ/รายจ่าย/แผนของผู้ใช้คนนี้จะเปลี่ยน
+    uid = request.user.id
+    summary = get_or_compute(
+        "budgets:weekly_summary",
+        {"user": uid, "plan": plan.id if plan else None, "start": start_date, "end": end_date, "today": today},
+        lambda: _weekly_summary_data(uid, plan, start_date, end_date, today),
+        depends_on=[(DailyBudget, uid), (BudgetSpend, uid), (MealPlan, uid), Menu],
+        timeout=WEEKLY_SUMMARY_TTL,
+    )
+
+    prev_start = next_start = None
+    if not plan_mode:
+        prev_start = start_date - timedelta(days=7)
+        next_start = start_date + timedelta(days=7)
+
+    context = {
+        "plan_mode": plan_mode,
+        "plan": plan,
+        "start_date": start_date,
+        "end_date": end_date,
+        **summary,
         "prev_start": prev_start,
         "next_start": next_start,
     }
@@ -534,6 +551,50 @@ def _tokens_from_menu_name(name: str) -> list[str]:
     return tokens[:5]
 
 
+RECIPES_PER_MENU = 6
+RECIPE_SUGGESTION_LIMIT = 8
+
+
+def _suggest_recipes(menu_names: list[str]) -> list:
+    """
+    สูตรอาหารที่เกี่ยวกับเมนูที่กินวันนี้ (เมนูละไม่เกิน 6 รวมไม่เกิน ~8)
+    query เดียว: ROW_NUMBER() แยกตามเมนู แล้วเก็บเฉพาะสูตรล่าสุดไม่เกิน RECIPES_PER_MENU ตัวของแต่ละเมนู
+    -> คำที่เจอบ่อย (เช่น "ข้าว") ไม่แย่งโควตา candidate ของเมนูถัดไปเหมือนตอนดึงรวมกัน 100 แถว
+    (UNION ของ slice ต่อเมนูทำแบบเดียวกันได้บน postgres แต่ sqlite ไม่รับ LIMIT ใน compound)
+    """
+    token_lists = []
+    for name in dict.fromkeys(n.strip() for n in menu_names):
+        tokens = _tokens_from_menu_name(name)
+        if tokens:
+            token_lists.append([t.lower() for t in tokens])
+    if not token_lists:
+        return []
+
+    any_q, annotations, keep = Q(), {}, Q()
+    for i, tokens in enumerate(token_lists):
+        q = Q()
+        for t in tokens:
+            q |= Q(title__icontains=t) | Q(description__icontains=t)
+        any_q |= q
+        matches = ExpressionWrapper(q, output_field=BooleanField())
+        annotations[f"m{i}"] = matches
+        annotations[f"r{i}"] = Window(
+            RowNumber(), partition_by=[matches], order_by=[F("created_at").desc(), F("id").desc()],
+        )
+        keep |= Q(**{f"m{i}": True, f"r{i}__lte": RECIPES_PER_MENU})
+    rows = list(Recipe.objects.filter(any_q).annotate(**annotations).filter(keep).order_by("-created_at", "-id"))
+
+    suggested, seen = [], set()
+    for i in range(len(token_lists)):
+        for r in rows:
+            if getattr(r, f"m{i}") and getattr(r, f"r{i}") <= RECIPES_PER_MENU and r.id not in seen:
+                seen.add(r.id)
+                suggested.append(r)
+        if len(suggested) >= RECIPE_SUGGESTION_LIMIT:
+            break
+    return suggested
+
+
 @login_required
 def day_detail(request, date_str):
     the_date = _parse_date_or_today(date_str)
@@ -542,7 +603,7 @@ def day_detail(request, date_str):
     budget_obj_qs = DailyBudget.objects.filter(user=request.user, date=the_date)
     if active_plan:
         budget_obj_qs = budget_obj_qs.filter(plan=active_plan)
-    budget_obj = budget_obj_qs.order_by("id").first()
+    budget_obj = budget_obj_qs.select_related("plan").order_by("id").first()
 
     if budget_obj:
         budget_amount = float(budget_obj.amount or 0)
@@ -555,12 +616,12 @@ def day_detail(request, date_str):
             budget_amount = 0.0
             current_plan = None
 
-    spends_qs = BudgetSpend.objects.filter(user=request.user, date=the_date).select_related("menu").order_by("created_at")
+    spends_qs = BudgetSpend.objects.filter(user=request.user, date=the_date).select_related("menu").order_by("created_at", "id")
     if current_plan:
         spends_qs = spends_qs.filter(plan=current_plan)
 
     plan_spends = list(spends_qs)
-    spent_sum = float(spends_qs.aggregate(total=Sum("amount"))["total"] or 0)
+    spent_sum = float(sum(s.amount for s in plan_spends))
     remain = budget_amount - spent_sum
 
     grouped = {label: [] for label in MEAL_LABELS}
@@ -574,31 +635,7 @@ def day_detail(request, date_str):
 
     meal_groups = [{"label": label, "items": grouped[label]} for label in MEAL_LABELS]
 
-    suggested_recipes = []
-    seen_recipe_ids = set()
-
-    menu_names = []
-    for s in plan_spends:
-        if s.menu and s.menu.name:
-            menu_names.append(s.menu.name.strip())
-
-    for name in menu_names:
-        tokens = _tokens_from_menu_name(name)
-        if not tokens:
-            continue
-
-        q = Q()
-        for t in tokens:
-            q |= Q(title__icontains=t) | Q(description__icontains=t)
-
-        qs = Recipe.objects.filter(q).order_by("-created_at")[:6]
-        for r in qs:
-            if r.id not in seen_recipe_ids:
-                seen_recipe_ids.add(r.id)
-                suggested_recipes.append(r)
-
-        if len(suggested_recipes) >= 8:
-            break
+    suggested_recipes = _suggest_recipes([s.menu.name for s in plan_spends if s.menu and s.menu.name])
 
     context = {
         "date": the_date,
@@ -621,6 +658,7 @@ def delete_spend(request, pk):
     obj = get_object_or_404(BudgetSpend, pk=pk, user=request.user)
     d = obj.date
     obj.delete()
+    invalidate(BudgetSpend, request.user.id)  # BudgetSpend ไม่ได้ต่อ post_delete (ดู CACHE_VERSIONED_MODELS)
     messages.success(request, "ลบรายการเรียบร้อยแล้ว")
     if request.GET.get("from_plan") == "1":
         return redirect("/budget/?from_plan=1")
@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+
+
+class CachingConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'caching'
+
+    def ready(self):
+        from . import checks  # noqa: F401 (ลงทะเบียน system check)
+        from .signals import connect_versioned_models
+        connect_versioned_models()
@@ -0,0 +1,28 @@
+# caching/checks.py
+from django.conf import settings
+from django.core import checks
+
+LOCMEM_BACKEND = "django.core.cache.backends.locmem.LocMemCache"
+
+
+@checks.register(checks.Tags.caches, deploy=True)
+def check_shared_cache(app_configs=None, **kwargs):
+    """
+    locmem แยกต่อ process: bump() / ล็อก single-flight ของ worker หนึ่งไม่ถึง worker อื่น
+    -> worker อื่นเสิร์ฟของเก่าจนหมด TTL (facet index / eligible ids ถึง 6 ชม.)
+    อยู่ใน check --deploy (เทสต์/dev ใช้ locmem ได้ตามปกติ)
+    """
+    alias = getattr(settings, "APP_CACHE_ALIAS", "default")
+    backend = settings.CACHES.get(alias, {}).get("BACKEND")
+    if backend != LOCMEM_BACKEND:
+        return []
+    return [
+        checks.Warning(
+            f"APP_CACHE_ALIAS '{alias}' uses LocMemCache, which is per process.",
+            hint=(
+                "Cache invalidation and single-flight locks do not reach other workers. "
+                "Set CACHE_BACKEND=redis (or file) when running more than one worker."
+            ),
+            id="caching.W001",
+        )
+    ]
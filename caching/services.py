@@ -0,0 +1,171 @@
+# caching/services.py
+"""
+cache กลางของทั้งโปรเจกต์ (ใช้ได้กับ locmem / file / redis ผ่าน django.core.cache)
+
+- key มี namespace + "เวอร์ชัน" ของโมเดลที่ข้อมูลขึ้นอยู่ด้วย
+  แก้/ลบแถว -> signals.py เพิ่มเวอร์ชัน -> key เปลี่ยนเอง ไม่ต้องไล่ลบ (ของเก่าหมดอายุตาม TTL)
+- เวอร์ชันแยกตาม scope ได้ (เช่น user_id) -> ผู้ใช้คนหนึ่งแก้งบ ไม่ล้าง cache ของคนอื่น
+- single-flight: key หายพร้อมกันหลาย request -> คำนวณแค่ตัวเดียว ที่เหลือรอผล (กัน stampede)
+- นับ hit / miss ต่อ namespace (stats()) และต่อ request (ส่งเข้า perf.metrics -> Server-Timing / log)
+"""
+import hashlib
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from perf.metrics import current_metrics
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT = 300
+LOCK_TIMEOUT = 30      # วินาที: คนคำนวณค้าง/ตาย -> ล็อกหลุดเอง
+WAIT_TIMEOUT = 5.0     # วินาที: รอคนอื่นคำนวณนานสุดเท่านี้ แล้วคำนวณเอง
+WAIT_STEP = 0.02
+
+VERSION_PREFIX = "cachever"
+LOCK_PREFIX = "cachelock"
+
+_MISSING = object()
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def get_cache():
+    return caches[getattr(settings, "APP_CACHE_ALIAS", "default")]
+
+
+# ---------- เวอร์ชันของโมเดล ----------
+def model_label(model) -> str:
+    return model._meta.label_lower
+
+
+def version_key(model, scope=None) -> str:
+    key = f"{VERSION_PREFIX}:{model_label(model)}"
+    return key if scope is None else f"{key}:{scope}"
+
+
+def _dependency_keys(depends_on) -> list[str]:
+    """depends_on: [Menu, (BudgetSpend, user_id), ...]"""
+    keys = []
+    for dep in depends_on:
+        if isinstance(dep, tuple):
+            keys.append(version_key(*dep))
+        else:
+            keys.append(version_key(dep))
+    return keys
+
+
+def _versions(keys: list[str]) -> list[int]:
+    if not keys:
+        return []
+    cache = get_cache()
+    found = cache.get_many(keys)
+    missing = [k for k in keys if k not in found]
+    for key in missing:
+        # เริ่มจากเวลาปัจจุบัน (ไม่ใช่ 1) -> ถ้า key เวอร์ชันถูก evict ไปจะไม่ย้อนกลับไปชน cache เก่า
+        cache.add(key, time.time_ns(), timeout=None)
+    if missing:
+        found.update(cache.get_many(missing))
+    return [found.get(k, 0) for k in keys]
+
+
+def bump(model, scope=None):
+    """ทำให้ cache ที่ขึ้นกับโมเดลนี้ (ทั้งหมด + เฉพาะ scope ถ้าให้มา) เป็นของเก่า"""
+    cache = get_cache()
+    keys = [version_key(model)]
+    if scope is not None:
+        keys.append(version_key(model, scope))
+    for key in keys:
+        try:
+            cache.incr(key)
+        except ValueError:  # ยังไม่มี key -> เริ่มใหม่ (ค่าที่ใหม่กว่าทุกเวอร์ชันเดิม)
+            cache.set(key, time.time_ns(), timeout=None)
+
+
+def invalidate(model, scope=None):
+    """
+    bump() ทันที และถ้าอยู่ใน transaction bump อีกครั้งหลัง commit
+    (ระหว่างรอ commit request อื่นอาจคำนวณจากข้อมูลเก่าแล้ว cache ไว้ใต้เวอร์ชันใหม่)
+    """
+    bump(model, scope)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: bump(model, scope))
+
+
+def make_key(namespace: str, parts=(), depends_on=()) -> str:
+    """<namespace>:<เวอร์ชันของโมเดลที่เกี่ยวข้อง>:<hash ของ parts>"""
+    versions = ".".join(str(v) for v in _versions(_dependency_keys(depends_on)))
+    raw = json.dumps(parts, sort_keys=True, default=str, ensure_ascii=False)
+    digest = hashlib.sha1(raw.encode("utf-8")).hexdigest()[:20]
+    return f"{namespace}:{versions}:{digest}"
+
+
+# ---------- metrics ----------
+def _record(namespace: str, event: str):
+    with _stats_lock:
+        _stats[(namespace, event)] += 1
+    metrics = current_metrics()
+    if metrics is not None and event in ("hit", "miss"):
+        metrics.record_cache(event == "hit")
+
+
+def stats() -> dict:
+    """{namespace: {"hit": n, "miss": n, "wait": n, "wait_timeout": n}} ของ process นี้"""
+    with _stats_lock:
+        snapshot = dict(_stats)
+    result = {}
+    for (namespace, event), n in snapshot.items():
+        result.setdefault(namespace, Counter())[event] = n
+    return {ns: dict(c) for ns, c in sorted(result.items())}
+
+
+def reset_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+# ---------- อ่าน/คำนวณ ----------
+def get_or_compute(namespace: str, parts, compute, *, depends_on=(), timeout=DEFAULT_TIMEOUT):
+    """
+    คืนค่าจาก cache ถ้ามี ไม่งั้นเรียก compute() แล้วเก็บไว้ (ค่า None ก็ cache ได้)
+    คนที่ได้ล็อกเป็นคนคำนวณ คนอื่นรอดูผล (poll) ไม่เกิน WAIT_TIMEOUT แล้วค่อยคำนวณเอง
+    """
+    cache = get_cache()
+    key = make_key(namespace, parts, depends_on)
+    value = cache.get(key, _MISSING)
+    if value is not _MISSING:
+        _record(namespace, "hit")
+        return value
+    _record(namespace, "miss")
+
+    lock_key = f"{LOCK_PREFIX}:{key}"
+    token = uuid.uuid4().hex
+    if not cache.add(lock_key, token, timeout=LOCK_TIMEOUT):
+        _record(namespace, "wait")
+        deadline = time.monotonic() + WAIT_TIMEOUT
+        step = WAIT_STEP
+        while time.monotonic() < deadline:
+            time.sleep(step)
+            value = cache.get(key, _MISSING)
+            if value is not _MISSING:
+                return value
+            step = min(step * 2, 0.2)
+        _record(namespace, "wait_timeout")
+        logger.warning("cache %s: waited %.1fs for another worker, computing anyway", namespace, WAIT_TIMEOUT)
+        return compute()
+
+    try:
+        value = compute()
+        cache.set(key, value, timeout)
+        return value
+    finally:
+        # ลบเฉพาะล็อกของตัวเอง (ถ้าหมดอายุไปแล้วมีคนอื่นถือ ไม่ไปลบของเขา)
+        if cache.get(lock_key) == token:
+            cache.delete(lock_key)
@@ -0,0 +1,27 @@
+# caching/signals.py
+from django.apps import apps
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+
+from .services import invalidate
+
+# โมเดลที่มี cache ขึ้นอยู่ด้วย (ตั้งใน settings.CACHE_VERSIONED_MODELS)
+# แถวที่มี user_id -> เพิ่มเวอร์ชันของ user คนนั้นด้วย
+# หมายเหตุ: queryset.update()/bulk_create() (และ delete ของโมเดลที่ไม่ได้ต่อ "delete") ไม่ส่ง signal
+# -> จุดนั้นต้องเรียก invalidate() เอง
+
+
+def _changed(sender, instance, raw=False, **kwargs):
+    if raw:  # loaddata
+        return
+    invalidate(sender, getattr(instance, "user_id", None))
+
+
+SIGNALS = {"save": post_save, "delete": post_delete}
+
+
+def connect_versioned_models():
+    for label, events in getattr(settings, "CACHE_VERSIONED_MODELS", {}).items():
+        model = apps.get_model(label)
+        for event in events:
+            SIGNALS[event].connect(_changed, sender=model, dispatch_uid=f"caching.version:{label}:{event}")
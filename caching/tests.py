@@ -0,0 +1,97 @@
+import threading
+from unittest import mock
+
+from django.db import transaction
+from django.test import TestCase
+
+from menus.models import Menu
+from restaurants.models import Restaurant
+from . import services
+from .services import LOCK_PREFIX, bump, get_cache, get_or_compute, invalidate, make_key, reset_stats, stats
+
+
+class Counter:
+    """compute() ที่นับจำนวนครั้งที่ถูกเรียก"""
+
+    def __init__(self, value="ค่า"):
+        self.value = value
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.value
+
+
+class GetOrComputeTests(TestCase):
+
+    def setUp(self):
+        get_cache().clear()  # locmem อยู่ข้ามเทสต์
+        reset_stats()
+
+    def test_miss_then_hit(self):
+        compute = Counter()
+        for _ in range(3):
+            self.assertEqual(get_or_compute("t:basic", {"a": 1}, compute), "ค่า")
+        self.assertEqual(compute.calls, 1)
+        self.assertEqual(stats()["t:basic"], {"miss": 1, "hit": 2})
+
+    def test_none_is_cached(self):
+        compute = Counter(None)
+        get_or_compute("t:none", {}, compute)
+        self.assertIsNone(get_or_compute("t:none", {}, compute))
+        self.assertEqual(compute.calls, 1)
+
+    def test_save_signal_changes_key(self):
+        compute = Counter()
+        get_or_compute("t:menus", {}, compute, depends_on=[Menu])
+        Menu.objects.create(name="ข้าวผัด", price=50)
+        get_or_compute("t:menus", {}, compute, depends_on=[Menu])
+        self.assertEqual(compute.calls, 2)
+
+    def test_scoped_bump(self):
+        mine, other, everyone = Counter(), Counter(), Counter()
+        for _ in range(2):
+            get_or_compute("t:scoped", {"user": 1}, mine, depends_on=[(Restaurant, 1)])
+            get_or_compute("t:scoped", {"user": 2}, other, depends_on=[(Restaurant, 2)])
+            get_or_compute("t:all", {}, everyone, depends_on=[Restaurant])
+            bump(Restaurant, 1)
+        # bump ของ user 1 ล้างของ user 1 และ cache ที่ขึ้นกับทั้งโมเดล แต่ไม่แตะของ user 2
+        self.assertEqual((mine.calls, other.calls, everyone.calls), (2, 1, 2))
+
+    def test_invalidate_bumps_again_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                invalidate(Menu)
+                # request อื่นคำนวณระหว่างรอ commit -> ได้ key ของเวอร์ชันใหม่ไปแล้ว
+                during = make_key("t:commit", {}, [Menu])
+        self.assertNotEqual(make_key("t:commit", {}, [Menu]), during)
+
+    def test_waits_for_lock_holder(self):
+        compute = Counter("ของฉัน")
+        key = make_key("t:flight", {}, [])
+        get_cache().add(f"{LOCK_PREFIX}:{key}", "worker-อื่น")
+        # อีก worker คำนวณเสร็จระหว่างที่เรารอ
+        timer = threading.Timer(0.05, lambda: get_cache().set(key, "ของเขา"))
+        timer.start()
+        self.addCleanup(timer.cancel)
+        self.assertEqual(get_or_compute("t:flight", {}, compute), "ของเขา")
+        self.assertEqual(compute.calls, 0)
+        self.assertEqual(stats()["t:flight"], {"miss": 1, "wait": 1})
+
+    def test_computes_anyway_after_wait_timeout(self):
+        compute = Counter()
+        key = make_key("t:stuck", {}, [])
+        get_cache().add(f"{LOCK_PREFIX}:{key}", "worker-ที่ค้าง")
+        with mock.patch.object(services, "WAIT_TIMEOUT", 0.05), self.assertLogs("caching.services", "WARNING"):
+            self.assertEqual(get_or_compute("t:stuck", {}, compute), "ค่า")
+        self.assertEqual(compute.calls, 1)
+        self.assertEqual(stats()["t:stuck"]["wait_timeout"], 1)
+
+    def test_releases_lock_on_error(self):
+        def broken():
+            raise RuntimeError("พัง")
+
+        with self.assertRaises(RuntimeError):
+            get_or_compute("t:error", {}, broken)
+        self.assertEqual(get_or_compute("t:error", {}, Counter()), "ค่า")  # ไม่ต้องรอล็อกที่ค้าง
+        self.assertNotIn("wait", stats()["t:error"])
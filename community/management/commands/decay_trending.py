@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from community.services import decay_trending, rebuild_trending
+
+
+class Command(BaseCommand):
+    help = "Re-decay community trending scores to now (run periodically, e.g. hourly); --rebuild recomputes from events"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rebuild", action="store_true", help="Recompute every score from like/comment/review timestamps")
+
+    def handle(self, *args, **options):
+        if options["rebuild"]:
+            stats = rebuild_trending()
+            label = "scored"
+        else:
+            stats = decay_trending()
+            label = "decayed"
+        for name, n in stats.items():
+            self.stdout.write(f"{name}: {n} row(s) {label}")
+        self.stdout.write(self.style.SUCCESS("Trending scores updated"))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from community.services import rebuild_topic_stats, reconcile_counters
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute denormalized community counters (topic reviews, review likes/comments) "
+        "and per-topic rating/price stats from the source tables"
+    )
+
+    def handle(self, *args, **options):
+        fixed = reconcile_counters()
+        for name, n in fixed.items():
+            self.stdout.write(f"{name}: {n} row(s) corrected")
+        self.stdout.write(f"topic stats: {rebuild_topic_stats()} topic(s) rebuilt")
+        self.stdout.write(self.style.SUCCESS("Community counters reconciled"))
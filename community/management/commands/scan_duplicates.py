@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from community.models import Review, Topic
+from community.services import scan_duplicates
+from community.utils import SIMHASH_MAX_DISTANCE
+
+
+class Command(BaseCommand):
+    help = "Fingerprint existing topics/reviews with SimHash and flag near-duplicates via band buckets"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--distance", type=int, default=SIMHASH_MAX_DISTANCE,
+                            help="Max Hamming distance (band lookup only guarantees recall up to 3)")
+        parser.add_argument("--dry-run", action="store_true")
+
+    def handle(self, *args, **options):
+        for model in (Topic, Review):
+            stats = scan_duplicates(model, max_distance=options["distance"], dry_run=options["dry_run"])
+            self.stdout.write(
+                f"{model._meta.verbose_name_plural}: hashed {stats['hashed']}, flagged {stats['flagged']} near-duplicate(s)"
+            )
+        if options["dry_run"]:
+            self.stdout.write(self.style.WARNING("Dry run: nothing written"))
+        else:
+            self.stdout.write(self.style.SUCCESS("Duplicate scan complete"))
@@ -0,0 +1,57 @@
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def _count_of(model, fk):
+    sq = (
+        model.objects.filter(**{fk: OuterRef("pk")})
+        .order_by()
+        .values(fk)
+        .annotate(c=Count("id"))
+        .values("c")
+    )
+    return Coalesce(Subquery(sq), 0)
+
+
+def backfill_counters(apps, schema_editor):
+    Topic = apps.get_model("community", "Topic")
+    Review = apps.get_model("community", "Review")
+    Comment = apps.get_model("community", "Comment")
+    Like = apps.get_model("community", "Like")
+
+    Topic.objects.update(reviews_count=_count_of(Review, "topic"))
+    Review.objects.update(
+        likes_count=_count_of(Like, "review"),
+        comments_count=_count_of(Comment, "review"),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('community', '0004_review_comment_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='topic',
+            name='reviews_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='review',
+            name='likes_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='review',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='topic',
+            index=models.Index(fields=['-reviews_count', '-created_at'], name='community_topic_popular'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('community', '0005_engagement_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='topic',
+            name='hot_score',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='topic',
+            name='hot_ts',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='review',
+            name='hot_score',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='review',
+            name='hot_ts',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='topic',
+            index=models.Index(fields=['-hot_score'], name='community_topic_hot'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['-hot_score'], name='community_review_hot'),
+        ),
+    ]
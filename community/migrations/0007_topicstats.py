@@ -0,0 +1,55 @@
+# Generated by Django 5.2.8 on 2026-10-19 03:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_topic_stats(apps, schema_editor):
+    Topic = apps.get_model("community", "Topic")
+    Review = apps.get_model("community", "Review")
+    TopicStats = apps.get_model("community", "TopicStats")
+
+    acc = {tid: TopicStats(topic_id=tid) for tid in Topic.objects.values_list("pk", flat=True)}
+    rows = Review.objects.exclude(status="rejected").values_list("topic_id", "rating", "price").iterator()
+    for tid, rating, price in rows:
+        st = acc[tid]
+        st.n += 1
+        st.rating_sum += rating
+        star = f"rating_{min(max(rating, 1), 5)}"
+        setattr(st, star, getattr(st, star) + 1)
+        delta = price - st.price_mean
+        st.price_mean += delta / st.n
+        st.price_m2 += delta * (price - st.price_mean)
+        st.price_min = price if st.price_min is None else min(st.price_min, price)
+        st.price_max = price if st.price_max is None else max(st.price_max, price)
+
+    TopicStats.objects.bulk_create(acc.values(), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('community', '0006_trending_scores'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TopicStats',
+            fields=[
+                ('topic', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='community.topic')),
+                ('n', models.PositiveIntegerField(default=0)),
+                ('rating_sum', models.PositiveIntegerField(default=0)),
+                ('rating_1', models.PositiveIntegerField(default=0)),
+                ('rating_2', models.PositiveIntegerField(default=0)),
+                ('rating_3', models.PositiveIntegerField(default=0)),
+                ('rating_4', models.PositiveIntegerField(default=0)),
+                ('rating_5', models.PositiveIntegerField(default=0)),
+                ('price_min', models.PositiveIntegerField(blank=True, null=True)),
+                ('price_max', models.PositiveIntegerField(blank=True, null=True)),
+                ('price_mean', models.FloatField(default=0)),
+                ('price_m2', models.FloatField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(backfill_topic_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+import time
+
+from django.db import migrations, models
+
+
+def backfill_hot_ts(apps, schema_editor):
+    # แถวที่ยังไม่เคยถูก bump มี hot_ts = 0 -> เลื่อนมาเป็นตอนนี้ (คะแนน 0 อยู่แล้ว ค่าไม่เปลี่ยน)
+    now_ts = time.time()
+    for name in ("Topic", "Review"):
+        apps.get_model("community", name).objects.filter(hot_ts=0).update(hot_ts=now_ts)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('community', '0008_simhash_fingerprints'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='topic',
+            name='hot_ts',
+            field=models.FloatField(default=time.time),
+        ),
+        migrations.AlterField(
+            model_name='review',
+            name='hot_ts',
+            field=models.FloatField(default=time.time),
+        ),
+        migrations.RunPython(backfill_hot_ts, migrations.RunPython.noop),
+    ]
@@ -1,17 +1,66 @@
+import os
+import time
+from uuid import uuid4
+
 from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
 
+from .utils import simhash, simhash_bands, to_signed64
+
 
 def topic_image_path(instance, filename):
-    return f"community/topics/{instance.id}/{filename}"
+    # ตอนอัปโหลดครั้งแรก instance.id ยังเป็น None -> ใช้ uuid แทน (เหมือน menus/recipes)
+    ext = os.path.splitext(filename)[1].lower()
+    return os.path.join("community", "topics", f"{uuid4()}{ext}")
 
 
 def review_image_path(instance, filename):
-    return f"community/reviews/{instance.id}/{filename}"
+    ext = os.path.splitext(filename)[1].lower()
+    return os.path.join("community", "reviews", f"{uuid4()}{ext}")
+
+
+class SimHashModel(models.Model):
+    """
+    ลายนิ้วมือ SimHash ของข้อความ (คำนวณใหม่ทุกครั้งที่ save)
+    - simhash: ค่าเต็ม 64 บิต (signed)
+    - sim_b0..sim_b3: band ละ 16 บิต มี index ไว้หา candidate ที่ใกล้เคียง
+    - duplicate_of: ถ้าตอนส่งเจอว่าเกือบซ้ำกับของเดิม จะชี้ไปที่แถวนั้น (ให้ staff ตรวจ)
+    subclass กำหนด SIMHASH_FIELDS = ชื่อฟิลด์ข้อความที่ใช้คิด
+    """
+    SIMHASH_FIELDS = ()
+
+    simhash = models.BigIntegerField(null=True, blank=True, editable=False)
+    sim_b0 = models.IntegerField(null=True, blank=True, editable=False, db_index=True)
+    sim_b1 = models.IntegerField(null=True, blank=True, editable=False, db_index=True)
+    sim_b2 = models.IntegerField(null=True, blank=True, editable=False, db_index=True)
+    sim_b3 = models.IntegerField(null=True, blank=True, editable=False, db_index=True)
+    duplicate_of = models.ForeignKey(
+        "self", null=True, blank=True, editable=False, on_delete=models.SET_NULL, related_name="+",
+    )
+
+    class Meta:
+        abstract = True
+
+    def simhash_text(self) -> str:
+        return "\n".join(str(getattr(self, f) or "") for f in self.SIMHASH_FIELDS)
+
+    def compute_simhash(self):
+        value = simhash(self.simhash_text())
+        self.simhash = to_signed64(value)
+        self.sim_b0, self.sim_b1, self.sim_b2, self.sim_b3 = simhash_bands(value)
 
+    def save(self, *args, **kwargs):
+        self.compute_simhash()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            kwargs["update_fields"] = {*update_fields, "simhash", "sim_b0", "sim_b1", "sim_b2", "sim_b3"}
+        super().save(*args, **kwargs)
+
+
+class Topic(SimHashModel):
+    SIMHASH_FIELDS = ("title", "description")
 
-class Topic(models.Model):
     STATUS_CHOICES = [
         ("pending", "Pending"),
         ("approved", "Approved"),
@@ -32,14 +81,27 @@ class Topic(models.Model):
         default="pending",
     )
 
+    # ตัวนับเก็บไว้ในแถว (อัปเดตด้วย F() ใน views, แก้ drift ด้วย reconcile_community_counters)
+    reviews_count = models.PositiveIntegerField(default=0)
+
+    # คะแนนมาแรง (decay ตามเวลา) ดู community/services.py
+    hot_score = models.FloatField(default=0)
+    hot_ts = models.FloatField(default=time.time)
+
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["-reviews_count", "-created_at"], name="community_topic_popular"),
+            models.Index(fields=["-hot_score"], name="community_topic_hot"),
+        ]
 
     def __str__(self):
         return self.title
 
 
-class Review(models.Model):
+class Review(SimHashModel):
+    SIMHASH_FIELDS = ("title", "body")
+
     STATUS_CHOICES = [
         ("pending", "Pending"),
         ("approved", "Approved"),
@@ -62,14 +124,75 @@ class Review(models.Model):
         default="pending",
     )
 
+    likes_count = models.PositiveIntegerField(default=0)
+    comments_count = models.PositiveIntegerField(default=0)
+
+    hot_score = models.FloatField(default=0)
+    hot_ts = models.FloatField(default=time.time)
+
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            # keyset pagination ของรีวิวในหน้า topic_detail
+            models.Index(fields=["topic", "-created_at", "-id"], name="community_review_topic_keyset"),
+            models.Index(fields=["-hot_score"], name="community_review_hot"),
+        ]
 
     def __str__(self):
         return self.title
 
 
 
+class TopicStats(models.Model):
+    """
+    สถิติรีวิวของหัวข้อแบบสะสม (อัปเดตทีละรีวิวใน community/services.py)
+    - นับเฉพาะรีวิวที่ไม่ถูก reject
+    - ราคา: mean / M2 แบบ Welford -> variance = M2 / (n - 1)
+    """
+    topic = models.OneToOneField(Topic, primary_key=True, related_name="stats", on_delete=models.CASCADE)
+
+    n = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_1 = models.PositiveIntegerField(default=0)
+    rating_2 = models.PositiveIntegerField(default=0)
+    rating_3 = models.PositiveIntegerField(default=0)
+    rating_4 = models.PositiveIntegerField(default=0)
+    rating_5 = models.PositiveIntegerField(default=0)
+
+    price_min = models.PositiveIntegerField(null=True, blank=True)
+    price_max = models.PositiveIntegerField(null=True, blank=True)
+    price_mean = models.FloatField(default=0)
+    price_m2 = models.FloatField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Stats of {self.topic_id}"
+
+    @property
+    def rating_avg(self):
+        return self.rating_sum / self.n if self.n else 0
+
+    @property
+    def rating_rounded(self):
+        return round(self.rating_avg)
+
+    @property
+    def price_std(self):
+        if self.n < 2:
+            return 0
+        return (max(self.price_m2, 0) / (self.n - 1)) ** 0.5
+
+    @property
+    def rating_histogram(self):
+        """[(ดาว, จำนวน, เปอร์เซ็นต์)] จาก 5 ลง 1 สำหรับวาดแท่ง"""
+        rows = []
+        for star in range(5, 0, -1):
+            c = getattr(self, f"rating_{star}")
+            rows.append((star, c, round(c * 100 / self.n) if self.n else 0))
+        return rows
+
+
 class Comment(models.Model):
     review = models.ForeignKey(
         Review,
@@ -86,6 +209,10 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ["created_at"]
+        indexes = [
+            # keyset pagination ของคอมเมนต์ (โหลดทีละหน้าผ่าน JSON)
+            models.Index(fields=["review", "created_at", "id"], name="community_comment_keyset"),
+        ]
 
     def __str__(self):
         return f"Comment by {self.user} on {self.review}"
@@ -0,0 +1,461 @@
+# community/services.py
+import math
+import time
+
+from django.db import connection, transaction
+from django.db.models import Avg, Case, Count, F, FloatField, Max, Min, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, Exp, Greatest
+from django.utils import timezone
+
+from .models import Topic, TopicStats, Review, Comment, Like
+from .utils import SIMHASH_BANDS, SIMHASH_MAX_DISTANCE, hamming, simhash_bands, to_unsigned64
+
+
+# ================== ตัวนับ (denormalized counters) ==================
+def bump_counter(model, pk, field: str, delta: int = 1):
+    """
+    บวก/ลบตัวนับแบบ atomic ใน UPDATE เดียว (ไม่ต้องอ่านแถวขึ้นมาก่อน)
+    - ลดค่าจะไม่ต่ำกว่า 0 (กัน PositiveIntegerField ติดลบเวลามี drift)
+    """
+    qs = model.objects.filter(pk=pk)
+    if delta < 0:
+        qs = qs.filter(**{f"{field}__gte": -delta})
+    return qs.update(**{field: F(field) + delta})
+
+
+def set_like(review_id: int, user_id: int, liked: bool):
+    """
+    ตั้งสถานะไลก์ให้ตรงกับ `liked` (ไม่ใช่ toggle) -> กดซ้ำ/ดับเบิลคลิกได้ผลเหมือนเดิม
+    - liked=True  : INSERT ... ON CONFLICT DO NOTHING (เพิ่มตัวนับเฉพาะเมื่อ insert จริง)
+    - liked=False : DELETE แถวเดียว (ลดตัวนับเฉพาะเมื่อลบจริง)
+    คืน (changed, likes_count) หรือ None ถ้าไม่มีรีวิวนี้
+    """
+    with transaction.atomic():
+        if liked:
+            like_table = Like._meta.db_table
+            review_table = Review._meta.db_table
+            with connection.cursor() as cur:
+                cur.execute(
+                    f"INSERT INTO {like_table} (review_id, user_id, created_at) "
+                    f"SELECT %s, %s, %s WHERE EXISTS (SELECT 1 FROM {review_table} WHERE id = %s) "
+                    f"ON CONFLICT (review_id, user_id) DO NOTHING",
+                    [review_id, user_id, timezone.now(), review_id],
+                )
+                changed = cur.rowcount > 0
+            if changed:
+                bump_counter(Review, review_id, "likes_count", +1)
+                bump_review_hot(review_id, HOT_WEIGHT_LIKE)
+        else:
+            deleted, _ = Like.objects.filter(review_id=review_id, user_id=user_id).delete()
+            changed = deleted > 0
+            if changed:
+                bump_counter(Review, review_id, "likes_count", -1)
+                bump_review_hot(review_id, -HOT_WEIGHT_LIKE)
+
+        count = Review.objects.filter(pk=review_id).values_list("likes_count", flat=True).first()
+
+    if count is None:
+        return None
+    return changed, count
+
+
+def _count_of(model, fk: str):
+    sq = (
+        model.objects.filter(**{fk: OuterRef("pk")})
+        .order_by()
+        .values(fk)
+        .annotate(c=Count("id"))
+        .values("c")
+    )
+    return Coalesce(Subquery(sq), 0)
+
+
+def reconcile_counters() -> dict:
+    """
+    คำนวณตัวนับทั้งหมดใหม่จากตารางจริง (UPDATE ... SET x = (SELECT COUNT ...) ทีละตาราง)
+    คืนจำนวนแถวที่ค่าเปลี่ยน
+    """
+    fixed = {}
+
+    topics = Topic.objects.annotate(real=_count_of(Review, "topic")).exclude(reviews_count=F("real"))
+    fixed["topic.reviews_count"] = Topic.objects.filter(pk__in=topics.values("pk")).update(
+        reviews_count=_count_of(Review, "topic"),
+    )
+
+    reviews = Review.objects.annotate(
+        real_likes=_count_of(Like, "review"),
+        real_comments=_count_of(Comment, "review"),
+    ).exclude(likes_count=F("real_likes"), comments_count=F("real_comments"))
+    fixed["review.likes_count/comments_count"] = Review.objects.filter(pk__in=reviews.values("pk")).update(
+        likes_count=_count_of(Like, "review"),
+        comments_count=_count_of(Comment, "review"),
+    )
+
+    return fixed
+
+
+# ================== คะแนนมาแรง (trending / hot) ==================
+# คะแนน = ผลรวมน้ำหนักของ event (ไลก์/คอมเมนต์/รีวิว) ที่ลดลงแบบ exponential ตามเวลา
+# เก็บเป็น (hot_score, hot_ts) ต่อแถว: hot_score คือค่า ณ เวลา hot_ts (unix seconds)
+# - event ใหม่: score = score * e^(-λ·Δt) + w  แล้วเลื่อน hot_ts มาเป็นตอนนี้ (UPDATE เดียว)
+# - decay_trending (batch): เลื่อนทุกแถวมาเวลาเดียวกัน -> ORDER BY hot_score เทียบกันได้ตรง ๆ
+HOT_HALF_LIFE_HOURS = 24
+HOT_DECAY_RATE = math.log(2) / (HOT_HALF_LIFE_HOURS * 3600)
+HOT_FLOOR = 0.01  # ต่ำกว่านี้ปัดเป็น 0 ตอน batch
+# เลขชี้กำลังต่ำสุด: postgres โยน "value out of range: underflow" ถ้า exp()/การคูณได้ผลเล็กจนเป็น 0
+# e^-50 ≈ 2e-22 (ประมาณ 72 วันที่ไม่มี event) ค่าที่เหลือต่ำกว่า HOT_FLOOR อยู่แล้ว
+HOT_MIN_EXPONENT = -50.0
+
+HOT_WEIGHT_LIKE = 1.0
+HOT_WEIGHT_COMMENT = 2.0
+HOT_WEIGHT_REVIEW = 3.0
+
+
+def _decayed(now_ts: float):
+    """
+    นิพจน์ SQL: hot_score ที่ลดค่ามาถึงเวลา now_ts แล้ว
+    แถวที่คะแนนเป็น 0 ไม่ต้องคำนวณ exp (แถวเก่า hot_ts ห่างจากตอนนี้มาก -> underflow บน postgres)
+    """
+    exponent = Greatest((F("hot_ts") - Value(now_ts)) * Value(HOT_DECAY_RATE), Value(HOT_MIN_EXPONENT))
+    return Case(
+        When(hot_score=0, then=Value(0.0)),
+        default=F("hot_score") * Exp(exponent),
+        output_field=FloatField(),
+    )
+
+
+def bump_hot(qs, weight: float, now_ts: float | None = None):
+    """เพิ่ม (หรือลดเมื่อ weight < 0) คะแนนมาแรงของแถวใน qs แบบ atomic"""
+    now_ts = time.time() if now_ts is None else now_ts
+    return qs.update(
+        hot_score=Greatest(_decayed(now_ts) + Value(weight), Value(0.0)),
+        hot_ts=now_ts,
+    )
+
+
+def bump_review_hot(review_id: int, weight: float):
+    """event บนรีวิว -> ดันทั้งรีวิวและหัวข้อของรีวิวนั้น"""
+    now_ts = time.time()
+    bump_hot(Review.objects.filter(pk=review_id), weight, now_ts)
+    bump_hot(
+        Topic.objects.filter(pk=Subquery(Review.objects.filter(pk=review_id).values("topic_id")[:1])),
+        weight,
+        now_ts,
+    )
+
+
+def bump_topic_hot(topic_id: int, weight: float):
+    return bump_hot(Topic.objects.filter(pk=topic_id), weight)
+
+
+def decay_trending() -> dict:
+    """
+    batch: ลดค่าคะแนนทุกแถวมาที่เวลาปัจจุบัน (UPDATE เดียวต่อตาราง)
+    แถวที่ต่ำกว่า HOT_FLOOR จะถูกปัดเป็น 0 และไม่ต้องคำนวณซ้ำรอบถัดไป
+    """
+    now_ts = time.time()
+    stats = {}
+    for model in (Topic, Review):
+        live = model.objects.filter(hot_score__gt=0)
+        stats[model._meta.model_name] = live.update(hot_score=_decayed(now_ts), hot_ts=now_ts)
+        model.objects.filter(hot_score__gt=0, hot_score__lt=HOT_FLOOR).update(hot_score=0)
+    return stats
+
+
+def rebuild_trending(batch_size: int = 500) -> dict:
+    """
+    คำนวณคะแนนใหม่ทั้งหมดจาก timestamp ของ event จริง (ใช้ครั้งแรก/แก้ข้อมูลเพี้ยน)
+    อ่าน event แบบ iterator แล้ว bulk_update ทีละ batch
+    """
+    now = timezone.now()
+    now_ts = now.timestamp()
+
+    def w(weight, at):
+        return weight * math.exp(-(now - at).total_seconds() * HOT_DECAY_RATE)
+
+    review_scores: dict[int, float] = {}
+    topic_scores: dict[int, float] = {}
+
+    for rid, tid, at in Review.objects.values_list("id", "topic_id", "created_at").iterator():
+        topic_scores[tid] = topic_scores.get(tid, 0.0) + w(HOT_WEIGHT_REVIEW, at)
+
+    review_topic = dict(Review.objects.values_list("id", "topic_id").iterator())
+    for model, weight in ((Like, HOT_WEIGHT_LIKE), (Comment, HOT_WEIGHT_COMMENT)):
+        for rid, at in model.objects.values_list("review_id", "created_at").iterator():
+            v = w(weight, at)
+            review_scores[rid] = review_scores.get(rid, 0.0) + v
+            tid = review_topic.get(rid)
+            if tid is not None:
+                topic_scores[tid] = topic_scores.get(tid, 0.0) + v
+
+    stats = {}
+    for model, scores in ((Topic, topic_scores), (Review, review_scores)):
+        model.objects.update(hot_score=0, hot_ts=now_ts)
+        rows = [
+            model(pk=pk, hot_score=v, hot_ts=now_ts)
+            for pk, v in scores.items() if v >= HOT_FLOOR
+        ]
+        model.objects.bulk_update(rows, ["hot_score", "hot_ts"], batch_size=batch_size)
+        stats[model._meta.model_name] = len(rows)
+    return stats
+
+
+# ================== สถิติรีวิวต่อหัวข้อ (rating / price) ==================
+def _counted(status: str) -> bool:
+    """รีวิวที่ถูก reject ไม่นับในสถิติ (ตรงกับที่ผู้ใช้ทั่วไปเห็นใน topic_detail)"""
+    return status != "rejected"
+
+
+def _star(rating: int) -> int:
+    return min(max(int(rating or 0), 1), 5)
+
+
+def _star_q(star: int):
+    """เงื่อนไขเดียวกับ _star (ค่านอกช่วง 1-5 ถูกปัดเข้าขอบ)"""
+    if star == 1:
+        return Q(rating__lte=1)
+    if star == 5:
+        return Q(rating__gte=5)
+    return Q(rating=star)
+
+
+def review_snapshot(review):
+    """ค่าที่ใช้คิดสถิติของรีวิว -> ส่งให้ apply_review_change ทั้งก่อนและหลังแก้ไข"""
+    return (review.topic_id, review.rating, review.price, review.status)
+
+
+def _stats_add(st: TopicStats, rating: int, price: int):
+    st.n += 1
+    st.rating_sum += rating
+    star = f"rating_{_star(rating)}"
+    setattr(st, star, getattr(st, star) + 1)
+
+    delta = price - st.price_mean
+    st.price_mean += delta / st.n
+    st.price_m2 += delta * (price - st.price_mean)
+    st.price_min = price if st.price_min is None else min(st.price_min, price)
+    st.price_max = price if st.price_max is None else max(st.price_max, price)
+
+
+def _stats_remove(st: TopicStats, rating: int, price: int):
+    if st.n <= 1:
+        for field in ("n", "rating_sum", "rating_1", "rating_2", "rating_3", "rating_4", "rating_5"):
+            setattr(st, field, 0)
+        st.price_min = st.price_max = None
+        st.price_mean = st.price_m2 = 0
+        return
+
+    st.rating_sum = max(st.rating_sum - rating, 0)
+    star = f"rating_{_star(rating)}"
+    setattr(st, star, max(getattr(st, star) - 1, 0))
+
+    # Welford ย้อนกลับ
+    mean_old = st.price_mean
+    st.n -= 1
+    st.price_mean = (mean_old * (st.n + 1) - price) / st.n
+    st.price_m2 = max(st.price_m2 - (price - mean_old) * (price - st.price_mean), 0)
+
+    # min/max ย้อนกลับไม่ได้ -> ถ้าเอาค่าขอบออกค่อยถามจากตารางรีวิว (เฉพาะหัวข้อนี้)
+    if price in (st.price_min, st.price_max):
+        agg = (
+            Review.objects.filter(topic_id=st.topic_id)
+            .exclude(status="rejected")
+            .aggregate(lo=Min("price"), hi=Max("price"))
+        )
+        st.price_min, st.price_max = agg["lo"], agg["hi"]
+
+
+def apply_review_change(before, after):
+    """
+    อัปเดต TopicStats จาก snapshot ก่อน/หลัง (None = ไม่มีรีวิวนั้น เช่น สร้างใหม่/ลบ)
+    ต้องเรียกหลังบันทึกรีวิวแล้ว ภายใน transaction เดียวกัน
+    """
+    ops = []
+    if before and _counted(before[3]):
+        ops.append((before[0], _stats_remove, before[1], before[2]))
+    if after and _counted(after[3]):
+        ops.append((after[0], _stats_add, after[1], after[2]))
+    if not ops:
+        return
+
+    with transaction.atomic():
+        for topic_id in sorted({op[0] for op in ops}):
+            st, _ = TopicStats.objects.select_for_update().get_or_create(topic_id=topic_id)
+            for tid, fn, rating, price in ops:
+                if tid == topic_id:
+                    fn(st, rating, price)
+            st.save()
+
+
+def rebuild_topic_stats(topic_ids=None) -> int:
+    """
+    คำนวณ TopicStats ใหม่จากตารางรีวิว (GROUP BY topic ครั้งเดียว)
+    ใช้กับการอนุมัติ/ปฏิเสธแบบกลุ่ม และคำสั่ง reconcile_community_counters
+    """
+    reviews = Review.objects.exclude(status="rejected")
+    topics = Topic.objects.all()
+    if topic_ids is not None:
+        topic_ids = list(topic_ids)
+        reviews = reviews.filter(topic_id__in=topic_ids)
+        topics = topics.filter(pk__in=topic_ids)
+
+    rows = (
+        reviews.order_by()
+        .values("topic_id")
+        .annotate(
+            n=Count("id"),
+            rating_sum=Sum("rating"),
+            price_min=Min("price"),
+            price_max=Max("price"),
+            price_mean=Avg("price"),
+            price_sq=Sum(F("price") * F("price")),
+            **{f"rating_{star}": Count("id", filter=_star_q(star)) for star in range(1, 6)},
+        )
+    )
+    by_topic = {row.pop("topic_id"): row for row in rows}
+
+    stats = []
+    for tid in topics.values_list("pk", flat=True).iterator():
+        row = by_topic.get(tid)
+        if not row:
+            stats.append(TopicStats(topic_id=tid))
+            continue
+        n, mean = row["n"], float(row["price_mean"] or 0)
+        stats.append(TopicStats(
+            topic_id=tid,
+            n=n,
+            rating_sum=row["rating_sum"] or 0,
+            rating_1=row["rating_1"], rating_2=row["rating_2"], rating_3=row["rating_3"],
+            rating_4=row["rating_4"], rating_5=row["rating_5"],
+            price_min=row["price_min"],
+            price_max=row["price_max"],
+            price_mean=mean,
+            price_m2=max(float(row["price_sq"] or 0) - n * mean * mean, 0),
+        ))
+
+    fields = [f.name for f in TopicStats._meta.concrete_fields if not f.primary_key]
+    TopicStats.objects.bulk_create(
+        stats,
+        batch_size=500,
+        update_conflicts=True,
+        unique_fields=["topic"],
+        update_fields=fields,
+    )
+    return len(stats)
+
+
+# ================== ตรวจหัวข้อ/รีวิวที่เกือบซ้ำ (SimHash) ==================
+SCAN_BUCKET_CAP = 200  # scan_duplicates: ค่าหนึ่งเทียบกับค่าที่เก่ากว่าใน bucket เดียวกันไม่เกินเท่านี้
+SCAN_WRITE_BATCH = 500
+
+def near_duplicates(obj, *, max_distance: int = SIMHASH_MAX_DISTANCE, limit: int = 5):
+    """
+    หาแถวที่ข้อความใกล้เคียงกับ obj (Topic/Review ที่ compute_simhash แล้ว)
+    - candidate: band ใดก็ได้ที่ตรงกัน (OR ของ index lookup 4 ตัว) เอาแค่ค่า simhash ที่ไม่ซ้ำกัน
+      (ข้อความเหมือนกันเป๊ะเป็นร้อยแถวก็เป็น candidate ตัวเดียว ไม่ตัดที่จำนวนแถว -> ไม่พลาดแถวใหม่ ๆ ที่ใกล้)
+    - กรองจริงด้วย Hamming distance <= max_distance แล้วเอาแถวที่เก่าสุดของแต่ละค่า
+    - obj ที่มีอยู่แล้ว (แก้ไข) เทียบเฉพาะแถวที่เก่ากว่า (ของเดิมไม่ถูกนับว่าซ้ำกับของที่ลอกไป)
+    คืน [(distance, แถว)] เรียงจากใกล้สุด/เก่าสุด
+    """
+    if obj.simhash is None or obj.simhash == 0:
+        return []
+
+    value = to_unsigned64(obj.simhash)
+    band_q = Q()
+    for i, band in enumerate(simhash_bands(value)):
+        band_q |= Q(**{f"sim_b{i}": band})
+
+    qs = type(obj).objects.filter(band_q).exclude(simhash=0)
+    if obj.pk:
+        qs = qs.filter(Q(created_at__lt=obj.created_at) | Q(created_at=obj.created_at, pk__lt=obj.pk))
+
+    distances = {}
+    for h in qs.order_by().values_list("simhash", flat=True).distinct().iterator():
+        d = hamming(value, to_unsigned64(h))
+        if d <= max_distance:
+            distances[h] = d
+
+    found = []
+    for h in sorted(distances, key=distances.get)[:limit]:
+        found.append((distances[h], qs.filter(simhash=h).order_by("created_at", "id").first()))
+    found.sort(key=lambda x: (x[0], x[1].created_at, x[1].pk))
+    return found
+
+
+def check_near_duplicate(obj):
+    """
+    ก่อน save ตอนสร้าง/แก้ไข: คำนวณ simhash แล้วตั้ง duplicate_of + status
+    ยังเกือบซ้ำ -> pending (รอ staff ตรวจ), ไม่ซ้ำแล้ว -> ล้าง duplicate_of และ approved
+    คืนแถวที่ซ้ำ หรือ None
+    """
+    obj.compute_simhash()
+    dups = near_duplicates(obj, limit=1)
+    obj.duplicate_of = dups[0][1] if dups else None
+    obj.status = "pending" if dups else "approved"
+    return obj.duplicate_of
+
+
+def scan_duplicates(model, *, max_distance: int = SIMHASH_MAX_DISTANCE, dry_run: bool = False) -> dict:
+    """
+    batch: คำนวณ simhash ที่ยังไม่มี แล้วหาแถวที่เกือบซ้ำโดยไม่เทียบทุกคู่
+    1) ไล่ทุกแถวจากเก่าไปใหม่ครั้งเดียว: simhash เดียวกันเป๊ะ -> ชี้ไปแถวที่เก่าสุดของค่านั้น (ไม่ต้องคำนวณระยะ)
+    2) เทียบเฉพาะ "ค่า simhash ที่ไม่ซ้ำกัน" ที่อยู่ band เดียวกัน (ข้อความสั้นเหมือนกันเป็นพันแถว = ค่าเดียว)
+       แต่ละค่าเทียบกับค่าที่เก่ากว่าใน bucket ไม่เกิน SCAN_BUCKET_CAP ค่าล่าสุด -> bucket ใหญ่ไม่กลายเป็น O(k²)
+    แถวที่ใหม่กว่าจะถูกตั้ง duplicate_of = แถวที่เก่ากว่าที่ใกล้ที่สุด
+    """
+    missing = 0
+    for obj in model.objects.filter(simhash__isnull=True).iterator(chunk_size=500):
+        obj.compute_simhash()
+        missing += 1
+        if not dry_run:
+            model.objects.filter(pk=obj.pk).update(
+                simhash=obj.simhash, sim_b0=obj.sim_b0, sim_b1=obj.sim_b1, sim_b2=obj.sim_b2, sim_b3=obj.sim_b3,
+            )
+
+    flagged = 0
+    pending = []
+
+    def flag(pk, older):
+        nonlocal flagged
+        flagged += 1
+        if dry_run:
+            return
+        pending.append(model(pk=pk, duplicate_of_id=older))
+        if len(pending) >= SCAN_WRITE_BATCH:
+            model.objects.bulk_update(pending, ["duplicate_of"])
+            pending.clear()
+
+    # 1) ค่าเดียวกันเป๊ะ: เก็บแค่แถวแรก (เก่าสุด) ต่อค่า
+    first = {}  # simhash -> pk ที่เก่าสุด (ลำดับใส่ของ dict = ลำดับอายุ)
+    rows = (
+        model.objects.exclude(simhash=0).exclude(simhash__isnull=True)
+        .order_by("created_at", "id").values_list("pk", "simhash")
+    )
+    for pk, value in rows.iterator(chunk_size=2000):
+        if value in first:
+            flag(pk, first[value])
+        else:
+            first[value] = pk
+
+    # 2) ค่าที่ต่างกันแต่ใกล้กัน: bucket ต่อ band เก็บ index ของค่า (เรียงเก่า -> ใหม่)
+    values = [to_unsigned64(v) for v in first]
+    oldest = list(first.values())
+    best = {}  # index ค่าใหม่ -> (distance, index ค่าเก่า)
+    for band in range(SIMHASH_BANDS):
+        buckets = {}
+        for i, value in enumerate(values):
+            buckets.setdefault(simhash_bands(value)[band], []).append(i)
+        for members in buckets.values():
+            for j in range(1, len(members)):
+                newer = members[j]
+                for older in members[max(0, j - SCAN_BUCKET_CAP):j]:
+                    d = hamming(values[newer], values[older])
+                    if d <= max_distance and (newer not in best or (d, older) < best[newer]):
+                        best[newer] = (d, older)
+
+    for newer, (_, older) in best.items():
+        flag(oldest[newer], oldest[older])
+    if pending:
+        model.objects.bulk_update(pending, ["duplicate_of"])
+
+    return {"hashed": missing, "flagged": flagged}
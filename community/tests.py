@@ -1,3 +1,380 @@
+import statistics
+import time
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import Comment, Like, Review, Topic, TopicStats
+from .services import (
+    HOT_WEIGHT_LIKE, HOT_WEIGHT_REVIEW, _stats_add, _stats_remove, apply_review_change, bump_counter, bump_topic_hot,
+    near_duplicates, rebuild_topic_stats, reconcile_counters, review_snapshot, scan_duplicates, set_like,
+)
+from .utils import simhash_bands, to_signed64
+from .views import REVIEWS_PAGE_SIZE
+
+# ล็อกอิน: session, user, หัวข้อ (+stats), รีวิวหน้าแรก (join author/profile + Exists ไลก์)
+TOPIC_DETAIL_QUERIES = 4
+# ไม่ล็อกอิน: หัวข้อ, รีวิว (session ว่าง ไม่ต้อง query)
+TOPIC_DETAIL_ANONYMOUS_QUERIES = 2
+
+
+class TopicDetailQueryCountTests(TestCase):
+
+    def setUp(self):
+        self.owner = User.objects.create(username="topic-owner")
+        self.topic = Topic.objects.create(title="ข้าวมันไก่ประตูน้ำ", created_by=self.owner)
+
+    def seed_reviews(self, n):
+        for i in range(n):
+            author = User.objects.create(username=f"reviewer{i}")
+            review = Review.objects.create(
+                topic=self.topic, title=f"รีวิวที่ {i}", body=f"อร่อยมาก ครั้งที่ {i}",
+                price=40 + i, rating=1 + i % 5, author=author, status="approved",
+            )
+            Like.objects.create(review=review, user=self.owner)
+            Comment.objects.create(review=review, user=self.owner, message="เห็นด้วย")
+        rebuild_topic_stats([self.topic.pk])
+
+    def get_detail(self, expected):
+        with self.assertNumQueries(expected):
+            response = self.client.get(reverse("community:topic_detail", args=[self.topic.pk]))
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_topic_detail_small(self):
+        self.seed_reviews(1)
+        self.client.force_login(self.owner)
+        response = self.get_detail(TOPIC_DETAIL_QUERIES)
+        self.assertEqual(len(response.context["reviews"]), 1)
+
+    def test_topic_detail_large(self):
+        self.seed_reviews(REVIEWS_PAGE_SIZE + 5)
+        self.client.force_login(self.owner)
+        response = self.get_detail(TOPIC_DETAIL_QUERIES)
+        self.assertEqual(len(response.context["reviews"]), REVIEWS_PAGE_SIZE)
+        self.assertTrue(response.context["next_cursor"])
+
+    def test_topic_detail_anonymous(self):
+        self.seed_reviews(REVIEWS_PAGE_SIZE)
+        self.get_detail(TOPIC_DETAIL_ANONYMOUS_QUERIES)
+
+
+class HotScoreTests(TestCase):
+
+    def setUp(self):
+        self.owner = User.objects.create(username="topic-owner")
+
+    def test_new_rows_start_at_current_time(self):
+        before = time.time()
+        topic = Topic.objects.create(title="ก๋วยเตี๋ยวเรือ", created_by=self.owner)
+        self.assertGreaterEqual(topic.hot_ts, before)
+
+    def test_bump_row_never_bumped(self):
+        # hot_ts = 0 (แถวเก่าก่อน migration) -> เลขชี้กำลัง ~ -14000 ต้องไม่ทำให้ exp underflow
+        topic = Topic.objects.create(title="ก๋วยเตี๋ยวเรือ", created_by=self.owner, hot_ts=0)
+        bump_topic_hot(topic.pk, HOT_WEIGHT_REVIEW)
+        topic.refresh_from_db()
+        self.assertAlmostEqual(topic.hot_score, HOT_WEIGHT_REVIEW)
+
+    def test_bump_stale_score_is_clamped(self):
+        topic = Topic.objects.create(title="ก๋วยเตี๋ยวเรือ", created_by=self.owner, hot_score=5.0, hot_ts=0)
+        bump_topic_hot(topic.pk, HOT_WEIGHT_LIKE)
+        topic.refresh_from_db()
+        self.assertAlmostEqual(topic.hot_score, HOT_WEIGHT_LIKE)
+
+
+class NearDuplicateEditTests(TestCase):
+
+    BODY = "ข้าวมันไก่ร้านนี้ไก่นุ่มมาก น้ำจิ้มเต้าเจี้ยวรสจัด ข้าวหอมมัน ราคาไม่แพง คิวยาวช่วงเที่ยง ที่จอดรถหายาก"
+
+    def setUp(self):
+        self.owner = User.objects.create(username="topic-owner")
+        self.author = User.objects.create(username="copycat")
+        self.topic = Topic.objects.create(title="ข้าวมันไก่ประตูน้ำ", created_by=self.owner, status="approved")
+        self.original = Review.objects.create(
+            topic=self.topic, title="อร่อย", body=self.BODY, author=self.owner, status="approved",
+        )
+        self.client.force_login(self.author)
+        self.client.post(reverse("community:review_add", args=[self.topic.pk]), {
+            "title": "อร่อย", "body": self.BODY, "price": 50, "rating": 5,
+        })
+        self.copy = Review.objects.get(author=self.author)
+
+    def edit(self, review, body):
+        return self.client.post(reverse("community:review_edit", args=[review.pk]), {
+            "title": review.title, "body": body, "price": 50, "rating": 5,
+        })
+
+    def test_flagged_on_add(self):
+        self.assertEqual(self.copy.status, "pending")
+        self.assertEqual(self.copy.duplicate_of_id, self.original.pk)
+
+    def test_edit_still_duplicate_stays_pending(self):
+        self.edit(self.copy, self.BODY + " ")
+        self.copy.refresh_from_db()
+        self.assertEqual(self.copy.status, "pending")
+        self.assertEqual(self.copy.duplicate_of_id, self.original.pk)
+
+    def test_edit_rewritten_is_approved(self):
+        self.edit(self.copy, "ร้านก๋วยเตี๋ยวเรือริมคลอง น้ำซุปเข้มข้น เส้นเล็กเหนียวนุ่ม หมูตุ๋นเปื่อย เปิดถึงสี่ทุ่ม")
+        self.copy.refresh_from_db()
+        self.assertEqual(self.copy.status, "approved")
+        self.assertIsNone(self.copy.duplicate_of_id)
+
+    def test_edit_original_not_flagged_against_newer_copy(self):
+        self.client.force_login(self.owner)
+        self.edit(self.original, self.BODY + " ")
+        self.original.refresh_from_db()
+        self.assertEqual(self.original.status, "approved")
+        self.assertIsNone(self.original.duplicate_of_id)
+
+
+class SimHashScanTests(TestCase):
+
+    H = 0x0123_4567_89AB_CDEF
+
+    def setUp(self):
+        self.user = User.objects.create(username="reviewer")
+        self.topic = Topic.objects.create(title="ร้านข้าวแกง", created_by=self.user)
+        self.start = timezone.now() - timedelta(days=1)
+        self.made = 0
+
+    def reviews(self, value, n=1):
+        """รีวิว n แถวที่มี simhash = value (ตั้งตรง ๆ ด้วย bulk_create ไม่ผ่าน save)"""
+        rows = []
+        for _ in range(n):
+            self.made += 1
+            rows.append(Review(
+                topic=self.topic, author=self.user, title="อร่อยมาก", body="อร่อยมาก",
+                created_at=self.start + timedelta(seconds=self.made),
+                simhash=to_signed64(value), **{f"sim_b{i}": b for i, b in enumerate(simhash_bands(value))},
+            ))
+        return Review.objects.bulk_create(rows)
+
+    def test_scan_groups_identical_hashes(self):
+        same = self.reviews(self.H, 300)  # ข้อความสั้นเหมือนกันเป็นร้อย
+        near = self.reviews(self.H ^ 0b101)[0]
+        far = self.reviews(~self.H & (2 ** 64 - 1))[0]
+
+        self.assertEqual(scan_duplicates(Review), {"hashed": 0, "flagged": 300})
+        dups = dict(Review.objects.values_list("pk", "duplicate_of_id"))
+        self.assertIsNone(dups[same[0].pk])
+        self.assertTrue(all(dups[r.pk] == same[0].pk for r in same[1:]))
+        self.assertEqual(dups[near.pk], same[0].pk)
+        self.assertIsNone(dups[far.pk])
+
+    def test_scan_dry_run(self):
+        self.reviews(self.H, 3)
+        self.assertEqual(scan_duplicates(Review, dry_run=True)["flagged"], 2)
+        self.assertFalse(Review.objects.exclude(duplicate_of=None).exists())
+
+    def test_near_duplicates_sees_newer_rows_in_busy_bucket(self):
+        # 250 แถวเก่าที่ band แรกตรงแต่ห่างเกิน -> เคยกิน candidate 200 ตัวแรกจนไม่เห็นแถวที่ใกล้จริง
+        self.reviews(self.H ^ (0xFFFF << 16) ^ (0xFFFF << 32), 250)
+        close = self.reviews(self.H ^ 0b1)[0]
+        self.reviews(self.H ^ 0b11, 5)
+        probe = Review(simhash=to_signed64(self.H))
+        found = near_duplicates(probe, limit=2)
+        self.assertEqual([(d, r.pk) for d, r in found][0], (1, close.pk))
+        self.assertEqual(found[1][0], 2)
+
+
+class ReviewLikeTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(username="liker")
+        topic = Topic.objects.create(title="ก๋วยเตี๋ยวเรือ", created_by=self.user)
+        self.review = Review.objects.create(topic=topic, author=self.user, title="น้ำซุปเข้ม", body="เส้นเหนียว")
+        self.url = reverse("community:review_like", args=[self.review.pk])
+        self.client.force_login(self.user)
+
+    def likes(self):
+        return Review.objects.values_list("likes_count", flat=True).get(pk=self.review.pk)
+
+    def test_like_twice_counts_once(self):
+        # ดับเบิลคลิก -> ส่ง liked=1 มาสองครั้ง
+        for _ in range(2):
+            self.client.post(self.url, {"liked": "1"})
+        self.assertEqual(self.likes(), 1)
+        self.assertEqual(Like.objects.filter(review=self.review).count(), 1)
+
+    def test_unlike_twice_counts_once(self):
+        set_like(self.review.pk, self.user.pk, True)
+        other = User.objects.create(username="other")
+        set_like(self.review.pk, other.pk, True)
+        for _ in range(2):
+            self.client.post(self.url, {"liked": "0"})
+        self.assertEqual(self.likes(), 1)  # ไลก์ของคนอื่นยังอยู่
+
+    def test_set_like_result(self):
+        self.assertEqual(set_like(self.review.pk, self.user.pk, True), (True, 1))
+        self.assertEqual(set_like(self.review.pk, self.user.pk, True), (False, 1))
+        self.assertEqual(set_like(self.review.pk, self.user.pk, False), (True, 0))
+        self.assertEqual(set_like(self.review.pk, self.user.pk, False), (False, 0))
+
+    def test_missing_review(self):
+        self.assertIsNone(set_like(999999, self.user.pk, True))
+        self.assertIsNone(set_like(999999, self.user.pk, False))
+        self.assertFalse(Like.objects.exists())
+        response = self.client.post(reverse("community:review_like", args=[999999]), {"liked": "1"})
+        self.assertEqual(response.status_code, 404)
+
+    def test_get_is_rejected(self):
+        self.assertEqual(self.client.get(self.url).status_code, 405)
+        self.assertEqual(self.likes(), 0)
+
+    def test_json_response(self):
+        headers = {"Accept": "application/json"}
+        response = self.client.post(self.url, {"liked": "1"}, headers=headers)
+        self.assertEqual(response.json(), {"liked": True, "likes": 1})
+        # ไม่ส่ง liked = สลับจากสถานะเดิม
+        response = self.client.post(self.url, headers=headers)
+        self.assertEqual(response.json(), {"liked": False, "likes": 0})
+
+    def test_form_post_redirects_to_topic(self):
+        response = self.client.post(self.url)
+        self.assertRedirects(response, reverse("community:topic_detail", args=[self.review.topic_id]), fetch_redirect_response=False)
+        self.assertEqual(self.likes(), 1)
+
+
+class CounterTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(username="counter")
+        self.topic = Topic.objects.create(title="ส้มตำหน้าตลาด", created_by=self.user)
+        self.client.force_login(self.user)
+
+    def counts(self):
+        topic = Topic.objects.get(pk=self.topic.pk)
+        reviews = {r.pk: (r.likes_count, r.comments_count) for r in Review.objects.all()}
+        return topic.reviews_count, reviews
+
+    def add_review(self, title):
+        self.client.post(reverse("community:review_add", args=[self.topic.pk]), {
+            "title": title, "price": 50, "rating": 4, "body": f"{title} รสจัดจ้าน",
+        })
+        return Review.objects.get(title=title)
+
+    def test_views_keep_counters_in_sync(self):
+        review = self.add_review("ตำไทย")
+        self.add_review("ตำปู")
+        self.assertEqual(Topic.objects.get(pk=self.topic.pk).reviews_count, 2)
+
+        for message in ("เผ็ดมาก", "ให้เยอะ"):
+            self.client.post(reverse("community:comment_add", args=[review.pk]), {"message": message})
+        self.client.post(reverse("community:review_like", args=[review.pk]), {"liked": "1"})
+        self.assertEqual(self.counts()[1][review.pk], (1, 2))
+
+        comment = Comment.objects.filter(review=review).first()
+        self.client.post(reverse("community:comment_delete", args=[comment.pk]))
+        self.client.post(reverse("community:review_like", args=[review.pk]), {"liked": "0"})
+        self.assertEqual(self.counts()[1][review.pk], (0, 1))
+
+        self.client.post(reverse("community:review_delete", args=[review.pk]))
+        self.assertEqual(self.counts()[0], 1)
+        # ทุกค่าตรงกับตารางจริงอยู่แล้ว -> reconcile ไม่ต้องแก้อะไร
+        self.assertEqual(set(reconcile_counters().values()), {0})
+
+    def test_bump_counter_never_negative(self):
+        self.assertEqual(bump_counter(Topic, self.topic.pk, "reviews_count", -1), 0)
+        self.assertEqual(Topic.objects.get(pk=self.topic.pk).reviews_count, 0)
+
+    def test_reconcile_fixes_drift(self):
+        review = Review.objects.create(topic=self.topic, author=self.user, title="ตำลาว", body="ปลาร้านัว")
+        Like.objects.create(review=review, user=self.user)
+        Comment.objects.create(review=review, user=self.user, message="แซ่บ")
+        # ตัวนับเพี้ยน (เช่น ลบแถวตรง ๆ ใน DB หรือ request ล้มกลางทาง)
+        Topic.objects.filter(pk=self.topic.pk).update(reviews_count=7)
+        Review.objects.filter(pk=review.pk).update(likes_count=0, comments_count=5)
+
+        self.assertEqual(reconcile_counters(), {"topic.reviews_count": 1, "review.likes_count/comments_count": 1})
+        self.assertEqual(self.counts(), (1, {review.pk: (1, 1)}))
+
+    def test_reconcile_command(self):
+        Topic.objects.filter(pk=self.topic.pk).update(reviews_count=3)
+        out = StringIO()
+        call_command("reconcile_community_counters", stdout=out)
+        self.assertIn("topic.reviews_count: 1 row(s) corrected", out.getvalue())
+        self.assertEqual(self.counts()[0], 0)
+
+
+class TopicStatsTests(TestCase):
+
+    PRICES = [45, 60, 120, 35, 80, 60, 250, 40]
+    RATINGS = [5, 4, 2, 5, 3, 4, 1, 5]
+
+    def setUp(self):
+        self.user = User.objects.create(username="stats")
+        self.topic = Topic.objects.create(title="ข้าวขาหมู", created_by=self.user)
+
+    def add(self, price, rating, status="approved"):
+        review = Review.objects.create(
+            topic=self.topic, author=self.user, title="ขาหมู", body=f"ราคา {price}",
+            price=price, rating=rating, status=status,
+        )
+        apply_review_change(None, review_snapshot(review))
+        return review
+
+    def remove(self, review):
+        before = review_snapshot(review)
+        review.delete()
+        apply_review_change(before, None)
+
+    def assertStats(self, prices, ratings):
+        st = TopicStats.objects.get(topic=self.topic)
+        self.assertEqual((st.n, st.rating_sum), (len(prices), sum(ratings)))
+        self.assertEqual(
+            [getattr(st, f"rating_{star}") for star in range(1, 6)],
+            [ratings.count(star) for star in range(1, 6)],
+        )
+        self.assertEqual((st.price_min, st.price_max), (min(prices), max(prices)))
+        self.assertAlmostEqual(st.price_mean, statistics.fmean(prices))
+        # price_m2 = ผลรวมกำลังสองของส่วนเบี่ยงเบน = pvariance * n
+        self.assertAlmostEqual(st.price_m2, statistics.pvariance(prices) * len(prices), places=6)
+        if len(prices) > 1:
+            self.assertAlmostEqual(st.price_std, statistics.stdev(prices))
+
+    def test_add_remove_matches_statistics(self):
+        reviews = [self.add(p, r) for p, r in zip(self.PRICES, self.RATINGS)]
+        self.assertStats(self.PRICES, self.RATINGS)
+
+        # เอาค่าขอบ (250 = max, 35 = min) และค่ากลางออก -> min/max ต้องถามตารางใหม่
+        for i in (6, 3, 1):
+            self.remove(reviews[i])
+        keep = [i for i in range(len(self.PRICES)) if i not in (6, 3, 1)]
+        self.assertStats([self.PRICES[i] for i in keep], [self.RATINGS[i] for i in keep])
+
+    def test_rejected_reviews_are_not_counted(self):
+        self.add(45, 5)
+        self.add(999, 1, status="rejected")
+        self.assertStats([45], [5])
+        rebuild_topic_stats([self.topic.pk])
+        self.assertStats([45], [5])
+
+    def test_remove_last_review_resets(self):
+        self.remove(self.add(70, 3))
+        st = TopicStats.objects.get(topic=self.topic)
+        self.assertEqual((st.n, st.price_min, st.price_max, st.price_mean, st.price_m2), (0, None, None, 0, 0))
+
+    def test_rebuild_matches_incremental(self):
+        for p, r in zip(self.PRICES, self.RATINGS):
+            self.add(p, r)
+        TopicStats.objects.filter(topic=self.topic).update(n=1, price_mean=0, price_m2=0, price_min=999)
+        self.assertEqual(rebuild_topic_stats([self.topic.pk]), 1)
+        self.assertStats(self.PRICES, self.RATINGS)
 
-# Create your tests here.
+    def test_welford_inverse(self):
+        st = TopicStats(topic=self.topic)
+        for p, r in zip(self.PRICES, self.RATINGS):
+            _stats_add(st, r, p)
+        # ลบค่าที่ไม่ใช่ขอบ -> ไม่ต้องถาม DB
+        with self.assertNumQueries(0):
+            _stats_remove(st, self.RATINGS[0], self.PRICES[0])
+        rest = self.PRICES[1:]
+        self.assertAlmostEqual(st.price_mean, statistics.fmean(rest))
+        self.assertAlmostEqual(st.price_m2, statistics.pvariance(rest) * len(rest), places=6)
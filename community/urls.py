@@ -20,6 +20,7 @@ urlpatterns = [
     path("review/<int:pk>/like/", views.review_like_toggle, name="review_like"),
 
     # comment
+    path("review/<int:pk>/comments/", views.review_comments, name="review_comments"),
     path("review/<int:pk>/comment/add/", views.comment_add, name="comment_add"),
     path("comment/<int:pk>/delete/", views.comment_delete, name="comment_delete"),
 
@@ -0,0 +1,112 @@
+# community/utils.py
+import hashlib
+import re
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db.models import Q
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+# ------------------ keyset pagination บน (created_at, id) ------------------
+def encode_cursor(created_at, pk) -> str:
+    """cursor = "<microseconds since epoch>_<id>" (ใส่ใน URL ได้ตรงๆ)"""
+    delta = created_at - _EPOCH
+    us = (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+    return f"{us}_{pk}"
+
+
+def decode_cursor(cursor: str | None):
+    """คืน (created_at, id) หรือ None ถ้า cursor ว่าง/ผิดรูปแบบ"""
+    if not cursor:
+        return None
+    try:
+        us, pk = str(cursor).split("_", 1)
+        return _EPOCH + timedelta(microseconds=int(us)), int(pk)
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+
+def keyset_page(qs, cursor: str | None, size: int, *, descending: bool = True):
+    """
+    ดึงหน้าถัดไปแบบ keyset: WHERE (created_at, id) < / > cursor ORDER BY created_at, id LIMIT size+1
+    - ไม่ใช้ OFFSET -> เวลา query คงที่ไม่ว่าจะอยู่หน้าไหน
+    คืน (items, next_cursor)
+    """
+    pos = decode_cursor(cursor)
+    if pos:
+        ts, pk = pos
+        if descending:
+            qs = qs.filter(Q(created_at__lt=ts) | Q(created_at=ts, id__lt=pk))
+        else:
+            qs = qs.filter(Q(created_at__gt=ts) | Q(created_at=ts, id__gt=pk))
+
+    order = ("-created_at", "-id") if descending else ("created_at", "id")
+    rows = list(qs.order_by(*order)[:size + 1])
+
+    next_cursor = None
+    if len(rows) > size:
+        rows = rows[:size]
+        last = rows[-1]
+        next_cursor = encode_cursor(last.created_at, last.pk)
+    return rows, next_cursor
+
+
+# ------------------ SimHash (ตรวจข้อความซ้ำ/เกือบซ้ำ) ------------------
+# 64 บิต แบ่ง 4 band x 16 บิต: ถ้า Hamming distance <= 3 จะมีอย่างน้อย 1 band ที่ตรงกันเป๊ะ
+# -> หา candidate ด้วย WHERE b0 = ? OR b1 = ? ... (index) แทนการเทียบทีละคู่
+SIMHASH_BITS = 64
+SIMHASH_BANDS = 4
+SIMHASH_BAND_BITS = SIMHASH_BITS // SIMHASH_BANDS
+SIMHASH_MAX_DISTANCE = SIMHASH_BANDS - 1
+SHINGLE_SIZE = 2  # bigram แยกข้อความไทยที่แก้นิดเดียวออกจากข้อความอื่นได้ดีกว่า n ที่ยาวกว่า
+
+_NON_WORD = re.compile(r"[^\w]+", re.UNICODE)
+
+
+def _shingles(text: str):
+    """
+    ภาษาไทยไม่มีช่องว่างคั่นคำ -> ใช้ character n-gram แทนการตัดคำ
+    (ตัดเครื่องหมาย/ช่องว่างออก, ตัวพิมพ์เล็กทั้งหมด)
+    """
+    norm = _NON_WORD.sub("", (text or "").lower())
+    if len(norm) <= SHINGLE_SIZE:
+        return [norm] if norm else []
+    return [norm[i:i + SHINGLE_SIZE] for i in range(len(norm) - SHINGLE_SIZE + 1)]
+
+
+def simhash(text: str) -> int:
+    """SimHash 64 บิต (unsigned) ของข้อความ, ข้อความว่างได้ 0"""
+    weights = [0] * SIMHASH_BITS
+    shingles = _shingles(text)
+    if not shingles:
+        return 0
+
+    for sh in shingles:
+        h = int.from_bytes(hashlib.blake2b(sh.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(SIMHASH_BITS):
+            weights[bit] += 1 if (h >> bit) & 1 else -1
+
+    value = 0
+    for bit, w in enumerate(weights):
+        if w > 0:
+            value |= 1 << bit
+    return value
+
+
+def simhash_bands(value: int) -> list[int]:
+    mask = (1 << SIMHASH_BAND_BITS) - 1
+    return [(value >> (i * SIMHASH_BAND_BITS)) & mask for i in range(SIMHASH_BANDS)]
+
+
+def hamming(a: int, b: int) -> int:
+    return bin((a ^ b) & ((1 << SIMHASH_BITS) - 1)).count("1")
+
+
+def to_signed64(value: int) -> int:
+    """เก็บลง BigIntegerField (signed) ได้"""
+    return value - (1 << SIMHASH_BITS) if value >= 1 << (SIMHASH_BITS - 1) else value
+
+
+def to_unsigned64(value: int) -> int:
+    return value + (1 << SIMHASH_BITS) if value < 0 else value
@@ -2,12 +2,28 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
-from django.db.models import Count, Q
-from django.http import Http404
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from django.http import Http404, JsonResponse
+from django.urls import reverse
+from django.utils import timezone
 from django.views.decorators.http import require_POST
 
 from .models import Topic, Review, Comment, Like
 from .forms import TopicForm, ReviewForm, CommentForm
+from .utils import keyset_page
+from .services import (
+    HOT_WEIGHT_COMMENT,
+    HOT_WEIGHT_REVIEW,
+    apply_review_change,
+    bump_counter,
+    bump_review_hot,
+    bump_topic_hot,
+    check_near_duplicate,
+    review_snapshot,
+    set_like,
+)
+from moderation.services import moderate
 
 
 # ================== Helper ==================
@@ -17,6 +33,9 @@ def staff_required(view_func):
 
 
 # ================== TOPIC LIST (หน้าแรก Community) ==================
+HOT_REVIEWS_LIMIT = 5
+
+
 def topic_list(request):
     """
     หน้าแรก Community
@@ -24,16 +43,14 @@ def topic_list(request):
     - ล็อกอิน:
         staff -> เห็นทั้งหมด (is_active=True)
         user -> เห็น approved + ที่ตัวเองสร้าง
+    - ?sort=popular เรียงตามจำนวนรีวิว (อ่านจากคอลัมน์ reviews_count ตรง ๆ ไม่ต้อง COUNT)
+    - ?sort=hot เรียงตามคะแนนมาแรง (hot_score, index scan)
     """
-    base_qs = Topic.objects.filter(is_active=True)
+    base_qs = Topic.objects.filter(is_active=True).select_related("stats", "created_by")
 
     my_topics = Topic.objects.none()
     if request.user.is_authenticated:
-        my_topics = (
-            base_qs.filter(created_by=request.user)
-            .annotate(reviews_count=Count("reviews"))
-            .order_by("-created_at")
-        )
+        my_topics = base_qs.filter(created_by=request.user).order_by("-created_at")
 
         if request.user.is_staff:
             topics = base_qs
@@ -42,11 +59,27 @@ def topic_list(request):
     else:
         topics = base_qs.filter(status="approved")
 
-    topics = topics.annotate(reviews_count=Count("reviews")).order_by("-created_at")
+    sort = request.GET.get("sort") or "new"
+    if sort == "popular":
+        topics = topics.order_by("-reviews_count", "-created_at")
+    elif sort == "hot":
+        topics = topics.order_by("-hot_score", "-created_at")
+    else:
+        sort = "new"
+        topics = topics.order_by("-created_at")
+
+    hot_reviews = (
+        Review.objects
+        .filter(status="approved", hot_score__gt=0, topic__is_active=True, topic__status="approved")
+        .select_related("topic", "author")
+        .order_by("-hot_score")[:HOT_REVIEWS_LIMIT]
+    )
 
     return render(request, "community/topic_list.html", {
         "topics": topics,
         "my_topics": my_topics,
+        "sort": sort,
+        "hot_reviews": hot_reviews,
     })
 
 
@@ -58,10 +91,19 @@ def topic_add(request):
         if form.is_valid():
             topic = form.save(commit=False)
             topic.created_by = request.user
-            topic.status = "approved"
             topic.is_active = True
+
+            # เกือบซ้ำกับหัวข้อเดิม -> ส่งเข้าคิวตรวจสอบแทนการอนุมัติทันที
+            dup = check_near_duplicate(topic)
+
             topic.save()
-            messages.success(request, "สร้างหัวข้อเรียบร้อย")
+            if dup:
+                messages.warning(
+                    request,
+                    f"หัวข้อนี้คล้ายกับ \"{dup.title}\" ที่มีอยู่แล้ว จะแสดงต่อสาธารณะหลังผู้ดูแลตรวจสอบ",
+                )
+            else:
+                messages.success(request, "สร้างหัวข้อเรียบร้อย")
             return redirect("community:topic_detail", pk=topic.pk)
         messages.error(request, "สร้างหัวข้อไม่สำเร็จ กรุณาตรวจสอบข้อมูล")
     else:
@@ -80,9 +122,13 @@ def topic_edit(request, pk):
         form = TopicForm(request.POST, request.FILES, instance=topic)
         if form.is_valid():
             t = form.save(commit=False)
-            t.status = "approved"
+            # แก้แล้วยังเกือบซ้ำ -> ยังรอตรวจ (ไม่อนุมัติตัวเองตอนแก้ไข)
+            dup = check_near_duplicate(t)
             t.save()
-            messages.success(request, "แก้ไขหัวข้อเรียบร้อย")
+            if dup:
+                messages.warning(request, f"หัวข้อนี้ยังคล้ายกับ \"{dup.title}\" ผู้ดูแลจะตรวจสอบก่อนแสดง")
+            else:
+                messages.success(request, "แก้ไขหัวข้อเรียบร้อย")
             return redirect("community:topic_detail", pk=topic.pk)
         messages.error(request, "แก้ไขไม่สำเร็จ กรุณาตรวจสอบข้อมูล")
     else:
@@ -106,13 +152,19 @@ def topic_delete(request, pk):
 
 
 # ================== TOPIC DETAIL + REVIEW LIST ==================
+REVIEWS_PAGE_SIZE = 20
+COMMENTS_PAGE_SIZE = 20
+
+
 def topic_detail(request, pk):
     """
     หน้ารายละเอียดหัวข้อ + รายการรีวิว
     - ให้ดูได้แม้ไม่ล็อกอิน (ถ้าอยากบังคับล็อกอินค่อยใส่ @login_required กลับ)
     - แต่การคอมเม้น/ไลก์ ยังบังคับล็อกอินใน view ที่เกี่ยวข้องอยู่แล้ว
+    - รีวิวแบ่งหน้าแบบ keyset (?after=<cursor>) / คอมเมนต์โหลดทีหลังผ่าน review_comments
+    - สรุปคะแนน/ราคาอ่านจาก TopicStats (ไม่ aggregate ตารางรีวิว)
     """
-    topic = get_object_or_404(Topic, pk=pk)
+    topic = get_object_or_404(Topic.objects.select_related("stats"), pk=pk)
 
     if (not request.user.is_staff) and (not topic.is_active) and (topic.created_by != request.user):
         raise Http404()
@@ -122,30 +174,63 @@ def topic_detail(request, pk):
     reviews = (
         Review.objects
         .filter(topic=topic)
-        .select_related("author")
-        .prefetch_related("comments__user", "likes")
-        .annotate(
-            likes_count=Count("likes", distinct=True),
-            comments_count=Count("comments", distinct=True),
-        )
+        .select_related("author", "author__profile")
     )
 
+    if request.user.is_authenticated:
+        reviews = reviews.annotate(
+            liked=Exists(Like.objects.filter(review=OuterRef("pk"), user=request.user))
+        )
+
     if not request.user.is_staff:
         reviews = reviews.exclude(status="rejected")
 
     if keyword:
         reviews = reviews.filter(Q(title__icontains=keyword) | Q(body__icontains=keyword))
 
-    reviews = reviews.order_by("-created_at")
+    reviews, next_cursor = keyset_page(reviews, request.GET.get("after"), REVIEWS_PAGE_SIZE)
 
     return render(request, "community/topic_detail.html", {
         "topic": topic,
         "reviews": reviews,
         "keyword": keyword,
+        "next_cursor": next_cursor,
+        "is_first_page": not request.GET.get("after"),
         "comment_form": CommentForm(),  # ส่งฟอร์มให้ template ใช้
     })
 
 
+def review_comments(request, pk):
+    """
+    JSON: คอมเมนต์ของรีวิว ทีละหน้า (keyset, เก่า -> ใหม่)
+    GET ?after=<cursor>
+    """
+    review = get_object_or_404(Review.objects.select_related("topic"), pk=pk)
+
+    is_owner = request.user.is_authenticated and review.author_id == request.user.id
+    if not request.user.is_staff and not is_owner:
+        if review.status == "rejected" or not review.topic.is_active:
+            raise Http404()
+
+    qs = Comment.objects.filter(review=review).select_related("user", "user__profile")
+    comments, next_cursor = keyset_page(qs, request.GET.get("after"), COMMENTS_PAGE_SIZE, descending=False)
+
+    data = []
+    for c in comments:
+        pic = getattr(getattr(c.user, "profile", None), "profile_picture", None)
+        can_delete = request.user.is_authenticated and (request.user.is_staff or c.user_id == request.user.id)
+        data.append({
+            "id": c.id,
+            "user": c.user.username,
+            "avatar": pic.url if pic else "",
+            "message": c.message,
+            "created_at": timezone.localtime(c.created_at).strftime("%d/%m/%Y %H:%M"),
+            "delete_url": reverse("community:comment_delete", args=[c.id]) if can_delete else "",
+        })
+
+    return JsonResponse({"comments": data, "next": next_cursor})
+
+
 # ================== ADD / EDIT / DELETE REVIEW ==================
 @login_required
 def review_add(request, pk):
@@ -157,9 +242,19 @@ def review_add(request, pk):
             review = form.save(commit=False)
             review.topic = topic
             review.author = request.user
-            review.status = "approved"
-            review.save()
-            messages.success(request, "เพิ่มรีวิวเรียบร้อย")
+
+            # ข้อความเกือบซ้ำกับรีวิวเดิม -> รอ staff ตรวจ (แสดงในคิว moderation)
+            dup = check_near_duplicate(review)
+
+            with transaction.atomic():
+                review.save()
+                bump_counter(Topic, topic.pk, "reviews_count", +1)
+                bump_topic_hot(topic.pk, HOT_WEIGHT_REVIEW)
+                apply_review_change(None, review_snapshot(review))
+            if dup:
+                messages.warning(request, "รีวิวนี้คล้ายกับรีวิวที่มีอยู่แล้ว ผู้ดูแลจะตรวจสอบอีกครั้ง")
+            else:
+                messages.success(request, "เพิ่มรีวิวเรียบร้อย")
             return redirect("community:topic_detail", pk=topic.pk)
         messages.error(request, "เพิ่มรีวิวไม่สำเร็จ กรุณาตรวจสอบข้อมูล")
     else:
@@ -176,12 +271,18 @@ def review_edit(request, pk):
         raise Http404()
 
     if request.method == "POST":
+        before = review_snapshot(review)  # form.is_valid() เขียนค่าใหม่ทับ instance
         form = ReviewForm(request.POST, request.FILES, instance=review)
         if form.is_valid():
             r = form.save(commit=False)
-            r.status = "approved"
-            r.save()
-            messages.success(request, "แก้ไขรีวิวเรียบร้อย")
+            dup = check_near_duplicate(r)
+            with transaction.atomic():
+                r.save()
+                apply_review_change(before, review_snapshot(r))
+            if dup:
+                messages.warning(request, "รีวิวนี้ยังคล้ายกับรีวิวที่มีอยู่แล้ว ผู้ดูแลจะตรวจสอบอีกครั้ง")
+            else:
+                messages.success(request, "แก้ไขรีวิวเรียบร้อย")
             return redirect("community:topic_detail", pk=review.topic_id)
         messages.error(request, "แก้ไขไม่สำเร็จ กรุณาตรวจสอบข้อมูล")
     else:
@@ -203,7 +304,12 @@ def review_delete(request, pk):
 
     if request.method == "POST":
         tid = review.topic_id
-        review.delete()
+        before = review_snapshot(review)
+        with transaction.atomic():
+            review.delete()
+            apply_review_change(before, None)
+            bump_counter(Topic, tid, "reviews_count", -1)
+            bump_topic_hot(tid, -HOT_WEIGHT_REVIEW)
         messages.success(request, "ลบรีวิวเรียบร้อย")
         return redirect("community:topic_detail", pk=tid)
 
@@ -221,7 +327,10 @@ def comment_add(request, pk):
         c = form.save(commit=False)
         c.review = review
         c.user = request.user
-        c.save()
+        with transaction.atomic():
+            c.save()
+            bump_counter(Review, review.pk, "comments_count", +1)
+            bump_review_hot(review.pk, HOT_WEIGHT_COMMENT)
         messages.success(request, "ส่งความคิดเห็นเรียบร้อย")
     else:
         messages.error(request, "ส่งไม่สำเร็จ: กรุณาพิมพ์ความคิดเห็นก่อน")
@@ -238,21 +347,40 @@ def comment_delete(request, pk):
         raise Http404()
 
     tid = c.review.topic_id
-    c.delete()
+    with transaction.atomic():
+        c.delete()
+        bump_counter(Review, c.review_id, "comments_count", -1)
+        bump_review_hot(c.review_id, -HOT_WEIGHT_COMMENT)
     messages.success(request, "ลบความคิดเห็นเรียบร้อย")
     return redirect("community:topic_detail", pk=tid)
 
 
 # ================== LIKE ==================
 @login_required
+@require_POST
 def review_like_toggle(request, pk):
-    review = get_object_or_404(Review, pk=pk)
+    """
+    ไลก์/เลิกไลก์รีวิว (POST)
+    - ส่ง liked=1|0 มาเป็นสถานะที่ต้องการ -> idempotent (ดับเบิลคลิกไม่ทำให้สลับไปมา)
+    - ไม่ส่ง liked มา = สลับสถานะเดิม (ฟอร์มธรรมดาที่ไม่มี JS)
+    - AJAX (Accept: application/json) ได้ JSON {liked, likes} กลับไป ไม่ต้อง render หน้าใหม่
+    """
+    wanted = request.POST.get("liked")
+    if wanted in ("1", "0"):
+        liked = wanted == "1"
+    else:
+        liked = not Like.objects.filter(review_id=pk, user=request.user).exists()
+
+    result = set_like(pk, request.user.pk, liked)
+    if result is None:
+        raise Http404()
+    _, count = result
 
-    like, created = Like.objects.get_or_create(review=review, user=request.user)
-    if not created:
-        like.delete()
+    if "application/json" in request.headers.get("Accept", ""):
+        return JsonResponse({"liked": liked, "likes": count})
 
-    return redirect("community:topic_detail", pk=review.topic_id)
+    topic_id = Review.objects.filter(pk=pk).values_list("topic_id", flat=True).first()
+    return redirect("community:topic_detail", pk=topic_id)
 
 
 # ================== MODERATION (เฉพาะ STAFF) ==================
@@ -264,18 +392,15 @@ def topic_moderation_list(request):
 
 @staff_required
 def topic_approve(request, pk):
-    topic = get_object_or_404(Topic, pk=pk)
-    topic.status = "approved"
-    topic.is_active = True
-    topic.save()
+    if not moderate("topic", [pk], "approve", request.user):
+        raise Http404()
     return redirect("community:topic_moderation_list")
 
 
 @staff_required
 def topic_reject(request, pk):
-    topic = get_object_or_404(Topic, pk=pk)
-    topic.status = "rejected"
-    topic.save()
+    if not moderate("topic", [pk], "reject", request.user):
+        raise Http404()
     return redirect("community:topic_moderation_list")
 
 
@@ -287,15 +412,13 @@ def review_moderation_list(request):
 
 @staff_required
 def review_approve(request, pk):
-    review = get_object_or_404(Review, pk=pk)
-    review.status = "approved"
-    review.save()
+    if not moderate("review", [pk], "approve", request.user):
+        raise Http404()
     return redirect("community:review_moderation_list")
 
 
 @staff_required
 def review_reject(request, pk):
-    review = get_object_or_404(Review, pk=pk)
-    review.status = "rejected"
-    review.save()
+    if not moderate("review", [pk], "reject", request.user):
+        raise Http404()
     return redirect("community:review_moderation_list")
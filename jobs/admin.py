@@ -0,0 +1,11 @@
+from django.contrib import admin
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ("id", "task", "key", "status", "attempts", "run_at", "started_at", "finished_at")
+    list_filter = ("status", "task")
+    search_fields = ("task", "key")
+    ordering = ("-id",)
+    readonly_fields = ("last_error",)
@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+
+
+class JobsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'jobs'
+
+    def ready(self):
+        # โหลด <app>/tasks.py ของทุกแอป เพื่อให้ @task ลงทะเบียนครบก่อน worker เริ่ม
+        from django.utils.module_loading import autodiscover_modules
+        autodiscover_modules("tasks")
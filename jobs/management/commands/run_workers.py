@@ -0,0 +1,70 @@
+import os
+import signal
+import socket
+import threading
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+
+from jobs.services import claim, execute, purge_finished, registered_tasks, requeue_stale
+
+
+class Command(BaseCommand):
+    help = "Run background job workers (DB-backed queue, no broker needed)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=2, help="Number of worker threads")
+        parser.add_argument("--poll", type=float, default=2.0, help="Seconds to sleep when the queue is empty")
+        parser.add_argument("--once", action="store_true", help="Drain due jobs then exit (cron / tests)")
+
+    def handle(self, *args, **options):
+        stop = threading.Event()
+        host = f"{socket.gethostname()}:{os.getpid()}"
+        counts = {"ok": 0, "failed": 0}
+        lock = threading.Lock()
+
+        def on_signal(signum, frame):
+            self.stdout.write("Stopping after current jobs...")
+            stop.set()
+
+        signal.signal(signal.SIGINT, on_signal)
+        signal.signal(signal.SIGTERM, on_signal)
+
+        stale = requeue_stale()
+        if stale:
+            self.stdout.write(f"Requeued {stale} stale job(s)")
+        purged = purge_finished()
+        if purged:
+            self.stdout.write(f"Purged {purged} finished job(s)")
+        self.stdout.write(f"Tasks: {', '.join(registered_tasks()) or '-'}")
+
+        def worker(n):
+            worker_id = f"{host}/{n}"
+            try:
+                while not stop.is_set():
+                    close_old_connections()
+                    job = claim(worker_id)
+                    if job is None:
+                        if options["once"]:
+                            return
+                        stop.wait(options["poll"])
+                        continue
+                    ok = execute(job)
+                    with lock:
+                        counts["ok" if ok else "failed"] += 1
+            finally:
+                connection.close()  # แต่ละ thread มี connection ของตัวเอง
+
+        threads = [
+            threading.Thread(target=worker, args=(i,), name=f"job-worker-{i}", daemon=True)
+            for i in range(max(1, options["concurrency"]))
+        ]
+        for t in threads:
+            t.start()
+        self.stdout.write(f"{len(threads)} worker(s) running on {host}")
+
+        while any(t.is_alive() for t in threads):
+            for t in threads:
+                t.join(timeout=0.5)
+
+        self.stdout.write(self.style.SUCCESS(f"Workers stopped: {counts['ok']} done, {counts['failed']} failed"))
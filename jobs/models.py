@@ -0,0 +1,46 @@
+# jobs/models.py
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """งานเบื้องหลัง 1 งาน (คิวเก็บในฐานข้อมูล ไม่ต้องมี broker แยก)"""
+
+    class Status(models.TextChoices):
+        QUEUED = "queued", "รอคิว"
+        RUNNING = "running", "กำลังทำ"
+        DONE = "done", "เสร็จ"
+        FAILED = "failed", "ล้มเหลว"
+
+    task = models.CharField(max_length=100)
+    kwargs = models.JSONField(default=dict, blank=True)
+    # งานที่ key ซ้ำกันจะมีได้แค่ 1 งานที่ยังไม่เสร็จ (queued/running)
+    key = models.CharField(max_length=200, null=True, blank=True)
+
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    last_error = models.TextField(blank=True)
+
+    run_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    locked_by = models.CharField(max_length=100, blank=True)
+
+    class Meta:
+        ordering = ["run_at", "id"]
+        indexes = [
+            models.Index(fields=["status", "run_at"], name="jobs_job_status_run_at"),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["key"],
+                condition=Q(status__in=["queued", "running"]),
+                name="jobs_job_active_key_uniq",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.task}#{self.pk} ({self.status})"
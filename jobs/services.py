@@ -0,0 +1,206 @@
+# jobs/services.py
+import logging
+import random
+import traceback
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Avg, Count, DurationField, ExpressionWrapper, F, Min, Q
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+BACKOFF_BASE_SECONDS = 10
+BACKOFF_MAX_SECONDS = 3600
+STALE_AFTER_MINUTES = 15  # running นานกว่านี้ถือว่า worker ตายไปแล้ว -> คืนเข้าคิว
+CLAIM_BATCH = 10
+STATS_WINDOW_HOURS = 1
+
+_registry: dict = {}
+
+
+# ================== ลงทะเบียน / ส่งงาน ==================
+def task(name: str | None = None, *, max_attempts: int = 5):
+    """
+    @task() ครอบฟังก์ชันใน <app>/tasks.py
+    - ชื่องานเริ่มต้น = "<module>.<function>"
+    - เรียก fn.delay(key=..., **kwargs) เพื่อเข้าคิว (kwargs ต้องเป็น JSON ได้)
+    """
+    def deco(fn):
+        task_name = name or f"{fn.__module__}.{fn.__name__}"
+        _registry[task_name] = (fn, max_attempts)
+
+        def delay(*, key: str | None = None, countdown: int = 0, **kwargs):
+            return enqueue(task_name, key=key, countdown=countdown, **kwargs)
+
+        fn.task_name = task_name
+        fn.delay = delay
+        return fn
+    return deco
+
+
+def registered_tasks():
+    return sorted(_registry)
+
+
+def enqueue(task_name: str, *, key: str | None = None, countdown: int = 0, **kwargs):
+    """
+    ส่งงานเข้าคิว คืน Job
+    - มี key แล้วมีงาน key เดียวกันที่ยังไม่เสร็จ -> คืนงานเดิม (ไม่สร้างซ้ำ)
+    """
+    if task_name not in _registry:
+        raise KeyError(f"unknown task {task_name!r}")
+    _, max_attempts = _registry[task_name]
+
+    job = Job(
+        task=task_name,
+        kwargs=kwargs,
+        key=key,
+        max_attempts=max_attempts,
+        run_at=timezone.now() + timedelta(seconds=countdown),
+    )
+    if key is None:
+        job.save()
+        return job
+
+    try:
+        with transaction.atomic():
+            job.save()
+        return job
+    except IntegrityError:
+        existing = Job.objects.filter(key=key, status__in=[Job.Status.QUEUED, Job.Status.RUNNING]).first()
+        if existing is None:  # งานเดิมเพิ่งจบพอดี -> ลองใหม่อีกครั้ง
+            job.pk = None
+            job.save()
+            return job
+        return existing
+
+
+# ================== worker ==================
+def claim(worker_id: str):
+    """
+    หยิบงานที่ถึงเวลาแล้ว 1 งาน
+    ใช้ UPDATE ... WHERE id = ? AND status = 'queued' (compare-and-swap)
+    -> หลาย worker แย่งกันได้อย่างปลอดภัยทั้งบน Postgres และ SQLite
+    """
+    now = timezone.now()
+    due = list(
+        Job.objects.filter(status=Job.Status.QUEUED, run_at__lte=now)
+        .order_by("run_at", "id")
+        .values_list("pk", flat=True)[:CLAIM_BATCH]
+    )
+    for pk in due:
+        won = Job.objects.filter(pk=pk, status=Job.Status.QUEUED).update(
+            status=Job.Status.RUNNING,
+            locked_by=worker_id,
+            started_at=now,
+            attempts=F("attempts") + 1,
+        )
+        if won:
+            return Job.objects.get(pk=pk)
+    return None
+
+
+def backoff_seconds(attempts: int) -> float:
+    """exponential backoff + jitter: 10s, 20s, 40s, ... สูงสุด 1 ชม."""
+    delay = min(BACKOFF_BASE_SECONDS * (2 ** max(attempts - 1, 0)), BACKOFF_MAX_SECONDS)
+    return delay * random.uniform(0.8, 1.2)
+
+
+def _finish(job: Job, **values) -> bool:
+    """
+    บันทึกผลเฉพาะตอนที่งานยังเป็นของ worker นี้ (RUNNING + locked_by เดิม)
+    ถ้า requeue_stale คืนงานเข้าคิวแล้ว worker อื่นหยิบไป -> ไม่เขียนทับสถานะของเขา
+    """
+    updated = Job.objects.filter(pk=job.pk, status=Job.Status.RUNNING, locked_by=job.locked_by).update(**values)
+    if not updated:
+        logger.warning("job %s is no longer held by %s, result discarded", job, job.locked_by)
+    return bool(updated)
+
+
+def execute(job: Job):
+    """รันงานที่ claim มาแล้ว แล้วบันทึกผล (สำเร็จ / รอ retry / ล้มเหลวถาวร)"""
+    entry = _registry.get(job.task)
+    try:
+        if entry is None:
+            raise KeyError(f"unknown task {job.task!r}")
+        entry[0](**job.kwargs)
+    except Exception:
+        err = traceback.format_exc(limit=5)
+        logger.warning("job %s failed (attempt %s/%s)", job, job.attempts, job.max_attempts)
+        if entry is not None and job.attempts < job.max_attempts:
+            _finish(
+                job,
+                status=Job.Status.QUEUED,
+                run_at=timezone.now() + timedelta(seconds=backoff_seconds(job.attempts)),
+                last_error=err,
+                locked_by="",
+            )
+        else:
+            _finish(job, status=Job.Status.FAILED, finished_at=timezone.now(), last_error=err)
+        return False
+
+    _finish(job, status=Job.Status.DONE, finished_at=timezone.now(), last_error="")
+    return True
+
+
+def requeue_stale(minutes: int = STALE_AFTER_MINUTES) -> int:
+    """
+    งานที่ RUNNING นานเกินไป (worker ตาย) -> คืนเข้าคิว
+    ใช้ครบ max_attempts แล้ว (เช่น งานที่ทำ worker ตายทุกครั้ง: OOM) -> FAILED ไม่วนคืนคิวตลอดไป
+    """
+    now = timezone.now()
+    stale = Job.objects.filter(status=Job.Status.RUNNING, started_at__lt=now - timedelta(minutes=minutes))
+    failed = stale.filter(attempts__gte=F("max_attempts")).update(
+        status=Job.Status.FAILED, locked_by="", finished_at=now,
+        last_error=f"worker stopped responding (running > {minutes} min)",
+    )
+    if failed:
+        logger.warning("marked %s stale job(s) failed after max attempts", failed)
+    return stale.update(status=Job.Status.QUEUED, locked_by="", run_at=now)
+
+
+def purge_finished(days: int = 7) -> int:
+    cutoff = timezone.now() - timedelta(days=days)
+    deleted, _ = Job.objects.filter(status=Job.Status.DONE, finished_at__lt=cutoff).delete()
+    return deleted
+
+
+# ================== สถิติสำหรับหน้า staff ==================
+def queue_stats(hours: int = STATS_WINDOW_HOURS) -> dict:
+    now = timezone.now()
+    since = now - timedelta(hours=hours)
+
+    depth = dict(Job.objects.order_by().values_list("status").annotate(n=Count("id")))
+
+    per_task = list(
+        Job.objects.filter(status__in=[Job.Status.QUEUED, Job.Status.RUNNING])
+        .order_by().values("task")
+        .annotate(
+            queued=Count("id", filter=Q(status=Job.Status.QUEUED)),
+            running=Count("id", filter=Q(status=Job.Status.RUNNING)),
+            oldest=Min("run_at", filter=Q(status=Job.Status.QUEUED)),
+        )
+        .order_by("-queued")
+    )
+    for row in per_task:
+        row["oldest_age"] = (now - row["oldest"]) if row["oldest"] else None
+
+    wait = ExpressionWrapper(F("started_at") - F("run_at"), output_field=DurationField())
+    runtime = ExpressionWrapper(F("finished_at") - F("started_at"), output_field=DurationField())
+    recent = (
+        Job.objects.filter(status=Job.Status.DONE, finished_at__gte=since)
+        .order_by().values("task")
+        .annotate(done=Count("id"), avg_wait=Avg(wait), avg_runtime=Avg(runtime))
+        .order_by("-done")
+    )
+
+    return {
+        "depth": {s: depth.get(s, 0) for s in Job.Status.values},
+        "per_task": per_task,
+        "recent": list(recent),
+        "failures": Job.objects.filter(status=Job.Status.FAILED).order_by("-finished_at")[:20],
+        "hours": hours,
+    }
@@ -0,0 +1,121 @@
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from .models import Job
+from .services import claim, enqueue, execute, requeue_stale, task
+
+calls = []
+
+
+@task("jobs.tests.record")
+def record(value):
+    calls.append(value)
+
+
+@task("jobs.tests.explode", max_attempts=2)
+def explode():
+    raise RuntimeError("พัง")
+
+
+class EnqueueTests(TestCase):
+
+    def test_same_key_returns_active_job(self):
+        first = record.delay(key="k", value=1)
+        second = record.delay(key="k", value=2)
+        self.assertEqual(second.pk, first.pk)
+        self.assertEqual(Job.objects.count(), 1)
+
+    def test_key_is_free_again_after_job_finishes(self):
+        first = record.delay(key="k", value=1)
+        Job.objects.filter(pk=first.pk).update(status=Job.Status.DONE)
+        second = record.delay(key="k", value=2)
+        self.assertNotEqual(second.pk, first.pk)
+        self.assertEqual(Job.objects.filter(key="k").count(), 2)
+
+    def test_without_key_is_not_deduplicated(self):
+        record.delay(value=1)
+        record.delay(value=1)
+        self.assertEqual(Job.objects.count(), 2)
+
+    def test_unknown_task(self):
+        with self.assertRaises(KeyError):
+            enqueue("jobs.tests.missing")
+
+
+class ClaimTests(TestCase):
+
+    def setUp(self):
+        calls.clear()
+
+    def test_claims_oldest_due_job_once(self):
+        later = record.delay(value="later", countdown=60)
+        first = record.delay(value="first")
+        second = record.delay(value="second")
+
+        job = claim("w1")
+        self.assertEqual(job.pk, first.pk)
+        self.assertEqual((job.status, job.locked_by, job.attempts), (Job.Status.RUNNING, "w1", 1))
+        self.assertEqual(claim("w2").pk, second.pk)
+        self.assertIsNone(claim("w3"))  # later ยังไม่ถึงเวลา, งานที่ถูกหยิบแล้วห้ามหยิบซ้ำ
+        self.assertEqual(Job.objects.get(pk=later.pk).status, Job.Status.QUEUED)
+
+    def test_execute_success(self):
+        record.delay(value=1)
+        self.assertTrue(execute(claim("w1")))
+        self.assertEqual(calls, [1])
+        self.assertEqual(Job.objects.get().status, Job.Status.DONE)
+
+    def test_retry_with_backoff_then_fail(self):
+        job = explode.delay()
+        with self.assertLogs("jobs.services", "WARNING"):
+            self.assertFalse(execute(claim("w1")))
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.QUEUED)
+        self.assertGreater(job.run_at, timezone.now())
+        self.assertIn("RuntimeError", job.last_error)
+
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        with self.assertLogs("jobs.services", "WARNING"):
+            execute(claim("w1"))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.Status.FAILED, 2))
+
+    def test_requeue_stale(self):
+        record.delay(value=1)
+        job = claim("w1")
+        Job.objects.filter(pk=job.pk).update(started_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(requeue_stale(minutes=15), 1)
+        self.assertEqual(claim("w2").pk, job.pk)
+
+    def test_stale_worker_does_not_overwrite_new_owner(self):
+        record.delay(value=1)
+        slow = claim("w1")
+        Job.objects.filter(pk=slow.pk).update(started_at=timezone.now() - timedelta(hours=1))
+        requeue_stale(minutes=15)
+        fresh = claim("w2")  # worker 1 ยังไม่ตาย แค่ช้า
+
+        with self.assertLogs("jobs.services", "WARNING"):
+            execute(slow)
+        job = Job.objects.get(pk=slow.pk)
+        self.assertEqual((job.status, job.locked_by), (Job.Status.RUNNING, "w2"))
+        execute(fresh)
+        self.assertEqual(Job.objects.get(pk=slow.pk).status, Job.Status.DONE)
+
+    def test_stale_job_fails_after_max_attempts(self):
+        job = explode.delay()  # max_attempts=2
+
+        def crash():
+            # worker ตายระหว่างทำ (OOM) -> งานค้าง RUNNING
+            claim("w1")
+            Job.objects.filter(pk=job.pk).update(started_at=timezone.now() - timedelta(hours=1))
+
+        crash()
+        self.assertEqual(requeue_stale(minutes=15), 1)
+        crash()
+        with self.assertLogs("jobs.services", "WARNING"):
+            self.assertEqual(requeue_stale(minutes=15), 0)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.Status.FAILED, 2))
+        self.assertIsNone(claim("w1"))
@@ -0,0 +1,8 @@
+from django.urls import path
+from . import views
+
+app_name = "jobs"
+
+urlpatterns = [
+    path("", views.queue_dashboard, name="dashboard"),
+]
@@ -0,0 +1,15 @@
+# jobs/views.py
+from django.contrib.admin.views.decorators import staff_member_required
+from django.shortcuts import render
+
+from .services import queue_stats
+
+
+@staff_member_required
+def queue_dashboard(request):
+    """หน้า staff: ความยาวคิว, งานค้างนานสุด, เวลารอ/เวลารันเฉลี่ย, งานที่ล้มเหลวล่าสุด"""
+    try:
+        hours = max(1, min(int(request.GET.get("hours") or 1), 168))
+    except ValueError:
+        hours = 1
+    return render(request, "jobs/dashboard.html", queue_stats(hours))
@@ -47,15 +47,22 @@ INSTALLED_APPS = [
     'plan',
     'community',
     'searches',
+    'moderation',
+    'mediafiles',
+    'jobs',
+    'perf',
+    'caching',
 
 ]
 
 MIDDLEWARE = [
+    'perf.middleware.PerformanceMiddleware',  # อยู่บนสุด -> วัดรวม middleware ตัวอื่นด้วย
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'perf.middleware.ProfilerMiddleware',  # ?_profile=1 (staff) ต้องอยู่หลัง Authentication
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -72,6 +79,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'moderation.context_processors.moderation',
             ],
         },
     },
@@ -158,3 +166,102 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# ไฟล์อัปโหลดเก็บแบบ content-addressed (cas/ab/cd/<sha256>.<ext>) ดู mediafiles/storage.py
+STORAGES = {
+    "default": {"BACKEND": "mediafiles.storage.ContentAddressedStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+}
+
+# การเสิร์ฟ /media/ (mediafiles.views.serve_media)
+# None = Django ส่งไฟล์เอง, "x-accel-redirect" = nginx, "x-sendfile" = Apache/lighttpd
+MEDIA_SENDFILE = os.environ.get("MEDIA_SENDFILE") or None
+MEDIA_ACCEL_REDIRECT_PREFIX = "/_protected_media/"  # nginx: location /_protected_media/ { internal; alias <MEDIA_ROOT>/; }
+MEDIA_CACHE_MAX_AGE = 24 * 3600  # ไฟล์ที่ไม่ใช่ cas/ (cas/ เป็น immutable 1 ปี)
+
+# วัดประสิทธิภาพราย request (perf/middleware.py): Server-Timing (เฉพาะ staff) + log JSON ที่ logger "perf.request"
+# None = ตาม DEBUG ตอนรัน (test runner ตั้ง DEBUG=False -> เทสต์ไม่วัด/ไม่ log)
+PERF_INSTRUMENTATION = None
+PERF_SERVER_TIMING = None
+PERF_IGNORE_PATHS = (MEDIA_URL, "/static/")
+PERF_DEFAULT_THRESHOLDS = {"queries": 50, "total_ms": 1000}
+# เกณฑ์ราย view (key = path ของฟังก์ชัน หรือชื่อ url) เกิน -> log WARNING
+PERF_THRESHOLDS = {
+    "budgets.views.budget_table": {"queries": 35, "total_ms": 500},
+    "budgets.views.day_detail": {"queries": 10},
+    "plan.views.mealplan_summary": {"queries": 20, "total_ms": 800},
+    "plan.views.save_plan": {"queries": 40},
+    "restaurants.views.restaurant_detail": {"queries": 10},
+    "community.views.topic_detail": {"queries": 15},
+    "community.views.topic_list": {"queries": 10},
+    "menus.views.menu_list": {"queries": 15},
+}
+
+# cache กลาง (caching/services.py): CACHE_BACKEND = redis / file / locmem
+# เวอร์ชัน (invalidate) และล็อก single-flight อยู่ใน cache -> ต้องใช้ร่วมกันทุก worker (รวม run_workers)
+# locmem แยกต่อ process: ใช้ได้แค่ตอน dev (DEBUG) -> manage.py check --deploy เตือน caching.W001
+_CACHE_BACKEND = os.environ.get("CACHE_BACKEND") or ("locmem" if DEBUG else "file")
+if _CACHE_BACKEND == "redis":
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ.get("REDIS_URL", "redis://127.0.0.1:6379/1"),
+            "KEY_PREFIX": "mealmatchy",
+        }
+    }
+elif _CACHE_BACKEND == "file":
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": os.environ.get("CACHE_DIR") or "/var/tmp/mealmatchy-cache",
+            "OPTIONS": {"MAX_ENTRIES": 20000},
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "mealmatchy",
+            "OPTIONS": {"MAX_ENTRIES": 5000},
+        }
+    }
+APP_CACHE_ALIAS = "default"  # cache ที่ caching/services.py ใช้
+# แก้/ลบแถวของโมเดลเหล่านี้ -> เวอร์ชันใน cache เพิ่ม (caching/signals.py) -> cache ที่ขึ้นกับมันหมดอายุทันที
+# ต่อ post_delete แล้ว queryset.delete() จะต้อง SELECT ทุกแถวก่อนลบ -> โมเดลที่ลบเป็นชุดใช้แค่ "save"
+# แล้วเรียก caching.services.bump() เองตรงที่ลบ/bulk_create
+CACHE_VERSIONED_MODELS = {
+    "menus.Menu": ("save", "delete"),
+    "restaurants.Restaurant": ("save", "delete"),
+    "budgets.MealPlan": ("save", "delete"),
+    "budgets.DailyBudget": ("save",),
+    "budgets.BudgetSpend": ("save",),
+}
+
+# profiler ตามสั่งสำหรับ staff (?_profile=1 หรือ header X-Profile: 1) -> รายงาน + ไฟล์ .prof/.json
+PERF_PROFILER = True
+PERF_PROFILE_DIR = os.environ.get("PERF_PROFILE_DIR") or os.path.join(BASE_DIR, "profiles")
+
+# slow query log (perf/slowlog.py): query ที่ช้ากว่านี้ -> JSON ลงไฟล์ PERF_SLOW_QUERY_LOG, None = ปิด
+# สรุปด้วย python manage.py slow_queries
+PERF_SLOW_QUERY_MS = 100
+PERF_SLOW_QUERY_LOG = os.environ.get("PERF_SLOW_QUERY_LOG") or os.path.join(BASE_DIR, "slow_sql.log")
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+        "slow_sql_file": {
+            "class": "logging.handlers.RotatingFileHandler",
+            "filename": PERF_SLOW_QUERY_LOG,
+            "maxBytes": 20 * 1024 * 1024,
+            "backupCount": 5,
+            "encoding": "utf-8",
+            "delay": True,  # ยังไม่มี query ช้า = ยังไม่สร้างไฟล์
+        },
+    },
+    "loggers": {
+        "perf": {"handlers": ["console"], "level": "INFO", "propagate": False},
+        # บรรทัดละหนึ่ง JSON ในไฟล์ (slow_queries อ่านไฟล์นี้) ไม่ส่งต่อไป console
+        "perf.slow_sql": {"handlers": ["slow_sql_file"], "level": "WARNING", "propagate": False},
+    },
+}
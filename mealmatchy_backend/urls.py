@@ -1,10 +1,13 @@
 # mealmatchy_backend/urls.py
 from django.contrib import admin
-from django.urls import path, include
+import re
+
+from django.urls import path, include, re_path
 from django.views.generic import RedirectView
 from django.conf import settings
 from django.conf.urls.static import static
 from accounts.views import home_view  # <- เพิ่มบรรทัดนี้
+from mediafiles.views import serve_media
 
 urlpatterns = [
 
@@ -23,6 +26,8 @@ urlpatterns = [
     path('recipes/', include(('recipes.urls', 'recipes'), namespace='recipes')),
     path('restaurants/', include(('restaurants.urls', 'restaurants'), namespace='restaurants')),
     path('community/', include(('community.urls', 'community'), namespace='community')),
+    path('moderation/', include(('moderation.urls', 'moderation'), namespace='moderation')),
+    path('jobs/', include(('jobs.urls', 'jobs'), namespace='jobs')),
 
 
     path('register/', RedirectView.as_view(pattern_name='register', permanent=False)),
@@ -30,9 +35,10 @@ urlpatterns = [
     path('logout/', RedirectView.as_view(pattern_name='logout', permanent=False)),
 
     path("", include("searches.urls")),
-    
+
+    # ไฟล์อัปโหลด: ETag / Range / cache ยาว (ดู mediafiles/views.py) ใช้ได้ทั้ง DEBUG และ production
+    re_path(r"^%s(?P<path>.+)$" % re.escape(settings.MEDIA_URL.lstrip("/")), serve_media, name="media"),
 ]
 
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
\ No newline at end of file
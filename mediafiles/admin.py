@@ -0,0 +1,10 @@
+from django.contrib import admin
+from .models import MediaBlob
+
+
+@admin.register(MediaBlob)
+class MediaBlobAdmin(admin.ModelAdmin):
+    list_display = ("name", "size", "refcount", "created_at")
+    list_filter = ("created_at",)
+    search_fields = ("name", "sha256")
+    ordering = ("-created_at",)
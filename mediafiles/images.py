@@ -0,0 +1,138 @@
+# mediafiles/images.py
+"""
+สร้างรูปย่อ (derivative) จากรูปที่ผู้ใช้อัปโหลด
+- ขนาด thumb / card / full (จำกัดความกว้าง ไม่ขยายรูปเล็ก)
+- แต่ละขนาดมี WebP + JPEG (fallback) และตัด EXIF / metadata ออก
+- เก็บไว้ที่ derivatives/<path เดิมไม่รวมนามสกุล>/<size>.<webp|jpg>
+"""
+import logging
+import os
+from io import BytesIO
+
+from django.apps import apps
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+logger = logging.getLogger(__name__)
+
+# (app_label, model, field) ของทุก ImageField ที่ต้องมีรูปย่อ
+IMAGE_FIELDS = (
+    ("menus", "Menu", "image"),
+    ("recipes", "Recipe", "image"),
+    ("restaurants", "Restaurant", "image"),
+    ("community", "Topic", "cover_image"),
+    ("community", "Review", "image"),
+    ("accounts", "Profile", "profile_picture"),
+)
+
+SIZES = {
+    "thumb": 160,
+    "card": 480,
+    "full": 1280,
+}
+FORMATS = ("webp", "jpg")
+DERIVATIVE_ROOT = "derivatives"
+
+# รูปย่อใช้ชื่อไฟล์ตายตัว -> ใช้ FileSystemStorage ตรง ๆ (ไม่ผ่าน ContentAddressedStorage)
+derivative_storage = FileSystemStorage()
+WEBP_QUALITY = 80
+JPEG_QUALITY = 82
+
+
+def image_fields():
+    """[(model class, field name)] ตาม IMAGE_FIELDS"""
+    return [(apps.get_model(app, model), field) for app, model, field in IMAGE_FIELDS]
+
+
+def derivative_name(name: str, size: str, fmt: str) -> str:
+    stem = os.path.splitext(name)[0]
+    return f"{DERIVATIVE_ROOT}/{stem}/{size}.{fmt}"
+
+
+def derivative_names(name: str) -> list[str]:
+    return [derivative_name(name, size, fmt) for size in SIZES for fmt in FORMATS]
+
+
+def has_derivatives(name: str, storage=derivative_storage) -> bool:
+    # ไฟล์สุดท้ายที่ build_derivatives เขียน -> มีไฟล์นี้แปลว่าครบทุกขนาด
+    return bool(name) and storage.exists(derivative_name(name, "full", "jpg"))
+
+
+def _resized(im: Image.Image, width: int) -> Image.Image:
+    if im.width > width:
+        height = max(1, round(im.height * width / im.width))
+        out = im.resize((width, height), Image.Resampling.LANCZOS)
+    else:
+        out = im.copy()
+    out.info = {}  # ไม่พา EXIF / ICC / comment ติดไปกับไฟล์ใหม่
+    return out
+
+
+def _flatten(im: Image.Image) -> Image.Image:
+    """JPEG ไม่มี alpha -> วางบนพื้นขาว"""
+    if im.mode in ("RGBA", "LA") or (im.mode == "P" and "transparency" in im.info):
+        im = im.convert("RGBA")
+        bg = Image.new("RGB", im.size, (255, 255, 255))
+        bg.paste(im, mask=im.getchannel("A"))
+        return bg
+    return im.convert("RGB")
+
+
+def _encode(im: Image.Image, fmt: str) -> bytes:
+    buf = BytesIO()
+    if fmt == "webp":
+        mode = "RGBA" if "A" in im.getbands() else "RGB"
+        im.convert(mode).save(buf, "WEBP", quality=WEBP_QUALITY, method=4)
+    else:
+        _flatten(im).save(buf, "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+    return buf.getvalue()
+
+
+def build_derivatives(name: str, *, force: bool = False, storage=derivative_storage) -> int:
+    """
+    สร้างรูปย่อทุกขนาดของไฟล์ชื่อ name คืนจำนวนไฟล์ที่เขียน (0 = มีอยู่แล้ว/เปิดรูปไม่ได้)
+    """
+    if not name or (not force and has_derivatives(name, storage)):
+        return 0
+
+    try:
+        with storage.open(name, "rb") as fh:
+            im = Image.open(fh)
+            im.load()
+    except (FileNotFoundError, UnidentifiedImageError, OSError) as exc:
+        logger.warning("skip derivatives for %s: %s", name, exc)
+        return 0
+
+    im = ImageOps.exif_transpose(im)  # หมุนตาม EXIF ก่อน แล้วค่อยทิ้ง EXIF
+    if im.mode not in ("RGB", "RGBA"):
+        im = im.convert("RGBA" if "transparency" in im.info or im.mode in ("LA", "PA") else "RGB")
+
+    written = 0
+    # full/jpg เขียนท้ายสุดเสมอ (ใช้เป็นตัวบอกว่าสร้างครบแล้ว)
+    for size, width in sorted(SIZES.items(), key=lambda kv: kv[1]):
+        resized = _resized(im, width)
+        for fmt in ("webp", "jpg"):
+            target = derivative_name(name, size, fmt)
+            if storage.exists(target):
+                storage.delete(target)
+            storage.save(target, ContentFile(_encode(resized, fmt)))
+            written += 1
+    return written
+
+
+def delete_derivatives(name: str, storage=derivative_storage) -> int:
+    removed = 0
+    for target in derivative_names(name):
+        if storage.exists(target):
+            storage.delete(target)
+            removed += 1
+    return removed
+
+
+def derivative_urls(name: str, storage=derivative_storage) -> dict:
+    """{size: {fmt: url}}"""
+    return {
+        size: {fmt: storage.url(derivative_name(name, size, fmt)) for fmt in FORMATS}
+        for size in SIZES
+    }
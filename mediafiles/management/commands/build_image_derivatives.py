@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from mediafiles.images import build_derivatives, image_fields
+
+
+class Command(BaseCommand):
+    help = "Generate thumb/card/full WebP + JPEG derivatives for every uploaded image (skips ones already built)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--force", action="store_true", help="Rebuild even if derivatives exist")
+        parser.add_argument("--model", help="Only this model, e.g. menus.Menu")
+
+    def handle(self, *args, **options):
+        total = 0
+        for model, field in image_fields():
+            if options["model"] and model._meta.label_lower != options["model"].lower():
+                continue
+
+            built = files = 0
+            rows = model.objects.exclude(**{field: ""}).exclude(**{f"{field}__isnull": True}).only("pk", field)
+            for obj in rows.iterator(chunk_size=200):
+                n = build_derivatives(getattr(obj, field).name, force=options["force"])
+                if n:
+                    built += 1
+                    files += n
+            total += files
+            self.stdout.write(f"{model._meta.label}.{field}: {built} image(s), {files} file(s) written")
+
+        self.stdout.write(self.style.SUCCESS(f"Done: {total} derivative file(s) written"))
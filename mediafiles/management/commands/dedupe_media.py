@@ -0,0 +1,77 @@
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db.models import Count
+
+from django.core.management.base import BaseCommand
+
+from mediafiles.images import derivative_storage, image_fields
+from mediafiles.models import MediaBlob
+from mediafiles.services import add_ref
+from mediafiles.storage import CAS_ROOT, is_cas_name
+
+
+class Command(BaseCommand):
+    help = (
+        "Move existing uploads into content-addressed storage (one blob per distinct file) "
+        "and repoint ImageField values; --recount rebuilds refcounts from the database"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true")
+        parser.add_argument("--recount", action="store_true", help="Only recompute MediaBlob.refcount")
+
+    def handle(self, *args, **options):
+        if options["recount"]:
+            self.recount()
+            return
+
+        dry = options["dry_run"]
+        moved = rows = dup_bytes = 0
+        seen = {}  # cas name -> True (เจอแล้วในรอบนี้)
+
+        for model, field in image_fields():
+            names = (
+                model.objects.exclude(**{field: ""}).exclude(**{f"{field}__isnull": True})
+                .exclude(**{f"{field}__startswith": CAS_ROOT + "/"})
+                .order_by().values_list(field, flat=True).distinct()
+            )
+            for name in names.iterator(chunk_size=500):
+                if not derivative_storage.exists(name):
+                    self.stderr.write(f"missing: {name}")
+                    continue
+
+                size = derivative_storage.size(name)
+                if dry:
+                    moved += 1
+                    continue
+
+                with derivative_storage.open(name, "rb") as fh:
+                    target = default_storage.save(name, File(fh))
+                if target in seen:
+                    dup_bytes += size
+                seen[target] = True
+
+                n = model.objects.filter(**{field: name}).update(**{field: target})
+                add_ref(target, n)
+                moved += 1
+                rows += n
+
+            self.stdout.write(f"{model._meta.label}.{field}: done")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{moved} file(s) {'would be ' if dry else ''}moved into {CAS_ROOT}/, {rows} row(s) repointed, "
+            f"{dup_bytes / 1024 / 1024:.1f} MB of duplicates collapsed (old files: run gc_media)"
+        ))
+
+    def recount(self):
+        MediaBlob.objects.update(refcount=0)
+        total = 0
+        for model, field in image_fields():
+            counts = (
+                model.objects.filter(**{f"{field}__startswith": CAS_ROOT + "/"})
+                .order_by().values_list(field).annotate(n=Count("pk"))
+            )
+            for name, n in counts.iterator():
+                if is_cas_name(name):
+                    total += add_ref(name, n)
+        self.stdout.write(self.style.SUCCESS(f"Refcounts rebuilt for {total} blob reference group(s)"))
@@ -0,0 +1,228 @@
+import os
+import shutil
+import time
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import models
+from django.db.models import Count
+from django.utils import timezone
+
+from mediafiles.images import DERIVATIVE_ROOT
+from mediafiles.models import MediaBlob
+from mediafiles.storage import CAS_ROOT, is_cas_name
+
+DEFAULT_GRACE_HOURS = 24
+BLOB_DELETE_BATCH = 500
+
+
+def file_fields():
+    """[(model, field name)] ของทุก FileField/ImageField ในทุกแอป"""
+    return [
+        (model, f.name)
+        for model in apps.get_models()
+        for f in model._meta.concrete_fields
+        if isinstance(f, models.FileField)
+    ]
+
+
+def referenced_stems() -> set[str]:
+    """
+    ชื่อไฟล์ (ตัดนามสกุล) ที่ยังมีแถวอ้างถึง
+    เก็บเฉพาะ stem -> ใช้ set เดียวเช็คได้ทั้งไฟล์ต้นฉบับและ derivatives/<stem>/…
+    """
+    stems = set()
+    for model, field in file_fields():
+        names = (
+            model._base_manager.exclude(**{field: ""}).exclude(**{f"{field}__isnull": True})
+            .order_by().values_list(field, flat=True)
+        )
+        for name in names.iterator(chunk_size=2000):
+            stems.add(os.path.splitext(name)[0])
+    return stems
+
+
+def referenced_counts(names: list[str]) -> dict[str, int]:
+    """{ชื่อไฟล์: จำนวนแถวที่อ้างถึงจริง} ของชื่อชุดนี้ (1 query ต่อ FileField)"""
+    counts = {}
+    for model, field in file_fields():
+        rows = (
+            model._base_manager.filter(**{f"{field}__in": names})
+            .order_by().values_list(field).annotate(n=Count("pk"))
+        )
+        for name, n in rows:
+            counts[name] = counts.get(name, 0) + n
+    return counts
+
+
+def walk_files(root: str, skip: set[str]):
+    """เดินทุกไฟล์ใต้ root ด้วย os.scandir (ไม่ recursion, ไม่ list ทั้งโฟลเดอร์เข้าหน่วยความจำ)"""
+    stack = [root]
+    while stack:
+        try:
+            it = os.scandir(stack.pop())
+        except OSError:
+            continue
+        with it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.path not in skip:
+                        stack.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    yield entry
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete (or quarantine) MediaBlobs with refcount 0 and other files under MEDIA_ROOT that no "
+        "FileField/ImageField references, including derivatives; files newer than the grace period are kept"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Only report what would be removed")
+        parser.add_argument(
+            "--grace-hours", type=float, default=DEFAULT_GRACE_HOURS,
+            help=f"Keep files modified within this many hours (default {DEFAULT_GRACE_HOURS})",
+        )
+        parser.add_argument(
+            "--quarantine", nargs="?", const="", default=None, metavar="DIR",
+            help="Move files here instead of deleting (default: <MEDIA_ROOT>-quarantine)",
+        )
+        parser.add_argument(
+            "--scan-cas", action="store_true",
+            help=f"Also walk {CAS_ROOT}/ on disk (finds blob files that have no MediaBlob row)",
+        )
+
+    def remove(self, root, name, quarantine, dry) -> int:
+        """ลบ/ย้ายไฟล์หรือโฟลเดอร์ name (relative กับ root) คืนจำนวนไบต์ (0 = ไม่มีไฟล์)"""
+        path = os.path.join(root, name)
+        if os.path.isdir(path):
+            size = sum(e.stat(follow_symlinks=False).st_size for e in walk_files(path, set()))
+        else:
+            try:
+                size = os.stat(path).st_size
+            except FileNotFoundError:
+                return 0
+        if self.verbose:
+            self.stdout.write(f"  {name}")
+        if dry:
+            return size
+        if quarantine:
+            dest = os.path.join(quarantine, name)
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            shutil.move(path, dest)
+        elif os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        return size
+
+    def collect_blobs(self, root, cutoff, created_before, quarantine, dry) -> dict:
+        """
+        blob ที่ refcount <= 0 (ไม่ต้องเดินทั้ง cas/ บนดิสก์)
+        ยืนยันกับ DB อีกชั้นก่อนลบ: ถ้ายังมีแถวอ้างถึง (refcount เพี้ยน) -> แก้ refcount แทนการลบ
+        """
+        stats = {"blobs": 0, "bytes": 0, "young": 0, "repaired": 0}
+        last_id = 0
+        while True:
+            batch = list(
+                MediaBlob.objects.filter(id__gt=last_id, refcount__lte=0, created_at__lt=created_before)
+                .order_by("id").values_list("id", "name")[:BLOB_DELETE_BATCH]
+            )
+            if not batch:
+                break
+            last_id = batch[-1][0]
+            live = referenced_counts([name for _, name in batch])
+
+            dead = []
+            for blob_id, name in batch:
+                if name in live:
+                    stats["repaired"] += 1
+                    if not dry:
+                        MediaBlob.objects.filter(id=blob_id).update(refcount=live[name])
+                    continue
+                try:
+                    if os.stat(os.path.join(root, name)).st_mtime > cutoff:
+                        stats["young"] += 1  # เพิ่งอัปโหลดเนื้อหาเดิมซ้ำ (storage แตะ mtime) แถวยังไม่ถูก save
+                        continue
+                except FileNotFoundError:
+                    pass
+                stats["bytes"] += self.remove(root, name, quarantine, dry)
+                stats["bytes"] += self.remove(root, f"{DERIVATIVE_ROOT}/{os.path.splitext(name)[0]}", quarantine, dry)
+                dead.append(blob_id)
+
+            stats["blobs"] += len(dead)
+            if dead and not dry:
+                MediaBlob.objects.filter(id__in=dead, refcount__lte=0).delete()
+        return stats
+
+    def handle(self, *args, **options):
+        root = os.path.normpath(str(settings.MEDIA_ROOT))
+        dry = options["dry_run"]
+        quarantine = options["quarantine"]
+        if quarantine == "":
+            quarantine = root + "-quarantine"
+        cutoff = time.time() - options["grace_hours"] * 3600
+
+        self.verbose = options["verbosity"] > 1
+
+        # 1) blob ใน cas/ ตัดสินจาก refcount
+        created_before = timezone.now() - timedelta(hours=options["grace_hours"])
+        blobs = self.collect_blobs(root, cutoff, created_before, quarantine, dry)
+
+        # 2) ไฟล์ชื่อแบบเก่า + derivatives ที่ต้นฉบับหายไป: เดินดิสก์ (ข้าม cas/ ถ้าไม่ได้ขอ --scan-cas)
+        stems = referenced_stems()
+        self.stdout.write(f"{len(stems)} referenced file(s) in the database")
+
+        derivative_prefix = DERIVATIVE_ROOT + "/"
+        skip = {os.path.normpath(quarantine)} if quarantine else set()
+        if not options["scan_cas"]:
+            skip.add(os.path.join(root, CAS_ROOT))
+        scanned = removed = reclaimed = young = 0
+        blob_names = []
+
+        for entry in walk_files(root, skip):
+            scanned += 1
+            name = os.path.relpath(entry.path, root).replace(os.sep, "/")
+
+            if name.startswith(derivative_prefix):
+                # derivatives/<stem>/<size>.<fmt> -> ต้นฉบับคือ <stem>.*
+                stem = name[len(derivative_prefix):].rsplit("/", 1)[0]
+            else:
+                stem = os.path.splitext(name)[0]
+            if stem in stems:
+                continue
+
+            st = entry.stat(follow_symlinks=False)
+            if st.st_mtime > cutoff:
+                young += 1  # อาจเพิ่งอัปโหลด แถวยังไม่ถูก save
+                continue
+
+            removed += 1
+            reclaimed += self.remove(root, name, quarantine, dry)
+            if dry:
+                continue
+
+            if is_cas_name(name):
+                blob_names.append(name)
+                if len(blob_names) >= BLOB_DELETE_BATCH:
+                    MediaBlob.objects.filter(name__in=blob_names).delete()
+                    blob_names.clear()
+
+        if blob_names:
+            MediaBlob.objects.filter(name__in=blob_names).delete()
+
+        action = "would be removed" if dry else ("quarantined" if quarantine else "deleted")
+        self.stdout.write(self.style.SUCCESS(
+            f"Blobs with refcount 0: {blobs['blobs']} {action}, {blobs['bytes'] / 1024 / 1024:.1f} MB reclaimed, "
+            f"{blobs['young']} kept (grace period), {blobs['repaired']} refcount(s) repaired"
+        ))
+        self.stdout.write(self.style.SUCCESS(
+            f"Scanned {scanned} file(s): {removed} {action}, "
+            f"{reclaimed / 1024 / 1024:.1f} MB reclaimed, {young} unreferenced file(s) kept (grace period)"
+        ))
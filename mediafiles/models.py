@@ -0,0 +1,21 @@
+# mediafiles/models.py
+from django.db import models
+from django.utils import timezone
+
+
+class MediaBlob(models.Model):
+    """ไฟล์ 1 ก้อนใน cas/ + จำนวนแถวในฐานข้อมูลที่อ้างถึง (refcount = 0 -> gc_media ลบได้)"""
+
+    name = models.CharField(max_length=255, unique=True)
+    sha256 = models.CharField(max_length=64, db_index=True)
+    size = models.PositiveBigIntegerField(default=0)
+    refcount = models.IntegerField(default=0)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["refcount"], name="mediafiles_blob_refcount"),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.refcount})"
@@ -0,0 +1,22 @@
+# mediafiles/services.py
+from django.db.models import F
+
+from .models import MediaBlob
+from .storage import is_cas_name
+
+
+def add_ref(name: str, delta: int = 1) -> int:
+    """ปรับ refcount ของไฟล์ใน cas/ (ชื่อไฟล์แบบเก่าไม่นับ) ด้วย UPDATE เดียว"""
+    if not is_cas_name(name) or not delta:
+        return 0
+    return MediaBlob.objects.filter(name=name).update(refcount=F("refcount") + delta)
+
+
+def swap_ref(old: str | None, new: str | None):
+    """แถวเปลี่ยนรูปจาก old -> new"""
+    if (old or "") == (new or ""):
+        return
+    if new:
+        add_ref(new, +1)
+    if old:
+        add_ref(old, -1)
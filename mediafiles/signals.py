@@ -0,0 +1,62 @@
+# mediafiles/signals.py
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save, pre_save
+
+from .images import has_derivatives, image_fields
+from .services import add_ref, swap_ref
+
+
+_MISSING = object()
+
+
+def _make_handlers(model, field):
+    def on_init(sender, instance, **kwargs):
+        # จำชื่อไฟล์ตอนโหลดจาก DB ไว้เทียบตอน save (อ่านค่าดิบใน __dict__ ไม่แตะ descriptor)
+        value = instance.__dict__.get(field, _MISSING)
+        if value is not _MISSING:
+            instance.__dict__.setdefault("_mediafiles_old", {})[field] = str(value or "")
+
+    def before_save(sender, instance, raw=False, **kwargs):
+        olds = instance.__dict__.setdefault("_mediafiles_old", {})
+        if raw:
+            return
+        if instance._state.adding:  # แถวใหม่ไม่มีรูปเดิม
+            olds[field] = None
+        elif field not in olds:  # โหลดมาแบบ defer ฟิลด์นี้ -> ถาม DB ครั้งเดียว
+            olds[field] = model._default_manager.filter(pk=instance.pk).values_list(field, flat=True).first()
+
+    def after_save(sender, instance, raw=False, **kwargs):
+        if raw:  # loaddata
+            return
+        f = getattr(instance, field, None)
+        name = f.name if f else ""
+        swap_ref(instance.__dict__.get("_mediafiles_old", {}).get(field), name)
+        instance.__dict__.get("_mediafiles_old", {})[field] = name
+
+        if not name or has_derivatives(name):
+            return
+
+        from .tasks import build_image_derivatives
+
+        # ย่อรูปใน worker (run_workers) ไม่ให้หน้าอัปโหลดต้องรอ; key กันส่งงานซ้ำรูปเดียวกัน
+        transaction.on_commit(
+            lambda: build_image_derivatives.delay(key=f"derivatives:{name}", name=name)
+        )
+
+    def after_delete(sender, instance, **kwargs):
+        f = getattr(instance, field, None)
+        if f and f.name:
+            add_ref(f.name, -1)
+
+    return on_init, before_save, after_save, after_delete
+
+
+_handlers = []
+for model, field in image_fields():
+    init, before, after, deleted = _make_handlers(model, field)
+    _handlers.extend([init, before, after, deleted])  # เก็บ reference ไว้ (signal ใช้ weak ref)
+    uid = f"mediafiles:{model._meta.label}.{field}"
+    post_init.connect(init, sender=model, dispatch_uid=uid)
+    pre_save.connect(before, sender=model, dispatch_uid=uid)
+    post_save.connect(after, sender=model, dispatch_uid=uid)
+    post_delete.connect(deleted, sender=model, dispatch_uid=uid)
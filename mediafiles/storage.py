@@ -0,0 +1,77 @@
+# mediafiles/storage.py
+"""
+ที่เก็บไฟล์อัปโหลดแบบ content-addressed
+- ชื่อไฟล์ = sha256 ของเนื้อไฟล์ (อ่านเป็น chunk ไม่โหลดทั้งไฟล์เข้าหน่วยความจำ)
+- เก็บแบบแบ่ง shard: cas/ab/cd/abcd…<ext> (ไม่ให้โฟลเดอร์เดียวมีไฟล์เป็นแสน)
+- ไฟล์เนื้อหาเดียวกันเก็บครั้งเดียว, MediaBlob นับจำนวนแถวที่อ้างถึง (refcount)
+- ชื่อไม่เปลี่ยนตามเนื้อหา -> cache ได้ถาวร (ดู mediafiles/views.py)
+"""
+import hashlib
+import os
+import threading
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+CAS_ROOT = "cas"
+HASH_CHUNK_SIZE = 64 * 1024
+
+_saving = threading.local()  # ชื่อ cas/ ที่ thread นี้กำลังเขียน (ดู get_available_name)
+
+
+def content_hash(content) -> tuple[str, int]:
+    """sha256 + ขนาดไฟล์ โดยอ่านทีละ chunk (content = django File)"""
+    h = hashlib.sha256()
+    size = 0
+    for chunk in content.chunks(HASH_CHUNK_SIZE):  # chunks() seek(0) ให้เอง
+        h.update(chunk)
+        size += len(chunk)
+    content.seek(0)
+    return h.hexdigest(), size
+
+
+def cas_name(digest: str, original_name: str) -> str:
+    ext = os.path.splitext(original_name)[1].lower()[:10]
+    return f"{CAS_ROOT}/{digest[:2]}/{digest[2:4]}/{digest}{ext}"
+
+
+def is_cas_name(name: str) -> bool:
+    return bool(name) and name.startswith(CAS_ROOT + "/")
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    FileSystemStorage ที่ตั้งชื่อไฟล์จากเนื้อหา
+    - upload_to ของแต่ละโมเดลยังใช้ได้ (เอาแค่นามสกุลไฟล์)
+    - ไฟล์ชื่อเดิม (ก่อนย้ายมา CAS) ยังเปิด/แสดงได้ตามปกติ
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # ชื่อจริงถูกกำหนดใน _save จาก hash ไม่ต้องหาชื่อว่าง
+        # ระหว่าง _save: FileSystemStorage._save เรียกซ้ำตอนชนไฟล์ที่มีอยู่ (race)
+        # -> ให้ FileExistsError หลุดออกไปที่ _save ของเรา แทนที่จะได้ชื่อเดิมแล้ววนไม่จบ
+        if getattr(_saving, "name", None) == name:
+            raise FileExistsError(name)
+        return name
+
+    def _save(self, name, content):
+        from .models import MediaBlob
+
+        digest, size = content_hash(content)
+        target = cas_name(digest, name)
+        exists = self.exists(target)
+        if not exists:
+            _saving.name = target
+            try:
+                target = super()._save(target, content)
+            except FileExistsError:
+                # อัปโหลดเนื้อหาเดียวกันพร้อมกัน อีก request เขียนไปก่อน -> เนื้อไฟล์เหมือนกัน ถือว่าสำเร็จ
+                exists = True
+            finally:
+                _saving.name = None
+        if exists:
+            # มีไฟล์อยู่แล้ว (อาจเป็น blob ที่ refcount เป็น 0) -> แตะ mtime ให้พ้น grace period ของ gc_media
+            os.utime(self.path(target))
+        MediaBlob.objects.get_or_create(name=target, defaults={"sha256": digest, "size": size})
+        return target
@@ -0,0 +1,9 @@
+# mediafiles/tasks.py
+from jobs.services import task
+
+from .images import build_derivatives
+
+
+@task(max_attempts=3)
+def build_image_derivatives(name: str, force: bool = False):
+    build_derivatives(name, force=force)
@@ -0,0 +1,67 @@
+# mediafiles/templatetags/images.py
+from django import template
+from django.utils.html import format_html, format_html_join
+
+from mediafiles.images import SIZES, derivative_urls, has_derivatives
+
+register = template.Library()
+
+# ค่า sizes เริ่มต้นตามขนาดที่ขอ (ให้เบราว์เซอร์เลือกไฟล์เล็กสุดที่พอ)
+DEFAULT_SIZES = {
+    "thumb": "160px",
+    "card": "(min-width: 1024px) 33vw, (min-width: 640px) 50vw, 100vw",
+    "full": "100vw",
+}
+
+
+def _srcset(urls: dict, fmt: str) -> str:
+    return ", ".join(f"{urls[size][fmt]} {width}w" for size, width in SIZES.items())
+
+
+@register.filter
+def srcset(fieldfile, fmt="webp"):
+    """{{ m.image|srcset:"webp" }} -> "…/thumb.webp 160w, …/card.webp 480w, …" (ว่างถ้ายังไม่มีรูปย่อ)"""
+    name = getattr(fieldfile, "name", "")
+    if not has_derivatives(name):
+        return ""
+    return _srcset(derivative_urls(name), fmt)
+
+
+@register.simple_tag
+def image_url(fieldfile, size="card", fmt="jpg"):
+    """URL ของรูปย่อขนาดเดียว (ถ้ายังไม่มีรูปย่อใช้ไฟล์ต้นฉบับ)"""
+    name = getattr(fieldfile, "name", "")
+    if not name:
+        return ""
+    if has_derivatives(name):
+        return derivative_urls(name)[size][fmt]
+    return fieldfile.url
+
+
+@register.simple_tag
+def picture(fieldfile, size="card", alt="", sizes=None, loading="lazy", **attrs):
+    """
+    {% picture m.image "card" alt=m.name class="w-full h-40 object-cover" %}
+    -> <picture> ที่มี WebP srcset + <img> JPEG srcset (ต้นฉบับถ้ายังไม่ได้สร้างรูปย่อ)
+    """
+    name = getattr(fieldfile, "name", "")
+    if not name:
+        return ""
+
+    extra = format_html_join(" ", '{}="{}"', attrs.items())
+    if not has_derivatives(name):
+        return format_html(
+            '<img src="{}" alt="{}" loading="{}" decoding="async" {}>',
+            fieldfile.url, alt, loading, extra,
+        )
+
+    urls = derivative_urls(name)
+    sizes = sizes or DEFAULT_SIZES.get(size, "100vw")
+    return format_html(
+        '<picture>'
+        '<source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" alt="{}" loading="{}" decoding="async" {}>'
+        '</picture>',
+        _srcset(urls, "webp"), sizes,
+        urls[size]["jpg"], _srcset(urls, "jpg"), sizes, alt, loading, extra,
+    )
@@ -0,0 +1,305 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import mock
+from urllib.parse import quote
+
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile, TemporaryUploadedFile
+from django.core.management import call_command
+from django.template import Context, Template
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+
+from menus.models import Menu
+from jobs.models import Job
+from .images import SIZES, build_derivatives, derivative_name, derivative_names, has_derivatives
+from .models import MediaBlob
+from .storage import ContentAddressedStorage, cas_name
+
+
+class MediaRootMixin:
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def write(self, name, data=b"0123456789", age_hours=0):
+        path = os.path.join(self.media_root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as fh:
+            fh.write(data)
+        if age_hours:
+            old = time.time() - age_hours * 3600
+            os.utime(path, (old, old))
+        return path
+
+
+class ServeMediaTests(MediaRootMixin, TestCase):
+
+    def test_accel_redirect_thai_filename(self):
+        # ชื่อไฟล์ภาษาไทยแบบเก่า -> header ต้องเป็น percent-encoding ไม่ใช่ =?utf-8?b?...?=
+        self.write("menus/หมกรอบ.jpg")
+        with self.settings(MEDIA_SENDFILE="x-accel-redirect"):
+            response = self.client.get("/media/menus/หมกรอบ.jpg")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["X-Accel-Redirect"], "/_protected_media/menus/" + quote("หมกรอบ.jpg"))
+
+    def test_sendfile_thai_filename(self):
+        path = self.write("menus/หมกรอบ.jpg")
+        with self.settings(MEDIA_SENDFILE="x-sendfile"):
+            response = self.client.get("/media/menus/หมกรอบ.jpg")
+        self.assertEqual(response["X-Sendfile"], quote(path))
+        self.assertTrue(response["X-Sendfile"].isascii())
+
+    def get(self, name, **headers):
+        return self.client.get("/media/" + name, headers=headers)
+
+    def body(self, response):
+        return b"".join(response.streaming_content)
+
+    def test_full_file_with_validators(self):
+        self.write("menus/a.txt")
+        response = self.get("menus/a.txt")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.body(response), b"0123456789")
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertIn("ETag", response)
+        self.assertIn("Last-Modified", response)
+
+    def test_cas_file_is_immutable(self):
+        digest = "f" * 64
+        self.write(f"cas/ff/ff/{digest}.jpg")
+        response = self.get(f"cas/ff/ff/{digest}.jpg")
+        self.assertEqual(response["ETag"], f'"{digest}"')
+        self.assertIn("immutable", response["Cache-Control"])
+
+    def test_if_none_match_gives_304(self):
+        self.write("menus/a.txt")
+        etag = self.get("menus/a.txt")["ETag"]
+        response = self.get("menus/a.txt", if_none_match=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+
+    def test_ranges(self):
+        self.write("menus/a.txt")
+        for header, expected, content_range in [
+            ("bytes=2-4", b"234", "bytes 2-4/10"),
+            ("bytes=7-", b"789", "bytes 7-9/10"),
+            ("bytes=-3", b"789", "bytes 7-9/10"),
+            ("bytes=8-100", b"89", "bytes 8-9/10"),
+        ]:
+            with self.subTest(header):
+                response = self.get("menus/a.txt", range=header)
+                self.assertEqual(response.status_code, 206)
+                self.assertEqual(self.body(response), expected)
+                self.assertEqual(response["Content-Range"], content_range)
+                self.assertEqual(response["Content-Length"], str(len(expected)))
+
+    def test_unsatisfiable_range(self):
+        self.write("menus/a.txt")
+        response = self.get("menus/a.txt", range="bytes=10-")
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response["Content-Range"], "bytes */10")
+
+    def test_multi_range_falls_back_to_full_file(self):
+        self.write("menus/a.txt")
+        response = self.get("menus/a.txt", range="bytes=0-1,4-5")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.body(response), b"0123456789")
+
+    def test_if_range(self):
+        self.write("menus/a.txt")
+        etag = self.get("menus/a.txt")["ETag"]
+        response = self.get("menus/a.txt", range="bytes=0-1", if_range=etag)
+        self.assertEqual(response.status_code, 206)
+        # ไฟล์เปลี่ยนไปแล้ว (ETag ไม่ตรง) -> ต้องได้ทั้งไฟล์ ไม่ใช่ชิ้นของเวอร์ชันใหม่
+        response = self.get("menus/a.txt", range="bytes=0-1", if_range='"stale"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.body(response), b"0123456789")
+
+    def test_missing_and_traversal(self):
+        self.assertEqual(self.get("menus/none.jpg").status_code, 404)
+        self.assertEqual(self.get("../settings.py").status_code, 404)
+
+
+class ContentAddressedStorageTests(MediaRootMixin, TestCase):
+
+    def menu(self, data, filename="หมกรอบ.jpg"):
+        return Menu.objects.create(name="หมกรอบ", price=40, image=SimpleUploadedFile(filename, data))
+
+    def refcount(self, name):
+        return MediaBlob.objects.get(name=name).refcount
+
+    def test_same_upload_is_stored_once(self):
+        data = b"jpeg bytes" * 1000
+        first = self.menu(data)
+        second = self.menu(data, "หมกรอบ_copy.JPG")
+        digest = hashlib.sha256(data).hexdigest()
+        self.assertEqual(first.image.name, cas_name(digest, "upload.jpg"))
+        self.assertEqual(second.image.name, first.image.name)
+        self.assertEqual(os.listdir(os.path.dirname(first.image.path)), [os.path.basename(first.image.name)])
+        blob = MediaBlob.objects.get()
+        self.assertEqual((blob.sha256, blob.size, blob.refcount), (digest, len(data), 2))
+
+    def test_replace_and_delete_adjust_refcount(self):
+        menu = self.menu(b"old")
+        old = menu.image.name
+        menu.image = SimpleUploadedFile("new.jpg", b"new")
+        menu.save()
+        self.assertEqual(self.refcount(old), 0)
+        self.assertEqual(self.refcount(menu.image.name), 1)
+        new = menu.image.name
+        menu.delete()
+        self.assertEqual(self.refcount(new), 0)
+        self.assertTrue(os.path.exists(os.path.join(self.media_root, new)))  # ลบไฟล์จริงเป็นงานของ gc_media
+
+    def test_save_without_image_change_keeps_refcount(self):
+        menu = self.menu(b"same")
+        Menu.objects.get(pk=menu.pk).save()
+        self.assertEqual(self.refcount(menu.image.name), 1)
+
+    def test_concurrent_identical_upload(self):
+        # อีก request เขียนไฟล์เดียวกันเสร็จระหว่าง exists() กับการเขียนของเรา
+        name = self.menu(b"race").image.name
+        temp = TemporaryUploadedFile("race.jpg", "image/jpeg", 4, None)
+        temp.write(b"race")
+        temp.seek(0)
+        self.addCleanup(temp.close)
+        for upload in (SimpleUploadedFile("race.jpg", b"race"), temp):
+            with self.subTest(type(upload).__name__):
+                with mock.patch.object(ContentAddressedStorage, "exists", return_value=False):
+                    self.assertEqual(default_storage.save("menu_images/x.jpg", upload), name)
+                self.assertEqual(MediaBlob.objects.filter(name=name).count(), 1)
+        self.assertEqual(os.listdir(os.path.dirname(os.path.join(self.media_root, name))), [os.path.basename(name)])
+
+
+class DerivativeTests(MediaRootMixin, TestCase):
+
+    def image(self, name, size=(2000, 1000), mode="RGB", exif=True):
+        im = Image.new(mode, size, (200, 30, 30, 128) if mode == "RGBA" else (200, 30, 30))
+        buf = BytesIO()
+        if mode == "RGBA":
+            im.save(buf, "PNG")
+        else:
+            info = Image.Exif()
+            info[0x010F] = "กล้องทดสอบ"  # Make
+            im.save(buf, "JPEG", exif=info if exif else b"")
+        return self.write(name, buf.getvalue())
+
+    def open(self, name):
+        return Image.open(os.path.join(self.media_root, name))
+
+    def test_builds_every_size_and_format(self):
+        self.image("menus/a.jpg")
+        self.assertEqual(build_derivatives("menus/a.jpg"), len(derivative_names("menus/a.jpg")))
+        self.assertTrue(has_derivatives("menus/a.jpg"))
+        for size, width in SIZES.items():
+            for fmt, kind in (("webp", "WEBP"), ("jpg", "JPEG")):
+                with self.open(derivative_name("menus/a.jpg", size, fmt)) as im:
+                    self.assertEqual(im.format, kind)
+                    self.assertEqual(im.size, (width, width // 2))
+                    self.assertFalse(im.getexif())
+
+    def test_small_image_is_not_upscaled(self):
+        self.image("menus/small.jpg", size=(100, 50))
+        build_derivatives("menus/small.jpg")
+        with self.open(derivative_name("menus/small.jpg", "full", "jpg")) as im:
+            self.assertEqual(im.size, (100, 50))
+
+    def test_transparent_png_jpeg_fallback(self):
+        self.image("menus/logo.png", size=(200, 200), mode="RGBA")
+        build_derivatives("menus/logo.png")
+        with self.open(derivative_name("menus/logo.png", "thumb", "jpg")) as im:
+            self.assertEqual(im.mode, "RGB")
+        with self.open(derivative_name("menus/logo.png", "thumb", "webp")) as im:
+            self.assertIn("A", im.getbands())
+
+    def test_skips_existing_and_broken(self):
+        self.image("menus/a.jpg")
+        build_derivatives("menus/a.jpg")
+        self.assertEqual(build_derivatives("menus/a.jpg"), 0)
+        self.write("menus/broken.jpg", b"not an image")
+        with self.assertLogs("mediafiles.images", "WARNING"):
+            self.assertEqual(build_derivatives("menus/broken.jpg"), 0)
+
+    def test_upload_queues_one_job_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            menu = Menu.objects.create(name="ข้าวผัด", price=50, image=SimpleUploadedFile("a.jpg", b"jpeg"))
+            menu.save()
+        job = Job.objects.get()
+        self.assertEqual(job.key, f"derivatives:{menu.image.name}")
+        self.assertEqual(job.kwargs, {"name": menu.image.name})
+
+    def test_picture_tag(self):
+        self.image("menus/a.jpg")
+        menu = Menu(name="ข้าวผัด", image="menus/a.jpg")
+        template = Template('{% load images %}{% picture m.image "card" alt=m.name class="w-full" %}')
+        html = template.render(Context({"m": menu}))
+        self.assertNotIn("<picture>", html)  # ยังไม่มีรูปย่อ -> ใช้ต้นฉบับ
+        self.assertIn('src="/media/menus/a.jpg"', html)
+
+        build_derivatives("menus/a.jpg")
+        html = template.render(Context({"m": menu}))
+        self.assertIn('<source type="image/webp" srcset="/media/derivatives/menus/a/thumb.webp 160w', html)
+        self.assertIn('src="/media/derivatives/menus/a/card.jpg"', html)
+        self.assertIn('alt="ข้าวผัด"', html)
+
+
+class GcMediaTests(MediaRootMixin, TestCase):
+
+    def blob(self, digest, refcount=0, age_hours=48):
+        name = f"cas/{digest[:2]}/{digest[2:4]}/{digest}.jpg"
+        self.write(name, age_hours=age_hours)
+        MediaBlob.objects.create(
+            name=name, sha256=digest, size=10, refcount=refcount,
+            created_at=timezone.now() - timedelta(hours=age_hours),
+        )
+        return name
+
+    def gc(self, *args):
+        call_command("gc_media", *args, stdout=StringIO())
+
+    def exists(self, name):
+        return os.path.exists(os.path.join(self.media_root, name))
+
+    def test_deletes_unreferenced_blob_and_derivatives(self):
+        name = self.blob("a" * 64)
+        derivative = self.write(f"derivatives/{os.path.splitext(name)[0]}/card.webp", age_hours=48)
+        self.gc()
+        self.assertFalse(self.exists(name))
+        self.assertFalse(os.path.exists(derivative))
+        self.assertFalse(MediaBlob.objects.filter(name=name).exists())
+
+    def test_keeps_referenced_blob(self):
+        name = self.blob("b" * 64, refcount=1)
+        self.gc()
+        self.assertTrue(self.exists(name))
+        self.assertTrue(MediaBlob.objects.filter(name=name).exists())
+
+    def test_repairs_drifted_refcount_instead_of_deleting(self):
+        name = self.blob("c" * 64)
+        Menu.objects.create(name="ข้าวผัด", price=50, image=name)
+        MediaBlob.objects.filter(name=name).update(refcount=0)  # จำลอง refcount เพี้ยน
+        self.gc()
+        self.assertTrue(self.exists(name))
+        self.assertEqual(MediaBlob.objects.get(name=name).refcount, 1)
+
+    def test_keeps_recent_blob(self):
+        name = self.blob("d" * 64, age_hours=1)
+        self.gc()
+        self.assertTrue(self.exists(name))
+
+    def test_dry_run(self):
+        name = self.blob("e" * 64)
+        self.gc("--dry-run")
+        self.assertTrue(self.exists(name))
+        self.assertTrue(MediaBlob.objects.filter(name=name).exists())
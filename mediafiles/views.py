@@ -0,0 +1,177 @@
+# mediafiles/views.py
+"""
+เสิร์ฟไฟล์ใน MEDIA_ROOT แทน django.conf.urls.static
+- ETag แบบ strong + Last-Modified -> ตอบ 304 ได้ (get_conditional_response)
+- รองรับ Range แบบช่วงเดียว (bytes=a-b, a-, -n) + If-Range
+- ไฟล์ใน cas/ ชื่อคือ hash ของเนื้อไฟล์ -> Cache-Control: immutable 1 ปี
+- ถ้ามี proxy ด้านหน้า (MEDIA_SENDFILE) ส่ง X-Sendfile / X-Accel-Redirect ให้ proxy ส่งไฟล์เอง
+- ไม่มี proxy -> FileResponse (WSGI server ที่มี wsgi.file_wrapper เช่น gunicorn ใช้ sendfile)
+"""
+import mimetypes
+import os
+import stat
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+from .storage import is_cas_name
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+DEFAULT_MAX_AGE = 24 * 3600
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+class _FileRange:
+    """
+    อ่านได้แค่ length ไบต์จากตำแหน่งปัจจุบันของไฟล์
+    fileno() ส่งต่อให้ wsgi.file_wrapper ใช้ sendfile (ตำแหน่ง = seek ปัจจุบัน, ยาว = Content-Length)
+    """
+
+    def __init__(self, fh, length):
+        self.fh = fh
+        self.name = fh.name
+        self.remaining = length
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b""
+        if size is None or size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.fh.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.fh.fileno()
+
+    def close(self):
+        self.fh.close()
+
+
+def parse_range(header: str, size: int):
+    """
+    คืน (start, end) รวมปลาย หรือ None = ไม่สนใจ Range (ส่งทั้งไฟล์)
+    ช่วงที่อยู่นอกไฟล์ -> RangeNotSatisfiable (416)
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None  # หลายช่วง (multipart/byteranges) ไม่รองรับ -> 200 ทั้งไฟล์
+    first, sep, last = spec.strip().partition("-")
+    if not sep:
+        return None
+    try:
+        if not first:
+            suffix = int(last)
+            if suffix <= 0 or size == 0:
+                raise RangeNotSatisfiable
+            return max(0, size - suffix), size - 1
+        start = int(first)
+        end = int(last) if last else None
+    except ValueError:
+        return None
+    if end is not None and start > end:
+        return None  # ช่วงไม่ถูกไวยากรณ์ -> ไม่สนใจ
+    if start >= size:
+        raise RangeNotSatisfiable
+    return start, size - 1 if end is None else min(end, size - 1)
+
+
+def _etag(name: str, st) -> str:
+    if is_cas_name(name):
+        # ชื่อไฟล์คือ sha256 ของเนื้อไฟล์อยู่แล้ว
+        return '"%s"' % os.path.splitext(os.path.basename(name))[0]
+    return '"%x-%x"' % (st.st_mtime_ns, st.st_size)
+
+
+def _cache_control(name: str) -> str:
+    if is_cas_name(name):
+        return f"public, max-age={IMMUTABLE_MAX_AGE}, immutable"
+    return f"public, max-age={getattr(settings, 'MEDIA_CACHE_MAX_AGE', DEFAULT_MAX_AGE)}"
+
+
+def _if_range_matches(request, etag: str, mtime: int) -> bool:
+    value = request.META.get("HTTP_IF_RANGE")
+    if not value:
+        return True
+    if value.startswith(('"', "W/")):
+        return value == etag  # If-Range ใช้ strong comparison
+    return parse_http_date_safe(value) == mtime
+
+
+@require_safe
+def serve_media(request, path):
+    try:
+        fullpath = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404
+    try:
+        st = os.stat(fullpath)
+    except OSError:
+        raise Http404
+    if not stat.S_ISREG(st.st_mode):
+        raise Http404
+
+    name = path.replace(os.sep, "/")
+    etag = _etag(name, st)
+    mtime = int(st.st_mtime)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": http_date(mtime),
+        "Cache-Control": _cache_control(name),
+        "Accept-Ranges": "bytes",
+    }
+
+    def with_headers(response):
+        for key, value in headers.items():
+            response.headers[key] = value
+        return response
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=mtime)
+    if not_modified is not None:
+        return with_headers(not_modified)
+
+    # proxy ด้านหน้าส่งไฟล์ (และจัดการ Range) เอง
+    # ค่า header ต้อง percent-encode: ชื่อไทย (ไม่ใช่ latin-1) Django จะแปลงเป็น =?utf-8?b?...?= ที่ proxy อ่านไม่ออก
+    backend = getattr(settings, "MEDIA_SENDFILE", None)
+    content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+    if backend == "x-accel-redirect":
+        response = HttpResponse(content_type=content_type)
+        prefix = getattr(settings, "MEDIA_ACCEL_REDIRECT_PREFIX", "/_protected_media/")
+        response.headers["X-Accel-Redirect"] = quote(prefix.rstrip("/") + "/" + name)
+        return with_headers(response)
+    if backend == "x-sendfile":
+        response = HttpResponse(content_type=content_type)
+        response.headers["X-Sendfile"] = quote(fullpath)
+        return with_headers(response)
+
+    size = st.st_size
+    byte_range = None
+    range_header = request.META.get("HTTP_RANGE")
+    if range_header and _if_range_matches(request, etag, mtime):
+        try:
+            byte_range = parse_range(range_header, size)
+        except RangeNotSatisfiable:
+            response = HttpResponse(status=416)
+            response.headers["Content-Range"] = f"bytes */{size}"
+            return with_headers(response)
+
+    fh = open(fullpath, "rb")
+    if byte_range is None:
+        return with_headers(FileResponse(fh))
+
+    start, end = byte_range
+    length = end - start + 1
+    fh.seek(start)
+    response = FileResponse(_FileRange(fh, length), status=206)
+    response.headers["Content-Length"] = str(length)
+    response.headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return with_headers(response)
@@ -5,6 +5,8 @@ from django.urls import reverse
 from django.utils.html import format_html
 from django.utils import timezone
 
+from moderation.services import moderate
+
 from .models import Menu
 
 
@@ -102,22 +104,15 @@ class MenuAdmin(admin.ModelAdmin):
     # เพิ่ม Admin actions: อนุมัติ / ไม่อนุมัติ
     actions = ["approve_selected", "reject_selected"]
 
+    # UPDATE ครั้งเดียว + audit log (ผ่าน moderation.services.moderate)
     def approve_selected(self, request, queryset):
-        updated = 0
-        for obj in queryset:
-            if obj.status != Menu.Status.APPROVED:
-                obj.status = Menu.Status.APPROVED
-                obj.approved_by = request.user
-                obj.approved_at = timezone.now()
-                obj.save(update_fields=["status", "approved_by", "approved_at"])
-                updated += 1
+        ids = queryset.exclude(status=Menu.Status.APPROVED).values_list("pk", flat=True)
+        updated = moderate("menu", ids, "approve", request.user)
         self.message_user(request, f"อนุมัติเมนูจำนวน {updated} รายการแล้ว", level=messages.SUCCESS)
     approve_selected.short_description = "อนุมัติเมนูที่เลือก"
 
     def reject_selected(self, request, queryset):
-        updated = queryset.update(
-            status=Menu.Status.REJECTED, approved_by=None, approved_at=None
-        )
+        updated = moderate("menu", queryset.values_list("pk", flat=True), "reject", request.user)
         self.message_user(request, f"ตั้งสถานะเป็น Rejected จำนวน {updated} รายการแล้ว", level=messages.WARNING)
     reject_selected.short_description = "ตั้งสถานะเมนูที่เลือกเป็น Rejected"
 
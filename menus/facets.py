@@ -0,0 +1,252 @@
+# menus/facets.py
+"""
+faceted browsing ของหน้า menu_list: ร้าน / ช่วงราคา / ธงอาหาร (ฮาลาล, มังสวิรัติ, วีแกน, ไม่มีแอลกอฮอล์)
+
+ไม่ COUNT ทีละค่า และไม่วนทีละเมนูต่อ request: เก็บ "facet index" ของทั้ง catalog ไว้ใน cache (query เดียวตอนสร้าง)
+- เมนูตำแหน่งที่ i (เรียงตาม id) = bit ที่ i
+- bitset (int) หนึ่งก้อนต่อค่าของ facet: ต่อร้าน, ต่อช่วงราคา, ต่อธงอาหาร
+ต่อ request: AND bitset ของตัวกรองฐาน (คำค้น/งบ/แผน) กับของ facet อื่น แล้วนับด้วย int.bit_count()
+แบบ disjunctive (นับค่าของ facet หนึ่งโดยใช้ตัวกรองของ facet อื่นทั้งหมด ยกเว้นของตัวเอง)
+งาน AND/bit_count ทำใน C ทีละ word -> ไม่มี loop Python ที่โตตามจำนวนเมนู
+(ยกเว้นตัวกรองฐานที่ต้องแปลง id ที่ตรงเป็น bit: ทำเฉพาะแถวที่ตรง)
+ผลต่อชุดตัวกรองไม่ cache: คำค้น/งบเป็นค่าอิสระ -> key ไม่จำกัด
+"""
+import uuid
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import Sequence
+
+from caching.services import get_or_compute
+from restaurants.models import Restaurant
+
+from .models import Menu
+from .utils import ban_words, eligible_menu_ids
+
+FACET_INDEX_TTL = 6 * 3600
+
+# (key ใน URL, ป้าย, ราคาสูงสุดของช่วง (None = ไม่จำกัด))
+PRICE_BUCKETS = [
+    ("0-50", "ไม่เกิน 50 บาท", 50),
+    ("51-100", "51–100 บาท", 100),
+    ("101-200", "101–200 บาท", 200),
+    ("200+", "มากกว่า 200 บาท", None),
+]
+
+# (key ใน URL, ฟิลด์ของ Menu, ป้าย) -> bit ที่ i
+DIETARY_FLAGS = [
+    ("halal", "is_halal", "ฮาลาล"),
+    ("vegetarian", "is_vegetarian", "มังสวิรัติ"),
+    ("vegan", "is_vegan", "วีแกน"),
+    ("no_alcohol", "no_alcohol", "ไม่มีแอลกอฮอล์"),
+]
+DIET_BITS = {key: 1 << i for i, (key, _field, _label) in enumerate(DIETARY_FLAGS)}
+PRICE_KEYS = [key for key, _label, _upper in PRICE_BUCKETS]
+
+
+def price_bucket(price) -> int:
+    for i, (_key, _label, upper) in enumerate(PRICE_BUCKETS):
+        if upper is None or price <= upper:
+            return i
+    return len(PRICE_BUCKETS) - 1
+
+
+def _bits(positions, size: int) -> int:
+    """ตำแหน่ง (0..size-1) -> bitset"""
+    buf = bytearray((size + 7) // 8)
+    for pos in positions:
+        buf[pos >> 3] |= 1 << (pos & 7)
+    return int.from_bytes(buf, "little")
+
+
+def build_index() -> dict:
+    """
+    ทุกเมนูใน query เดียว (LEFT JOIN ร้านเพื่อเอาชื่อ) -> bitset ต่อค่าของ facet
+    bitset ของร้านเก็บแบบเลื่อน (offset, bits >> offset) -> ร้านที่เมนูอยู่ติดกันไม่กินที่ทั้ง catalog
+    """
+    ids, prices = array("q"), array("d")
+    restaurants, names = {}, {}
+    buckets = [[] for _ in PRICE_BUCKETS]
+    diets = [[] for _ in DIETARY_FLAGS]
+    fields = [field for _key, field, _label in DIETARY_FLAGS]
+    rows = Menu.objects.order_by("id").values_list("id", "restaurant_id", "restaurant__name", "price", *fields)
+    for pos, (menu_id, restaurant_id, restaurant_name, price, *flag_values) in enumerate(rows.iterator(chunk_size=2000)):
+        ids.append(menu_id)
+        prices.append(float(price or 0))
+        buckets[price_bucket(price or 0)].append(pos)
+        for bit, value in enumerate(flag_values):
+            if value:
+                diets[bit].append(pos)
+        if restaurant_id:
+            restaurants.setdefault(restaurant_id, []).append(pos)
+            names[restaurant_id] = restaurant_name
+
+    size = len(ids)
+    by_price = sorted(range(size), key=prices.__getitem__)
+    return {
+        "token": uuid.uuid4().hex,  # ผูก cache ที่อิงตำแหน่ง bit (ชุดเมนูตามแผน) กับ index ก้อนนี้
+        "ids": ids,
+        "size": size,
+        "by_price": array("q", by_price),
+        "sorted_prices": array("d", (prices[i] for i in by_price)),
+        "buckets": [_bits(positions, size) for positions in buckets],
+        "diets": {key: _bits(positions, size) for (key, _f, _l), positions in zip(DIETARY_FLAGS, diets)},
+        "restaurants": {
+            rid: (positions[0], _bits((p - positions[0] for p in positions), positions[-1] - positions[0] + 1))
+            for rid, positions in restaurants.items()
+        },
+        "restaurant_names": names,
+    }
+
+
+def facet_index() -> dict:
+    return get_or_compute("menus:facet_index", {}, build_index, depends_on=[Menu, Restaurant], timeout=FACET_INDEX_TTL)
+
+
+def _id_bits(index: dict, menu_ids) -> int:
+    """id เมนู (เรียงแล้ว) -> bitset ตามตำแหน่งใน index (id ที่ไม่อยู่ใน index ทิ้งไป)"""
+    ids, size = index["ids"], index["size"]
+
+    def positions():
+        for menu_id in menu_ids:
+            i = bisect_left(ids, menu_id)
+            if i < size and ids[i] == menu_id:
+                yield i
+
+    return _bits(positions(), size)
+
+
+def _eligible_bits(index: dict, plan: dict | None) -> int | None:
+    ban = ban_words(plan)
+    if not ban:
+        return None
+    return get_or_compute(
+        "menus:eligible_bits", [index["token"], list(ban)],
+        lambda: _id_bits(index, eligible_menu_ids(plan)),
+        depends_on=[Menu], timeout=FACET_INDEX_TTL,
+    )
+
+
+class BitsetIds(Sequence):
+    """
+    id ของเมนูใน bitset เรียงใหม่สุดก่อน (id มากก่อน)
+    แปลงเป็น id เฉพาะช่วงที่ถูก slice (Paginator ขอทีละหน้า) ไม่แตกทั้งชุด
+    """
+
+    def __init__(self, bits: int, ids):
+        self.bits = bits
+        self.ids = ids
+        self.total = bits.bit_count()
+
+    def __len__(self):
+        return self.total
+
+    def _positions_desc(self, skip: int):
+        words = array("Q")
+        words.frombytes(self.bits.to_bytes((self.bits.bit_length() + 63) // 64 * 8, "little"))
+        for w in range(len(words) - 1, -1, -1):
+            word = words[w]
+            if skip:
+                n = word.bit_count()
+                if n <= skip:
+                    skip -= n
+                    continue
+            while word:
+                top = word.bit_length() - 1
+                word ^= 1 << top
+                if skip:
+                    skip -= 1
+                    continue
+                yield w * 64 + top
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            start, stop, step = item.indices(self.total)
+            out = []
+            for n, pos in enumerate(self._positions_desc(start), start):
+                if n >= stop:
+                    break
+                if (n - start) % step == 0:
+                    out.append(self.ids[pos])
+            return out
+        if item < 0:
+            item += self.total
+        if not 0 <= item < self.total:
+            raise IndexError(item)
+        return self[item:item + 1][0]
+
+
+def parse_selection(params) -> dict:
+    """อ่านตัวเลือก facet จาก request.GET (ค่าที่ไม่รู้จักทิ้งไป)"""
+    try:
+        restaurant = int(params.get("restaurant") or 0) or None
+    except (TypeError, ValueError):
+        restaurant = None
+    price = params.get("price") or None
+    if price not in PRICE_KEYS:
+        price = None
+    diet = sorted({d for d in params.getlist("diet") if d in DIET_BITS})
+    return {"restaurant": restaurant, "price": price, "diet": diet}
+
+
+def browse(*, q: str = "", budget: float | None = None, selection: dict, plan: dict | None = None) -> dict:
+    """ผลลัพธ์ (id เรียงใหม่สุดก่อน แบบ lazy) + จำนวนต่อ facet จาก facet index"""
+    index = facet_index()
+    full = (1 << index["size"]) - 1
+
+    # ตัวกรองฐาน (ไม่ใช่ facet): คำค้น / งบ / ข้อจำกัดอาหารของแผน
+    base = full
+    if q:
+        # คำค้นต้องใช้ SQL (icontains) -> ดึงแค่ id ครั้งเดียว
+        base &= _id_bits(index, Menu.objects.filter(name__icontains=q).order_by("id").values_list("id", flat=True))
+    if budget is not None:
+        cut = bisect_right(index["sorted_prices"], budget)
+        base &= _bits(index["by_price"][:cut], index["size"])
+    eligible = _eligible_bits(index, plan)
+    if eligible is not None:
+        base &= eligible
+
+    sel_restaurant = selection["restaurant"] or 0
+    sel_bucket = PRICE_KEYS.index(selection["price"]) if selection["price"] else -1
+    r_bits = full
+    if sel_restaurant:
+        offset, bits = index["restaurants"].get(sel_restaurant, (0, 0))
+        r_bits = bits << offset
+    p_bits = index["buckets"][sel_bucket] if sel_bucket >= 0 else full
+    d_bits = full
+    for d in selection["diet"]:
+        d_bits &= index["diets"][d]  # ธงอาหารเป็น AND
+
+    not_r = base & p_bits & d_bits
+    not_p = base & r_bits & d_bits
+    results = not_p & p_bits
+
+    restaurant_counts = {}
+    for rid, (offset, bits) in index["restaurants"].items():
+        n = ((not_r >> offset) & bits).bit_count()
+        if n:
+            restaurant_counts[rid] = n
+    # จำนวนของธง x = ตรงกับธงที่เลือกอยู่ทั้งหมด + x
+    diet_counts = {key: (results & bits).bit_count() for key, bits in index["diets"].items()}
+
+    names = index["restaurant_names"]
+    ids = BitsetIds(results, index["ids"])
+    return {
+        "ids": ids,
+        "total": len(ids),
+        "plan_filtered": eligible is not None,
+        "restaurants": sorted(
+            (
+                {"id": rid, "name": names.get(rid) or f"ร้าน #{rid}", "count": n, "selected": rid == sel_restaurant}
+                for rid, n in restaurant_counts.items()
+            ),
+            key=lambda r: (-r["count"], r["name"]),
+        ),
+        "prices": [
+            {"key": key, "label": label, "count": (not_p & index["buckets"][i]).bit_count(), "selected": i == sel_bucket}
+            for i, (key, label, _upper) in enumerate(PRICE_BUCKETS)
+        ],
+        "diets": [
+            {"key": key, "label": label, "count": diet_counts[key], "selected": key in selection["diet"]}
+            for key, _field, label in DIETARY_FLAGS
+        ],
+    }
@@ -1,3 +1,97 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.test import TestCase
+from django.urls import reverse
 
-# Create your tests here.
+from caching.services import reset_stats, stats
+
+from restaurants.models import Restaurant
+from .facets import BitsetIds
+from .models import Menu
+
+# session, user, facet index (ทุกเมนูใน query เดียว), แถวของหน้านี้ -> ไม่โตตามจำนวนร้าน/ค่าของ facet
+MENU_LIST_QUERIES = 4
+
+
+class MenuListFacetTests(TestCase):
+
+    def setUp(self):
+        cache.clear()  # locmem อยู่ข้ามเทสต์ -> facet index ของเทสต์ก่อนห้ามติดมา
+        self.user = User.objects.create(username="diner")
+        self.client.force_login(self.user)
+
+    def seed(self, restaurants):
+        for i in range(restaurants):
+            restaurant = Restaurant.objects.create(name=f"ร้าน {i}", is_active=True)
+            Menu.objects.create(restaurant=restaurant, name=f"ข้าวมันไก่ {i}", price=45, is_halal=True)
+            Menu.objects.create(restaurant=restaurant, name=f"ผัดผัก {i}", price=80, is_vegetarian=True, is_vegan=True)
+            Menu.objects.create(restaurant=restaurant, name=f"สเต๊ก {i}", price=250)
+
+    def get_list(self, **params):
+        with self.assertNumQueries(MENU_LIST_QUERIES):
+            return self.client.get(reverse("menus:menu_list"), params)
+
+    def test_menu_list_queries_small(self):
+        self.seed(2)
+        response = self.get_list()
+        self.assertEqual(response.context["result_count"], 6)
+        self.assertEqual(len(response.context["restaurant_facets"]), 2)
+
+    def test_menu_list_queries_large(self):
+        self.seed(30)
+        response = self.get_list()
+        self.assertEqual(response.context["result_count"], 90)
+        self.assertEqual(len(response.context["restaurant_facets"]), 30)
+
+    def test_facet_counts_exclude_own_selection(self):
+        self.seed(3)
+        response = self.client.get(reverse("menus:menu_list"), {"price": "51-100", "diet": "vegan"})
+        context = response.context
+        self.assertEqual(context["result_count"], 3)
+        # ช่วงราคานับโดยไม่ใช้ตัวเลือกราคาของตัวเอง (แต่ยังใช้ diet=vegan)
+        prices = {p["key"]: p["count"] for p in context["price_facets"]}
+        self.assertEqual(prices, {"0-50": 0, "51-100": 3, "101-200": 0, "200+": 0})
+        diets = {d["key"]: d["count"] for d in context["diet_facets"]}
+        self.assertEqual(diets["vegan"], 3)
+        self.assertEqual(diets["halal"], 0)
+        self.assertTrue(all(r["count"] == 1 for r in context["restaurant_facets"]))
+
+    def test_facet_index_follows_menu_changes(self):
+        self.seed(1)
+        self.get_list()
+        Menu.objects.create(name="ต้มยำ", price=120)
+        response = self.client.get(reverse("menus:menu_list"))
+        self.assertEqual(response.context["result_count"], 4)
+        prices = {p["key"]: p["count"] for p in response.context["price_facets"]}
+        self.assertEqual(prices["101-200"], 1)
+
+    def test_free_text_query_is_not_cached(self):
+        self.seed(2)
+        reset_stats()
+        for q in ("ข้าว", "ผัด", "ไม่มีเมนูนี้"):
+            response = self.client.get(reverse("menus:menu_list"), {"q": q})
+        self.assertEqual(response.context["result_count"], 0)
+        # cache แค่ facet index ก้อนเดียว ไม่ใช่ผลต่อคำค้น
+        self.assertEqual(set(stats()), {"menus:facet_index"})
+        self.assertEqual(stats()["menus:facet_index"], {"miss": 1, "hit": 2})
+
+
+class BitsetIdsTests(TestCase):
+
+    def test_newest_first_slices(self):
+        ids = list(range(100, 300))  # ตำแหน่ง i -> id 100 + i (ข้าม word 64 bit หลายก้อน)
+        chosen = [p for p in range(200) if p % 3 == 0 or p in (63, 64, 127)]
+        bits = sum(1 << p for p in chosen)
+        expected = [ids[p] for p in reversed(chosen)]
+        seq = BitsetIds(bits, ids)
+        self.assertEqual(len(seq), len(expected))
+        self.assertEqual(list(seq), expected)
+        for sl in (slice(0, 24), slice(24, 48), slice(60, 200), slice(5, 30, 4)):
+            self.assertEqual(seq[sl], expected[sl])
+        self.assertEqual((seq[0], seq[-1]), (expected[0], expected[-1]))
+        self.assertEqual(list(BitsetIds(0, ids)), [])
+
+    def test_menu_list_pages_newest_first(self):
+        menus = [Menu.objects.create(name=f"ข้าวผัด {i}", price=50) for i in range(30)]
+        response = self.client.get(reverse("menus:menu_list"), {"page": 2})
+        self.assertEqual([m.id for m in response.context["menus"]], [m.id for m in menus[::-1][24:]])
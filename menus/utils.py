@@ -1,5 +1,14 @@
+from array import array
+from bisect import bisect_left
+
 from django.db.models import Q
 
+from caching.services import get_or_compute
+
+from .models import Menu
+
+ELIGIBLE_IDS_TTL = 6 * 3600  # วินาที (เมนูเปลี่ยน -> เวอร์ชัน Menu เพิ่ม -> key ใหม่ทันที)
+
 # ------------------ คีย์เวิร์ด/ข้อจำกัด ------------------
 KW = {
     "หมู": ["หมู", "หมูกรอบ", "หมูสับ", "สามชั้น", "pork", "เบคอน", "bacon"],
@@ -43,7 +52,28 @@ def filter_by_plan(qs, plan: dict | None):
     if budget and str(budget).isdigit():
         qs = qs.filter(price__lte=int(budget))
 
-    # 2) รวมคีย์เวิร์ดต้องห้าม
+    # 2) ตัดเมนูที่มีคำต้องห้าม
+    qs = exclude_banned(qs, ban_words(plan))
+
+    return qs.distinct()
+
+
+def exclude_banned(qs, ban):
+    if not ban:
+        return qs
+    q_ex = Q()
+    for w in ban:
+        q_ex |= Q(name__icontains=w) | Q(description__icontains=w)
+    return qs.exclude(q_ex)
+
+
+def ban_words(plan: dict | None) -> tuple[str, ...]:
+    """
+    คำต้องห้ามจาก allergies + dislikes + religions + extra (ไม่รวมงบ)
+    เรียง/ตัดซ้ำ/ตัวพิมพ์เล็ก -> แผนที่เลือกต่างกันแต่ได้คำชุดเดียวกัน = ข้อจำกัดชุดเดียวกัน
+    """
+    if not plan:
+        return ()
     ban: list[str] = []
     for key in (plan.get("allergies") or []) + (plan.get("dislikes") or []):
         ban += KW.get(key, [key])  # ถ้าไม่อยู่ใน KW ก็ใช้ key เดิม
@@ -53,17 +83,40 @@ def filter_by_plan(qs, plan: dict | None):
 
     extra = plan.get("extra") or {}
     for e in (extra.get("allergy") or "").split(","):
-        if e.strip():
-            ban.append(e.strip())
+        ban.append(e)
     for e in (extra.get("dislike") or "").split(","):
-        if e.strip():
-            ban.append(e.strip())
+        ban.append(e)
 
-    # 3) ตัดเมนูที่มีคำต้องห้าม
-    if ban:
-        q_ex = Q()
-        for w in set(ban):
-            q_ex |= Q(name__icontains=w) | Q(description__icontains=w)
-        qs = qs.exclude(q_ex)
+    return tuple(sorted({w.strip().lower() for w in ban if w and w.strip()}))
 
-    return qs.distinct()
+
+# ------------------ ชุดเมนูที่กินได้ตามข้อจำกัด (cache) ------------------
+def eligible_menu_ids(plan: dict | None) -> array | None:
+    """
+    id ของเมนูที่ไม่มีคำต้องห้ามของแผนนี้ เป็น array("q") เรียงจากน้อยไปมาก
+    cache ต่อชุดคำต้องห้าม (ผู้ใช้ที่ข้อจำกัดเหมือนกันใช้ก้อนเดียวกัน) ล้างตามเวอร์ชันของ Menu
+    ไม่มีข้อจำกัด -> None (= ทุกเมนู ไม่ต้องกรอง)
+    งบ/ร้าน/คำค้น ไม่อยู่ใน key -> ผู้เรียกกรองเองแล้วตัดด้วย is_eligible / keep_eligible
+    """
+    ban = ban_words(plan)
+    if not ban:
+        return None
+
+    def compute():
+        return array("q", exclude_banned(Menu.objects.order_by("id"), ban).values_list("id", flat=True))
+
+    return get_or_compute("menus:eligible", list(ban), compute, depends_on=[Menu], timeout=ELIGIBLE_IDS_TTL)
+
+
+def is_eligible(eligible: array | None, menu_id: int) -> bool:
+    if eligible is None:
+        return True
+    i = bisect_left(eligible, menu_id)
+    return i < len(eligible) and eligible[i] == menu_id
+
+
+def keep_eligible(menus, eligible: array | None) -> list:
+    """ตัดเมนูที่ไม่อยู่ในชุด (menus = แถวที่กรองงบ/ร้าน/คำค้นมาแล้ว)"""
+    if eligible is None:
+        return list(menus)
+    return [m for m in menus if is_eligible(eligible, m.id)]
@@ -11,65 +11,71 @@ from django.utils.http import url_has_allowed_host_and_scheme
 from restaurants.models import Restaurant
 from .models import Menu
 from .forms import MenuForm
-from .utils import filter_by_plan
+from .facets import browse, parse_selection
 from searches.services import log_search
+from moderation.services import moderate
 
 # ============================
 # เมนูฝั่งผู้ใช้ทั่วไป
 # ============================
 
-@login_required
-def menu_list(request):
-    qs = Menu.objects.all().order_by('-created_at')
+MENU_PAGE_SIZE = 24
 
-    # ถ้ามี plan ใน session ให้กรอง
-    plan = request.session.get('plan')
-    qs = filter_by_plan(qs, plan)
 
-    # ถ้ามี budget ใน query ให้กรองราคาไม่เกิน
-    budget = request.GET.get('budget') or (plan and plan.get('budget'))
-    if budget and str(budget).isdigit():
-        qs = qs.filter(price__lte=int(budget))
+def _facet_url(params, key, value, multi=False):
+    """URL ของปุ่ม facet: กด = เลือก / กดซ้ำ = เอาออก (ล้าง page ทุกครั้ง)"""
+    params = params.copy()
+    params.pop("page", None)
+    if multi:
+        values = params.getlist(key)
+        params.setlist(key, [v for v in values if v != value] if value in values else values + [value])
+    elif params.get(key) == str(value):
+        params.pop(key)
+    else:
+        params[key] = value
+    query = params.urlencode()
+    return f"?{query}" if query else "?"
 
-    return render(request, 'menus/menu_list.html', {
-        'menus': qs,
-        'budget': budget or '',
-        'plan': plan or {},
-    })
 
 def menu_list(request):
     q = (request.GET.get("q") or "").strip()
-    category = request.GET.get("category") or ""
-    restaurant = request.GET.get("restaurant") or ""
     budget = request.GET.get("budget") or ""
+    selection = parse_selection(request.GET)
 
-    qs = Menu.objects.all()
+    try:
+        budget_value = float(budget) if budget else None
+    except ValueError:
+        budget_value = None
 
-    if q:
-        qs = qs.filter(name__icontains=q)
+    # ข้อจำกัดอาหารของแผนใน session (แพ้/ไม่กิน/ศาสนา) -> ตัดด้วยชุด id ที่ cache ไว้ต่อชุดข้อจำกัด
+    # ?all=1 = ดูทุกเมนูไม่สนแผน
+    plan = None if request.GET.get("all") == "1" else request.session.get("plan")
 
-    if category:
-        qs = qs.filter(category__id=category)
+    # ผลลัพธ์ + จำนวนต่อ facet มาจาก facet index ที่ cache ไว้ (ไม่ COUNT ทีละค่า)
+    facets = browse(q=q, budget=budget_value, selection=selection, plan=plan)
+    result_count = facets["total"]
 
-    if restaurant:
-        qs = qs.filter(restaurant__id=restaurant)
+    # ดึงแถวจริงเฉพาะหน้าที่แสดง
+    page = Paginator(facets["ids"], MENU_PAGE_SIZE).get_page(request.GET.get("page"))
+    rows = Menu.objects.in_bulk(list(page.object_list))
+    menus = [rows[i] for i in page.object_list if i in rows]
 
-    if budget:
-        try:
-            qs = qs.filter(price__lte=float(budget))
-        except Exception:
-            pass
-
-    # คำนวณจำนวนผลลัพธ์
-    result_count = qs.count()
+    params = request.GET
+    restaurant_facets = [
+        {**r, "url": _facet_url(params, "restaurant", r["id"])} for r in facets["restaurants"]
+    ]
+    price_facets = [{**p, "url": _facet_url(params, "price", p["key"])} for p in facets["prices"]]
+    diet_facets = [{**d, "url": _facet_url(params, "diet", d["key"], multi=True)} for d in facets["diets"]]
 
     # บันทึกประวัติ (เฉพาะตอนเป็น GET และมีการ “ค้น/กรอง” จริง)
-    has_search_intent = any([q, category, restaurant, budget])
-    if request.method == "GET" and has_search_intent and request.user.is_authenticated:
+    # ไม่เช็คล็อกอินตรงนี้: log_search นับ rollup ให้ทุกคน และเก็บประวัติเฉพาะผู้ใช้ที่ล็อกอิน
+    has_search_intent = any([q, budget, selection["restaurant"], selection["price"], selection["diet"]])
+    if request.method == "GET" and has_search_intent:
         filters = {
-            "category": category,
-            "restaurant": restaurant,
+            "restaurant": selection["restaurant"] or "",
             "budget": budget,
+            "price": selection["price"] or "",
+            "diet": selection["diet"],
         }
         log_search(
             user=request.user,
@@ -79,7 +85,21 @@ def menu_list(request):
             result_count=result_count,
         )
 
-    return render(request, "menus/menu_list.html", {"menus": qs})
+    page_params = params.copy()
+    page_params.pop("page", None)
+    return render(request, "menus/menu_list.html", {
+        "menus": menus,
+        "page_obj": page,
+        "page_query": page_params.urlencode(),
+        "q": q,
+        "budget": budget,
+        "restaurant_facets": restaurant_facets,
+        "price_facets": price_facets,
+        "diet_facets": diet_facets,
+        "has_filters": has_search_intent,
+        "plan_filtered": facets["plan_filtered"],
+        "result_count": result_count,
+    })
 
 
 
@@ -178,12 +198,8 @@ def add_menu_to_restaurant(request, pk):
 @staff_member_required
 @require_POST
 def approve_menu(request, pk):
-    print("METHOD = ", request.method)  # debug
-    menu = get_object_or_404(Menu, pk=pk)
-    menu.status = Menu.Status.APPROVED
-    menu.approved_by = request.user
-    menu.approved_at = timezone.now()
-    menu.save(update_fields=['status', 'approved_by', 'approved_at'])
+    menu = get_object_or_404(Menu.objects.only('name'), pk=pk)
+    moderate('menu', [menu.pk], 'approve', request.user)
     messages.success(request, f"อนุมัติเมนู '{menu.name}' เรียบร้อยแล้ว")
     return redirect('menus:admin_menu_list')
 
@@ -191,11 +207,8 @@ def approve_menu(request, pk):
 @staff_member_required
 @require_POST
 def reject_menu(request, pk):
-    menu = get_object_or_404(Menu, pk=pk)
-    menu.status = Menu.Status.REJECTED
-    menu.approved_by = request.user
-    menu.approved_at = timezone.now()
-    menu.save(update_fields=['status', 'approved_by', 'approved_at'])
+    menu = get_object_or_404(Menu.objects.only('name'), pk=pk)
+    moderate('menu', [menu.pk], 'reject', request.user)
     messages.warning(request, f"ปฏิเสธเมนู '{menu.name}' เรียบร้อยแล้ว")
 
     next_url = request.POST.get('next')
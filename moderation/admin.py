@@ -0,0 +1,10 @@
+from django.contrib import admin
+from .models import ModerationLog
+
+
+@admin.register(ModerationLog)
+class ModerationLogAdmin(admin.ModelAdmin):
+    list_display = ("created_at", "kind", "object_id", "action", "moderator")
+    list_filter = ("kind", "action", "created_at")
+    search_fields = ("moderator__username",)
+    ordering = ("-created_at",)
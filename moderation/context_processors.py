@@ -0,0 +1,10 @@
+# moderation/context_processors.py
+from .services import pending_counts
+
+
+def moderation(request):
+    """ป้ายจำนวนรอตรวจใน navbar (เฉพาะ staff, อ่านจาก cache)"""
+    user = getattr(request, "user", None)
+    if not (user and user.is_authenticated and user.is_staff):
+        return {}
+    return {"moderation_pending": pending_counts()}
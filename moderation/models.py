@@ -0,0 +1,27 @@
+# moderation/models.py
+from django.db import models
+from django.contrib.auth.models import User
+from django.utils import timezone
+
+
+class ModerationLog(models.Model):
+    """บันทึกการอนุมัติ/ปฏิเสธของ staff (insert ทีละชุดด้วย bulk_create)"""
+
+    class Action(models.TextChoices):
+        APPROVE = "approve", "อนุมัติ"
+        REJECT = "reject", "ปฏิเสธ"
+
+    kind = models.CharField(max_length=20)  # topic / review / menu / restaurant
+    object_id = models.BigIntegerField()
+    action = models.CharField(max_length=10, choices=Action.choices)
+    moderator = models.ForeignKey(User, null=True, on_delete=models.SET_NULL, related_name="moderation_logs")
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["kind", "object_id"]),
+        ]
+
+    def __str__(self):
+        return f"{self.action} {self.kind}#{self.object_id}"
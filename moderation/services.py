@@ -0,0 +1,157 @@
+# moderation/services.py
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, OuterRef, Q, Subquery, Value
+from django.utils import timezone
+
+from caching.services import invalidate
+from community.models import Review, Topic
+from community.services import rebuild_topic_stats
+from menus.models import Menu
+from restaurants.models import Restaurant
+
+from .models import ModerationLog
+
+PENDING_COUNTS_CACHE_KEY = "moderation:pending_counts"
+PENDING_COUNTS_TTL = 60  # วินาที (ล้างทันทีเมื่อมีการอนุมัติ/ปฏิเสธผ่าน moderate)
+QUEUE_PAGE_SIZE = 50
+
+
+def _restaurant_pending():
+    # ร้านไม่มีสถานะ rejected แยก -> ดูจาก ModerationLog ล่าสุดของร้าน (ไม่ใช่ "เคยถูก reject")
+    # ร้านที่ยังไม่ active และยังไม่มี log หรือ log ล่าสุดไม่ใช่ reject (เช่น อนุมัติแล้วถูกปิดกลับ) ถือว่ารอตรวจ
+    latest = ModerationLog.objects.filter(
+        kind="restaurant", object_id=OuterRef("pk"),
+    ).order_by("-created_at", "-pk").values("action")[:1]
+    return (
+        Restaurant.objects.filter(is_active=False)
+        .alias(last_action=Subquery(latest))
+        .filter(Q(last_action__isnull=True) | ~Q(last_action=ModerationLog.Action.REJECT))
+    )
+
+
+def _review_moderated(ids):
+    # สถานะรีวิวเปลี่ยน -> สถิติของหัวข้อที่เกี่ยวข้องคำนวณใหม่ครั้งเดียว (GROUP BY)
+    topic_ids = Review.objects.filter(pk__in=ids).values_list("topic_id", flat=True).distinct()
+    rebuild_topic_stats(list(topic_ids))
+
+
+# kind -> (label, queryset ที่รอตรวจ, ค่าที่ set ตอน approve, ค่าที่ set ตอน reject, hook หลังอัปเดต)
+# ค่าที่เป็น callable จะถูกเรียกด้วย (user, now) ตอน moderate
+QUEUES = {
+    "topic": {
+        "label": "หัวข้อ Community",
+        "pending": lambda: Topic.objects.filter(status="pending"),
+        "approve": {"status": "approved", "is_active": True},
+        "reject": {"status": "rejected"},
+    },
+    "review": {
+        "label": "รีวิว",
+        "pending": lambda: Review.objects.filter(status="pending"),
+        "approve": {"status": "approved"},
+        "reject": {"status": "rejected"},
+        "after": _review_moderated,
+    },
+    "menu": {
+        "label": "เมนูอาหาร",
+        "pending": lambda: Menu.objects.filter(status=Menu.Status.PENDING),
+        "approve": {
+            "status": Menu.Status.APPROVED,
+            "approved_by": lambda user, now: user,
+            "approved_at": lambda user, now: now,
+        },
+        # ผู้ปฏิเสธดูได้จาก ModerationLog (approved_* ใช้เฉพาะสถานะ approved เหมือนใน MenuAdmin)
+        "reject": {"status": Menu.Status.REJECTED, "approved_by": None, "approved_at": None},
+    },
+    "restaurant": {
+        "label": "ร้านอาหาร",
+        "pending": _restaurant_pending,
+        "approve": {"is_active": True},
+        "reject": {"is_active": False},
+    },
+}
+
+
+def queue_model(kind: str):
+    return QUEUES[kind]["pending"]().model
+
+
+def pending_queryset(kind: str):
+    return QUEUES[kind]["pending"]()
+
+
+def pending_counts(*, use_cache: bool = True) -> dict:
+    """
+    จำนวนรอตรวจของทุกคิวใน query เดียว (SELECT kind, COUNT(*) ... UNION ALL ...)
+    แล้ว cache ไว้สั้น ๆ เพราะถูกเรียกทุกหน้าของ staff (ป้ายใน navbar)
+    """
+    if use_cache:
+        hit = cache.get(PENDING_COUNTS_CACHE_KEY)
+        if hit is not None:
+            return hit
+
+    parts = [
+        pending_queryset(kind)
+        .order_by()
+        .annotate(kind=Value(kind))
+        .values("kind")
+        .annotate(n=Count("pk"))
+        .values_list("kind", "n")
+        for kind in QUEUES
+    ]
+    union = parts[0].union(*parts[1:], all=True)
+
+    counts = {kind: 0 for kind in QUEUES}
+    counts.update(dict(union))
+    counts["total"] = sum(counts[k] for k in QUEUES)
+
+    cache.set(PENDING_COUNTS_CACHE_KEY, counts, PENDING_COUNTS_TTL)
+    return counts
+
+
+def invalidate_pending_counts():
+    cache.delete(PENDING_COUNTS_CACHE_KEY)
+
+
+def moderate(kind: str, ids, action: str, user) -> int:
+    """
+    อนุมัติ/ปฏิเสธหลายรายการพร้อมกัน
+    - ทำเฉพาะรายการที่ยังรอตรวจอยู่ (เงื่อนไข pending ของคิว) -> หน้าคิวเก่า/กดซ้ำ/staff สองคนกดพร้อมกัน
+      ไม่พลิกสถานะรายการที่ตรวจไปแล้ว และไม่เขียน log ซ้ำ
+    - UPDATE ... WHERE id IN (...) ครั้งเดียว
+    - บันทึก ModerationLog ด้วย bulk_create ครั้งเดียว
+    คืนจำนวนแถวที่ถูกอัปเดต
+    """
+    if kind not in QUEUES or action not in (ModerationLog.Action.APPROVE, ModerationLog.Action.REJECT):
+        raise ValueError(f"unknown moderation {kind}/{action}")
+
+    ids = sorted({int(i) for i in ids})
+    if not ids:
+        return 0
+
+    model = queue_model(kind)
+    now = timezone.now()
+    values = {
+        field: (v(user, now) if callable(v) else v)
+        for field, v in QUEUES[kind][action].items()
+    }
+
+    with transaction.atomic():
+        # FOR UPDATE: อีก request ที่ตรวจรายการเดียวกันต้องรอ แล้วจะไม่ผ่านเงื่อนไข pending อีก
+        found = list(
+            pending_queryset(kind).filter(pk__in=ids).select_for_update().values_list("pk", flat=True)
+        )
+        if not found:
+            return 0
+        updated = model.objects.filter(pk__in=found).update(**values)
+        ModerationLog.objects.bulk_create([
+            ModerationLog(kind=kind, object_id=pk, action=action, moderator=user, created_at=now)
+            for pk in found
+        ])
+        after = QUEUES[kind].get("after")
+        if after:
+            after(found)
+
+    invalidate_pending_counts()
+    invalidate(model)  # UPDATE ทั้งชุดไม่ส่ง post_save -> cache ที่ขึ้นกับเมนู/ร้านต้องล้างเอง
+    return updated
@@ -0,0 +1,132 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from community.models import Review, Topic, TopicStats
+from menus.models import Menu
+from restaurants.models import Restaurant
+from .models import ModerationLog
+from .services import moderate, pending_counts, pending_queryset
+
+# SELECT id ที่มีจริง, UPDATE ... WHERE id IN (...), bulk INSERT log (+ savepoint ของ atomic) -> ไม่โตตามจำนวนรายการ
+MODERATE_QUERIES = 5
+
+
+class RestaurantPendingTests(TestCase):
+
+    def setUp(self):
+        self.staff = User.objects.create(username="staff", is_staff=True)
+
+    def pending_ids(self):
+        return set(pending_queryset("restaurant").values_list("pk", flat=True))
+
+    def test_rejected_restaurant_leaves_queue(self):
+        restaurant = Restaurant.objects.create(name="ร้านป้าแดง")
+        self.assertEqual(self.pending_ids(), {restaurant.pk})
+        moderate("restaurant", [restaurant.pk], ModerationLog.Action.REJECT, self.staff)
+        self.assertEqual(self.pending_ids(), set())
+
+    def test_only_latest_log_counts(self):
+        # เคยถูก reject แต่ต่อมาอนุมัติแล้วถูกปิดกลับ -> ต้องกลับเข้าคิว
+        restaurant = Restaurant.objects.create(name="ร้านลุงชัย")
+        moderate("restaurant", [restaurant.pk], ModerationLog.Action.REJECT, self.staff)
+        # ร้านที่ถูก reject ไม่อยู่ในคิวแล้ว -> เปิดกลับจากที่อื่น (เช่น admin) พร้อม log อนุมัติ
+        Restaurant.objects.filter(pk=restaurant.pk).update(is_active=True)
+        ModerationLog.objects.create(
+            kind="restaurant", object_id=restaurant.pk, action=ModerationLog.Action.APPROVE, moderator=self.staff,
+        )
+        Restaurant.objects.filter(pk=restaurant.pk).update(is_active=False)
+        self.assertEqual(self.pending_ids(), {restaurant.pk})
+        self.assertEqual(pending_counts(use_cache=False)["restaurant"], 1)
+
+
+class ModerateTests(TestCase):
+
+    def setUp(self):
+        cache.clear()  # pending_counts อยู่ใน cache ข้ามเทสต์
+        self.staff = User.objects.create(username="staff", is_staff=True)
+
+    def menus(self, n):
+        return [Menu.objects.create(name=f"ข้าวผัด {i}", price=50, status=Menu.Status.PENDING).pk for i in range(n)]
+
+    def test_bulk_approve_is_constant_queries(self):
+        for n in (2, 20):
+            ids = self.menus(n)
+            with self.assertNumQueries(MODERATE_QUERIES):
+                self.assertEqual(moderate("menu", ids, ModerationLog.Action.APPROVE, self.staff), n)
+            approved = Menu.objects.filter(pk__in=ids, status=Menu.Status.APPROVED, approved_by=self.staff)
+            self.assertEqual(approved.count(), n)
+            self.assertEqual(ModerationLog.objects.filter(kind="menu", object_id__in=ids).count(), n)
+
+    def test_reject_clears_approval(self):
+        ids = self.menus(1)
+        moderate("menu", ids, ModerationLog.Action.APPROVE, self.staff)
+        # เมนูถูกแก้แล้วกลับเข้าคิว (approved_by ค้างจากรอบก่อน)
+        Menu.objects.filter(pk__in=ids).update(status=Menu.Status.PENDING)
+        moderate("menu", ids, ModerationLog.Action.REJECT, self.staff)
+        menu = Menu.objects.get(pk=ids[0])
+        self.assertEqual(menu.status, Menu.Status.REJECTED)
+        self.assertIsNone(menu.approved_by)
+
+    def test_already_moderated_is_skipped(self):
+        # staff สองคนเปิดหน้าคิวเดียวกัน: คนแรกอนุมัติไปแล้ว คนที่สองกดปฏิเสธจากหน้าเก่า
+        ids = self.menus(2)
+        moderate("menu", ids[:1], ModerationLog.Action.APPROVE, self.staff)
+        self.assertEqual(moderate("menu", ids, ModerationLog.Action.REJECT, self.staff), 1)
+        status = dict(Menu.objects.values_list("pk", "status"))
+        self.assertEqual(status, {ids[0]: Menu.Status.APPROVED, ids[1]: Menu.Status.REJECTED})
+        logs = ModerationLog.objects.order_by("pk").values_list("object_id", "action")
+        self.assertEqual(list(logs), [(ids[0], ModerationLog.Action.APPROVE), (ids[1], ModerationLog.Action.REJECT)])
+        self.assertEqual(moderate("menu", ids, ModerationLog.Action.APPROVE, self.staff), 0)
+
+    def test_missing_ids_are_not_logged(self):
+        ids = self.menus(1)
+        self.assertEqual(moderate("menu", ids + [999999], ModerationLog.Action.APPROVE, self.staff), 1)
+        self.assertEqual(list(ModerationLog.objects.values_list("object_id", flat=True)), ids)
+        self.assertEqual(moderate("menu", [999999], ModerationLog.Action.APPROVE, self.staff), 0)
+
+    def test_unknown_kind_or_action(self):
+        with self.assertRaises(ValueError):
+            moderate("comment", [1], ModerationLog.Action.APPROVE, self.staff)
+        with self.assertRaises(ValueError):
+            moderate("menu", [1], "delete", self.staff)
+
+    def test_review_updates_topic_stats(self):
+        topic = Topic.objects.create(title="ร้านข้าวมันไก่", created_by=self.staff, status="approved", is_active=True)
+        review = Review.objects.create(topic=topic, author=self.staff, title="อร่อย", body="ข้าวนุ่ม ไก่ไม่แห้ง", rating=4, status="pending")
+        # สถิติของหัวข้อไม่นับรีวิวที่ถูกปฏิเสธ -> UPDATE ทั้งชุดต้องคำนวณใหม่ให้
+        moderate("review", [review.pk], ModerationLog.Action.REJECT, self.staff)
+        self.assertEqual(TopicStats.objects.get(topic=topic).n, 0)
+        Review.objects.filter(pk=review.pk).update(status="pending")  # ผู้เขียนแก้แล้วส่งตรวจใหม่
+        moderate("review", [review.pk], ModerationLog.Action.APPROVE, self.staff)
+        self.assertEqual(TopicStats.objects.get(topic=topic).n, 1)
+
+    def test_pending_counts_cached_and_invalidated(self):
+        ids = self.menus(3)
+        self.assertEqual(pending_counts()["menu"], 3)
+        Menu.objects.create(name="ผัดไทย", price=60, status=Menu.Status.PENDING)
+        with self.assertNumQueries(0):
+            self.assertEqual(pending_counts()["menu"], 3)  # ยังเป็นค่าใน cache
+        moderate("menu", ids[:1], ModerationLog.Action.APPROVE, self.staff)
+        counts = pending_counts()
+        self.assertEqual(counts["menu"], 3)
+        self.assertEqual(counts["total"], sum(counts[k] for k in ("topic", "review", "menu", "restaurant")))
+
+
+class BulkActionViewTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(User.objects.create(username="staff", is_staff=True))
+
+    def test_redirect_keeps_cursor_encoded(self):
+        menu = Menu.objects.create(name="ข้าวผัด", price=50, status=Menu.Status.PENDING)
+        after = "2024-01-01T00:00:00+07:00|5&kind=x"  # cursor มี + และ & ต้องไม่หลุดเป็นพารามิเตอร์อื่น
+        response = self.client.post(reverse("moderation:bulk_action", args=["menu"]), {
+            "action": ModerationLog.Action.APPROVE, "ids": [menu.pk], "after": after,
+        })
+        self.assertEqual(response.status_code, 302)
+        url = reverse("moderation:queue_kind", args=["menu"])
+        self.assertEqual(response["Location"], f"{url}?after=2024-01-01T00%3A00%3A00%2B07%3A00%7C5%26kind%3Dx")
+        self.assertEqual(self.client.get(response["Location"]).wsgi_request.GET["after"], after)
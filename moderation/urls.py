@@ -0,0 +1,10 @@
+from django.urls import path
+from . import views
+
+app_name = "moderation"
+
+urlpatterns = [
+    path("", views.queue, name="queue"),
+    path("<str:kind>/", views.queue, name="queue_kind"),
+    path("<str:kind>/bulk/", views.bulk_action, name="bulk_action"),
+]
@@ -0,0 +1,73 @@
+# moderation/views.py
+from urllib.parse import urlencode
+
+from django.contrib import messages
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import Http404
+from django.shortcuts import redirect, render
+from django.urls import reverse
+from django.views.decorators.http import require_POST
+
+from community.utils import keyset_page
+
+from .models import ModerationLog
+from .services import QUEUES, QUEUE_PAGE_SIZE, moderate, pending_counts, pending_queryset
+
+# select_related ต่อคิว (ให้ template แสดงผู้สร้าง/ร้านได้โดยไม่ N+1)
+QUEUE_RELATED = {
+    "topic": ("created_by", "duplicate_of"),
+    "review": ("author", "topic", "duplicate_of"),
+    "menu": ("restaurant", "created_by"),
+    "restaurant": ("created_by",),
+}
+
+
+@staff_member_required
+def queue(request, kind="topic"):
+    """
+    คิวตรวจสอบรวมของ staff
+    - แท็บละ 1 ประเภท + จำนวนรอตรวจทุกคิว (cache)
+    - แบ่งหน้าแบบ keyset เก่าสุดก่อน (?after=<cursor>)
+    """
+    if kind not in QUEUES:
+        raise Http404()
+
+    qs = pending_queryset(kind).select_related(*QUEUE_RELATED[kind])
+    items, next_cursor = keyset_page(qs, request.GET.get("after"), QUEUE_PAGE_SIZE, descending=False)
+
+    tabs = [(k, q["label"]) for k, q in QUEUES.items()]
+    return render(request, "moderation/queue.html", {
+        "kind": kind,
+        "label": QUEUES[kind]["label"],
+        "tabs": tabs,
+        "items": items,
+        "next_cursor": next_cursor,
+        "is_first_page": not request.GET.get("after"),
+        "counts": pending_counts(),
+        "recent_logs": ModerationLog.objects.filter(kind=kind).select_related("moderator")[:10],
+    })
+
+
+@staff_member_required
+@require_POST
+def bulk_action(request, kind):
+    """อนุมัติ/ปฏิเสธรายการที่ติ๊กเลือก (UPDATE เดียว + audit log ชุดเดียว)"""
+    if kind not in QUEUES:
+        raise Http404()
+
+    action = request.POST.get("action")
+    try:
+        ids = [int(i) for i in request.POST.getlist("ids")]
+    except ValueError:
+        ids = []
+
+    if action not in ModerationLog.Action.values or not ids:
+        messages.error(request, "กรุณาเลือกรายการและการดำเนินการ")
+    else:
+        n = moderate(kind, ids, action, request.user)
+        verb = "อนุมัติ" if action == ModerationLog.Action.APPROVE else "ปฏิเสธ"
+        messages.success(request, f"{verb}{QUEUES[kind]['label']} {n} รายการแล้ว")
+
+    url = reverse("moderation:queue_kind", args=[kind])
+    after = request.POST.get("after")
+    return redirect(f"{url}?{urlencode({'after': after})}" if after else url)
@@ -0,0 +1,20 @@
+from django.apps import AppConfig
+
+
+class PerfConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'perf'
+
+    def ready(self):
+        from django.conf import settings
+
+        # None = ตาม DEBUG ตอนรัน (ตัดสินใน middleware) -> ติดตั้งไว้ก่อน ไม่มี metrics ก็ไม่วัด
+        if getattr(settings, "PERF_INSTRUMENTATION", None) is not False:
+            from .metrics import instrument_templates
+            instrument_templates()
+
+        if getattr(settings, "PERF_SLOW_QUERY_MS", None):
+            from django.db.backends.signals import connection_created
+
+            from .slowlog import install
+            connection_created.connect(install, dispatch_uid="perf.slowlog.install")
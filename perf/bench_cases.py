@@ -0,0 +1,144 @@
+# perf/bench_cases.py
+"""
+ชุด microbenchmark (ไม่แตะฐานข้อมูล) ข้อมูลตัวอย่างเตรียมไว้ระดับโมดูล
+เพิ่มเคสใหม่: เขียนฟังก์ชันไม่มีอาร์กิวเมนต์แล้วครอบด้วย @bench("<กลุ่ม>.<ชื่อ>")
+"""
+from datetime import date
+
+from django.db import connection
+
+from budgets.views import _tokens_from_menu_name
+from menus.management.commands.import_lotus_csv import normalize_name, parse_grams_from_th_name, parse_price
+from menus.models import Menu
+from menus.utils import filter_by_plan
+from plan.views import _menu_date_from_payload
+from recipes.models import Recipe, UserCookingCostSetting
+from recipes.views import _compute_hidden_cost, _compute_hidden_preview
+from searches.services import normalize_filters
+
+from .microbench import bench
+
+# ---------- menus.utils.filter_by_plan ----------
+PLAN_SIMPLE = {"budget": "80", "allergies": [], "dislikes": [], "religions": [], "extra": {}}
+PLAN_STRICT = {
+    "budget": "120",
+    "allergies": ["กุ้ง", "นม", "ถั่ว"],
+    "dislikes": ["หมู", "เห็ด", "ผักชี"],
+    "religions": ["ฮาลาล", "หลีกเลี่ยงแอลกอฮอล์"],
+    "extra": {"allergy": "งา, ปลาร้า", "dislike": "ขิง"},
+}
+
+
+@bench("filter_by_plan.simple")
+def _filter_simple():
+    filter_by_plan(Menu.objects.all(), PLAN_SIMPLE)
+
+
+@bench("filter_by_plan.strict")
+def _filter_strict():
+    filter_by_plan(Menu.objects.all(), PLAN_STRICT)
+
+
+@bench("filter_by_plan.strict_compile")
+def _filter_strict_compile():
+    # สร้าง + compile เป็น SQL (ไม่ execute)
+    filter_by_plan(Menu.objects.all(), PLAN_STRICT).query.get_compiler(connection=connection).as_sql()
+
+
+# ---------- importer (import_lotus_csv) ----------
+LOTUS_NAMES = [
+    "หมูสับ 500 กรัม",
+    "อกไก่ กก.ละ",
+    "กุ้งขาว 1 กก.",
+    "ไข่ไก่ เบอร์ 2 แพ็ค 10",
+    "ใบกะเพรา 100 ก. แพ็ค 3",
+    "ข้าวหอมมะลิ 5กก",
+    "ซีอิ๊วขาว ตราเด็กสมบูรณ์ 700 มล.",
+]
+LOTUS_PRICES = ["฿1,299.00", "45", "89.50 บาท", "", "ราคา 12"]
+
+
+@bench("importer.parse_grams_from_th_name")
+def _parse_grams():
+    for name in LOTUS_NAMES:
+        parse_grams_from_th_name(name)
+
+
+@bench("importer.normalize_name")
+def _normalize_name():
+    for name in LOTUS_NAMES:
+        normalize_name(name)
+
+
+@bench("importer.parse_price")
+def _parse_price():
+    for text in LOTUS_PRICES:
+        parse_price(text)
+
+
+# ---------- searches.services.normalize_filters ----------
+FILTERS = {
+    "q": "ข้าวผัด",
+    "price_max": "80",
+    "religions": ["ฮาลาล", "หลีกเลี่ยงแอลกอฮอล์"],
+    "allergies": ["ถั่ว", "", None, "กุ้ง"],
+    "dislikes": [],
+    "restaurant": "",
+    "sort": None,
+    "types": ("menu", "recipe"),
+}
+
+
+@bench("searches.normalize_filters")
+def _normalize_filters():
+    normalize_filters(FILTERS)
+
+
+# ---------- recipes: ต้นทุนแฝง ----------
+SETTING_BASIC = UserCookingCostSetting(mode="basic")
+SETTING_ADVANCED = UserCookingCostSetting(mode="advanced", default_stove_type="induction")
+RECIPE = Recipe(title="ผัดกะเพราหมู", servings=2, cook_minutes=12, stove_type="gas")
+RECIPE_DEFAULT_STOVE = Recipe(title="ต้มยำกุ้ง", servings=3, cook_minutes=0)
+
+
+@bench("recipes.compute_hidden_cost.basic")
+def _hidden_cost_basic():
+    _compute_hidden_cost(RECIPE, SETTING_BASIC)
+
+
+@bench("recipes.compute_hidden_cost.advanced")
+def _hidden_cost_advanced():
+    _compute_hidden_cost(RECIPE, SETTING_ADVANCED)
+    _compute_hidden_cost(RECIPE_DEFAULT_STOVE, SETTING_ADVANCED)
+
+
+@bench("recipes.compute_hidden_preview.advanced")
+def _hidden_preview():
+    _compute_hidden_preview("2", "15", "", SETTING_ADVANCED)
+    _compute_hidden_preview(4, None, "gas", SETTING_ADVANCED)
+
+
+# ---------- budgets / plan ----------
+MENU_NAMES = ["ข้าวผัดกะเพราหมูกรอบ", "ก๋วยเตี๋ยวต้มยำ", "สลัดผักอกไก่", "ผัดไทยกุ้งสด", "ชานมไข่มุก"]
+
+
+@bench("budgets.tokens_from_menu_name")
+def _tokens():
+    for name in MENU_NAMES:
+        _tokens_from_menu_name(name)
+
+
+START = date(2026, 1, 5)
+PAYLOADS = [
+    {"id": 1, "date": "2026-01-07"},
+    {"id": 2, "day_offset": "3"},
+    {"id": 3, "date": "bad-date", "day_offset": -2},
+    {"id": 4},
+]
+
+
+@bench("plan.menu_date_from_payload")
+def _menu_date():
+    for payload in PAYLOADS:
+        _menu_date_from_payload(START, payload)
+
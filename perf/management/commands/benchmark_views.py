@@ -0,0 +1,150 @@
+import multiprocessing
+import os
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import Count
+from django.urls import reverse
+from django.utils import timezone
+
+from perf.management.commands.seed_synthetic import SYNTHETIC_PREFIX
+from perf.metrics import collect
+from perf.utils import percentile
+
+_client = None
+
+
+def _init_worker(user_id, host):
+    """ตั้งต้น process ลูก: Django + client ที่ล็อกอินแล้ว (ใช้ซ้ำทุก request ใน process นี้)"""
+    global _client
+    import django
+    django.setup()
+    from django.conf import settings
+    from django.test import Client
+
+    # นับ query เองใน _run_batch (Server-Timing ให้เฉพาะ staff และปิดตาม DEBUG)
+    # -> ปิด PerformanceMiddleware ไม่ให้ collect() ซ้อนกัน และไม่ต้อง log ทุก request ตอนยิงโหลด
+    settings.PERF_INSTRUMENTATION = False
+    _client = Client(HTTP_HOST=host)
+    _client.force_login(User.objects.get(pk=user_id))
+
+
+def _run_batch(batch):
+    """[(url, warmup?)] -> [(url, seconds, status, queries)]"""
+    results = []
+    for url, warmup in batch:
+        start = time.perf_counter()
+        with collect() as metrics:
+            response = _client.get(url)
+            if response.streaming:
+                for _ in response.streaming_content:
+                    pass
+        elapsed = time.perf_counter() - start
+        if not warmup:
+            results.append((url, elapsed, response.status_code, metrics.queries))
+    return results
+
+
+def default_urls(user) -> list[str]:
+    from community.models import Topic
+    from restaurants.models import Restaurant
+    from recipes.models import Recipe
+
+    today = timezone.localdate().isoformat()
+    urls = [
+        reverse("home"),
+        reverse("budgets:home"),
+        reverse("budgets:weekly_summary"),
+        reverse("budgets:day_detail", args=[today]),
+        reverse("plan:summary"),
+        reverse("menus:menu_list"),
+        reverse("restaurants:restaurant_list"),
+        reverse("recipes:list"),
+        reverse("community:topic_list"),
+        reverse("community:topic_list") + "?sort=hot",
+    ]
+    restaurant = Restaurant.objects.filter(is_active=True).annotate(n=Count("menus")).order_by("-n").first()
+    if restaurant:
+        urls.append(reverse("restaurants:restaurant_detail", args=[restaurant.pk]))
+    recipe = Recipe.objects.annotate(n=Count("recipe_ingredients")).order_by("-n").first()
+    if recipe:
+        urls.append(reverse("recipes:detail", args=[recipe.pk]))
+    topic = Topic.objects.filter(is_active=True).order_by("-reviews_count").first()
+    if topic:
+        urls.append(reverse("community:topic_detail", args=[topic.pk]))
+    return urls
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive the main views with the Django test client across worker processes and report "
+        "p50/p95/p99 latency per URL (seed data first with seed_synthetic)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=50, help="Measured requests per URL")
+        parser.add_argument("--warmup", type=int, default=3, help="Unmeasured requests per URL per worker")
+        parser.add_argument("--workers", type=int, default=max(1, min(4, os.cpu_count() or 1)))
+        parser.add_argument("--user", help="Username to log in as (default: synthetic user with most spends)")
+        parser.add_argument("--prefix", default=SYNTHETIC_PREFIX, help="Synthetic username prefix (same as seed_synthetic --prefix)")
+        parser.add_argument("--url", action="append", dest="urls", help="URL to hit (repeatable; default: main views)")
+        parser.add_argument("--host", default="localhost", help="Host header (must be in ALLOWED_HOSTS)")
+
+    def handle(self, *args, **options):
+        if options["user"]:
+            user = User.objects.filter(username=options["user"]).first()
+        else:
+            user = (
+                User.objects.filter(username__startswith=options["prefix"] + "_")
+                .annotate(n=Count("budget_spends")).order_by("-n").first()
+            )
+        if user is None:
+            raise CommandError("No user to log in as; run seed_synthetic or pass --user")
+
+        urls = options["urls"] or default_urls(user)
+        workers = max(1, options["workers"])
+
+        # แบ่งงานเป็น batch เล็ก ๆ สลับ URL กัน ให้ทุก worker ได้ทุก URL
+        tasks = [(url, False) for _ in range(options["requests"]) for url in urls]
+        batch_size = max(1, len(tasks) // (workers * 8))
+        batches = [tasks[i:i + batch_size] for i in range(0, len(tasks), batch_size)]
+        warmups = [[(url, True) for _ in range(options["warmup"]) for url in urls] for _ in range(workers)]
+
+        self.stdout.write(f"{len(urls)} URL(s) x {options['requests']} request(s), {workers} worker(s), user {user.username}")
+        connections.close_all()  # ห้ามส่ง connection ที่เปิดอยู่ข้าม fork
+
+        samples = []
+        ctx = multiprocessing.get_context("fork" if "fork" in multiprocessing.get_all_start_methods() else "spawn")
+        wall = time.perf_counter()
+        with ctx.Pool(workers, initializer=_init_worker, initargs=(user.pk, options["host"])) as pool:
+            pool.map(_run_batch, warmups, chunksize=1)
+            for result in pool.imap_unordered(_run_batch, batches):
+                samples.extend(result)
+        wall = time.perf_counter() - wall
+
+        self.report(urls, samples, wall)
+
+    def report(self, urls, samples, wall):
+        by_url = {url: [] for url in urls}
+        for url, elapsed, status, queries in samples:
+            by_url[url].append((elapsed * 1000, status, queries))
+
+        header = f"{'URL':<42} {'n':>5} {'err':>4} {'p50':>8} {'p95':>8} {'p99':>8} {'mean':>8} {'max':>8} {'queries':>7}"
+        self.stdout.write(header)
+        self.stdout.write("-" * len(header))
+        for url, rows in by_url.items():
+            times = sorted(ms for ms, _, _ in rows)
+            errors = sum(1 for _, status, _ in rows if status >= 400)
+            queries = [q for _, _, q in rows if q is not None]
+            self.stdout.write(
+                f"{url[:42]:<42} {len(times):>5} {errors:>4} "
+                f"{percentile(times, 50):>8.1f} {percentile(times, 95):>8.1f} {percentile(times, 99):>8.1f} "
+                f"{statistics.fmean(times) if times else 0:>8.1f} {times[-1] if times else 0:>8.1f} "
+                f"{statistics.fmean(queries) if queries else 0:>7.1f}"
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(samples)} request(s) in {wall:.1f}s = {len(samples) / wall if wall else 0:.1f} req/s (times in ms)"
+        ))
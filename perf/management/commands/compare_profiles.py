@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from perf import profiler
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare two profiles saved by ProfilerMiddleware (?_profile=1): "
+        "per-function time and call-count deltas"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("before", nargs="?", help=".prof path or file name in PERF_PROFILE_DIR")
+        parser.add_argument("after", nargs="?")
+        parser.add_argument("--list", action="store_true", help="List saved profiles (newest first) and exit")
+        parser.add_argument("--sort", choices=["self", "cumulative"], default="self",
+                            help="Compare self time (default) or cumulative time")
+        parser.add_argument("--limit", type=int, default=25)
+
+    def handle(self, *args, **options):
+        if options["list"] or not options["before"]:
+            self.list_profiles()
+            return
+        if not options["after"]:
+            raise CommandError("Need two profiles: compare_profiles BEFORE AFTER")
+
+        try:
+            before = profiler.load_stats(options["before"])
+            after = profiler.load_stats(options["after"])
+        except FileNotFoundError as exc:
+            raise CommandError(f"Profile not found: {exc.filename}")
+
+        self.stdout.write(
+            f"total: {before.total_tt * 1000:.1f} ms -> {after.total_tt * 1000:.1f} ms, "
+            f"calls: {before.total_calls} -> {after.total_calls}"
+        )
+        self.stdout.write(f"{'before ms':>10} {'after ms':>10} {'delta':>10} {'calls':>15}  function ({options['sort']})")
+        for row in profiler.diff_stats(before, after, options["sort"])[:options["limit"]]:
+            line = (
+                f"{row['before_ms']:>10.2f} {row['after_ms']:>10.2f} {row['delta_ms']:>+10.2f} "
+                f"{row['before_calls']:>7}->{row['after_calls']:<7}  {row['function']}"
+            )
+            if row["delta_ms"] > 0:
+                line = self.style.ERROR(line)
+            elif row["delta_ms"] < 0:
+                line = self.style.SUCCESS(line)
+            self.stdout.write(line)
+
+    def list_profiles(self):
+        directory = profiler.profile_dir()
+        files = sorted(directory.glob("*.prof"), reverse=True) if directory.exists() else []
+        if not files:
+            self.stdout.write(f"No profiles in {directory}")
+            return
+        for path in files:
+            self.stdout.write(path.name)
@@ -0,0 +1,86 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from perf import microbench
+
+
+class Command(BaseCommand):
+    help = (
+        "Run microbenchmarks of hot pure-Python helpers (perf/bench_cases.py); "
+        "--save stores a baseline, --compare checks against one"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("names", nargs="*", help="Only benchmarks whose name contains one of these")
+        parser.add_argument("--list", action="store_true", help="List benchmark names and exit")
+        parser.add_argument("--repeat", type=int, default=microbench.DEFAULT_REPEAT)
+        parser.add_argument("--min-time", type=float, default=microbench.DEFAULT_MIN_TIME,
+                            help="Seconds per measurement (loops are scaled up to reach it)")
+        parser.add_argument("--save", metavar="NAME", help="Save results as perf/baselines/NAME.json (or a .json path)")
+        parser.add_argument("--compare", metavar="NAME", help="Compare against a saved baseline")
+        parser.add_argument("--against", metavar="NAME",
+                            help="With --compare: compare two saved results instead of running")
+        parser.add_argument("--threshold", type=float, default=microbench.DEFAULT_THRESHOLD,
+                            help="Relative change counted as faster/slower (default 0.10)")
+        parser.add_argument("--fail-on-regression", action="store_true", help="Exit non-zero if anything is slower")
+
+    def handle(self, *args, **options):
+        if options["list"]:
+            for name in microbench.load_cases():
+                self.stdout.write(name)
+            return
+
+        if options["against"]:
+            if not options["compare"]:
+                raise CommandError("--against needs --compare")
+            result = microbench.load(options["against"])
+        else:
+            result = microbench.run(options["names"], repeat=options["repeat"], min_time=options["min_time"])
+            self.print_results(result)
+
+        if options["save"]:
+            path = microbench.save(result, options["save"])
+            self.stdout.write(self.style.SUCCESS(f"Saved {path}"))
+
+        if options["compare"]:
+            try:
+                base = microbench.load(options["compare"])
+            except FileNotFoundError:
+                raise CommandError(f"Baseline not found: {microbench.baseline_path(options['compare'])}")
+            if options["names"]:  # รันแค่บางตัว -> ไม่ต้องแสดงตัวที่ไม่ได้รันว่า missing
+                base = {**base, "benchmarks": {
+                    k: v for k, v in base["benchmarks"].items() if k in result["benchmarks"]
+                }}
+            slower = self.print_comparison(base, result, options["threshold"])
+            if slower and options["fail_on_regression"]:
+                raise CommandError(f"{slower} benchmark(s) slower than baseline")
+
+    def print_results(self, result):
+        self.stdout.write(f"{'benchmark':<42} {'median':>10} {'min':>10} {'stdev':>8} {'loops':>8}")
+        for name, r in result["benchmarks"].items():
+            rel = r["stdev"] / r["median"] * 100 if r["median"] else 0
+            self.stdout.write(
+                f"{name:<42} {microbench.format_time(r['median']):>10} {microbench.format_time(r['min']):>10} "
+                f"{rel:>7.1f}% {r['loops']:>8}"
+            )
+
+    def print_comparison(self, base, new, threshold) -> int:
+        meta = base.get("meta", {})
+        self.stdout.write(f"\nBaseline: {meta.get('date', '?')} Python {meta.get('python', '?')} ({meta.get('platform', '?')})")
+        self.stdout.write(f"{'benchmark':<42} {'baseline':>10} {'now':>10} {'change':>9}")
+        slower = 0
+        for row in microbench.compare(base, new, threshold):
+            if row["ratio"] is None:
+                change = row["status"]
+            else:
+                change = f"{(row['ratio'] - 1) * 100:+.1f}%"
+            line = (
+                f"{row['name']:<42} {microbench.format_time(row['base']):>10} "
+                f"{microbench.format_time(row['new']):>10} {change:>9}"
+            )
+            if row["status"] == "slower":
+                slower += 1
+                line = self.style.ERROR(line + "  slower")
+            elif row["status"] == "faster":
+                line = self.style.SUCCESS(line + "  faster")
+            self.stdout.write(line)
+        return slower
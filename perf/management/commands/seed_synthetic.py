@@ -0,0 +1,318 @@
+import random
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from accounts.models import Profile
+from budgets.models import BudgetSpend, DailyBudget, MealPlan
+from community.models import Comment, Like, Review, Topic
+from community.services import rebuild_topic_stats, rebuild_trending
+from menus.models import Ingredient, Menu
+from recipes.models import Recipe, RecipeIngredient
+from restaurants.models import Restaurant
+
+# ---------- คลังคำภาษาไทย ----------
+FIRST_NAMES = [
+    "สมชาย", "สมหญิง", "วิชัย", "มาลี", "ประเสริฐ", "สุดา", "อนุชา", "กมลา", "ธนากร", "ปิยะนุช",
+    "ณัฐวุฒิ", "ศิริพร", "ชยพล", "วราภรณ์", "กิตติ", "พิมพ์ชนก", "ภาณุ", "อรุณี", "เอกชัย", "นภัสสร",
+]
+RESTAURANT_PREFIX = ["ร้าน", "ครัว", "เจ๊", "ป้า", "ลุง", "โรงอาหาร", "บ้าน", "ข้าวแกง"]
+RESTAURANT_NAME = ["แดง", "สมศรี", "ชัยพร", "อร่อยดี", "ริมน้ำ", "หน้ามอ", "ประตูน้ำ", "ตลาดพลู", "เยาวราช", "บางรัก"]
+LOCATIONS = ["สยาม", "ลาดพร้าว", "บางนา", "รังสิต", "ท่าพระจันทร์", "ศาลายา", "ห้วยขวาง", "อารีย์", "บางแสน", "เชียงใหม่"]
+DISHES = [
+    "ข้าวผัด", "ผัดกะเพรา", "ต้มยำ", "แกงเขียวหวาน", "ผัดไทย", "ข้าวมันไก่", "ก๋วยเตี๋ยว", "ราดหน้า",
+    "ข้าวขาหมู", "ส้มตำ", "ลาบ", "ผัดซีอิ๊ว", "ข้าวหมูแดง", "แกงส้ม", "ไข่เจียว", "สุกี้",
+]
+PROTEINS = ["หมู", "ไก่", "กุ้ง", "เนื้อวัว", "ทะเล", "เต้าหู้", "หมูกรอบ", "ปลาหมึก", "ไข่", "เห็ด"]
+INGREDIENTS = [
+    ("หมูสับ", 180), ("อกไก่", 120), ("กุ้งขาว", 320), ("เนื้อวัว", 350), ("ปลาหมึก", 260), ("ไข่ไก่", 110),
+    ("เต้าหู้", 60), ("ข้าวหอมมะลิ", 45), ("เส้นเล็ก", 70), ("ใบกะเพรา", 80), ("พริกขี้หนู", 150),
+    ("กระเทียม", 90), ("หอมแดง", 85), ("มะนาว", 60), ("น้ำปลา", 55), ("ซีอิ๊วขาว", 50), ("กะทิ", 75),
+    ("ถั่วงอก", 40), ("ผักบุ้ง", 50), ("เห็ดฟาง", 120), ("มะเขือเทศ", 45), ("แตงกวา", 35),
+]
+REVIEW_WORDS = [
+    "อร่อยมาก", "รสจัดจ้าน", "ราคาไม่แพง", "ปริมาณเยอะ", "ร้านสะอาด", "บริการดี", "รอนานไปหน่อย",
+    "น้ำซุปกลมกล่อม", "เผ็ดกำลังดี", "จะกลับมาอีก", "ที่จอดรถหายาก", "คุ้มค่า", "เส้นเหนียวนุ่ม",
+]
+SYNTHETIC_PREFIX = "syn"  # ชื่อผู้ใช้ขึ้นต้นด้วย "<prefix>_" (benchmark_views ใช้หาผู้ใช้ที่จะล็อกอิน)
+MEALS = ["มื้อเช้า", "มื้อเที่ยง", "มื้อเย็น"]
+RATING_WEIGHTS = [3, 5, 15, 37, 40]  # 1..5 ดาว เอียงไปทางคะแนนสูงแบบรีวิวจริง
+
+
+def _price(rng, median=60, spread=0.45) -> int:
+    """ราคาแบบ lognormal (ส่วนใหญ่ 40-100 มีบางจานแพง)"""
+    return max(20, int(rng.lognormvariate(0, spread) * median))
+
+
+def _heavy_tail(rng, mean: float, cap: int) -> int:
+    """จำนวนแบบหางยาว (หัวข้อดัง ๆ มีรีวิวเยอะกว่าค่าเฉลี่ยมาก)"""
+    return min(cap, int(rng.paretovariate(1.6) * mean * 0.4))
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate synthetic users, restaurants, menus, recipes, plans, months of spends and community "
+        "content with bulk_create (for load testing; remove with --clear)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=200)
+        parser.add_argument("--restaurants", type=int, default=50)
+        parser.add_argument("--menus-per-restaurant", type=int, default=20)
+        parser.add_argument("--recipes", type=int, default=300)
+        parser.add_argument("--days", type=int, default=90, help="Days of BudgetSpend history per user")
+        parser.add_argument("--topics", type=int, default=100)
+        parser.add_argument("--reviews-per-topic", type=float, default=15, help="Mean (heavy-tailed)")
+        parser.add_argument("--prefix", default=SYNTHETIC_PREFIX, help="Username prefix marking synthetic data")
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--batch-size", type=int, default=2000)
+        parser.add_argument("--clear", action="store_true", help="Delete previously generated data and exit")
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options["seed"])
+        self.batch = options["batch_size"]
+        self.prefix = options["prefix"] + "_"
+
+        if options["clear"]:
+            self.clear()
+            return
+
+        with transaction.atomic():
+            users = self.make_users(options["users"])
+            ingredients = self.make_ingredients()
+            menus = self.make_restaurants_and_menus(users, ingredients, options["restaurants"], options["menus_per_restaurant"])
+            self.make_recipes(users, ingredients, options["recipes"])
+            self.make_budgets(users, menus, options["days"])
+            topic_ids = self.make_community(users, options["topics"], options["reviews_per_topic"])
+
+        rebuild_topic_stats(topic_ids)
+        rebuild_trending()
+        self.stdout.write(self.style.SUCCESS("Synthetic data ready"))
+
+    # ---------- helpers ----------
+    def report(self, label, n):
+        self.stdout.write(f"{label}: {n}")
+
+    def bulk(self, model, objs):
+        return model.objects.bulk_create(objs, batch_size=self.batch)
+
+    def clear(self):
+        synthetic = User.objects.filter(username__startswith=self.prefix)
+        with transaction.atomic():
+            # ของที่ผูกกับผู้ใช้แบบ SET_NULL ต้องลบเองก่อน
+            for model in (Topic, Recipe, Menu, Restaurant):
+                deleted, _ = model.objects.filter(created_by__in=synthetic).delete()
+                self.report(f"deleted {model._meta.label}", deleted)
+            deleted, _ = synthetic.delete()
+        self.report("deleted users (+ cascaded rows)", deleted)
+
+    # ---------- generators ----------
+    def make_users(self, n):
+        rng = self.rng
+        start = User.objects.filter(username__startswith=self.prefix).count()
+        users = self.bulk(User, [
+            User(
+                username=f"{self.prefix}{start + i:05d}",
+                first_name=rng.choice(FIRST_NAMES),
+                email=f"{self.prefix}{start + i:05d}@example.com",
+                password="!",  # unusable password (ใช้ force_login ตอน benchmark)
+            )
+            for i in range(n)
+        ])
+        # bulk_create ไม่ส่ง post_save -> สร้าง Profile เอง
+        self.bulk(Profile, [Profile(user=u) for u in users])
+        self.report("users", len(users))
+        return users
+
+    def make_ingredients(self):
+        rng = self.rng
+        # ราคา/กก. -> ชื่อซ้ำกับของที่นำเข้าไว้แล้วก็ข้าม
+        Ingredient.objects.bulk_create([
+            Ingredient(
+                name=name, source="custom", price=Decimal(price), size_grams=Decimal(1000),
+                price_per_gram=(Decimal(price) / 1000).quantize(Decimal("0.0001")),
+            )
+            for name, price in INGREDIENTS
+        ], ignore_conflicts=True)
+        ingredients = list(Ingredient.objects.all()[:500])
+        rng.shuffle(ingredients)
+        self.report("ingredients available", len(ingredients))
+        return ingredients
+
+    def make_restaurants_and_menus(self, users, ingredients, n_restaurants, per_restaurant):
+        rng = self.rng
+        taken = set(Restaurant.objects.values_list("name", flat=True))
+        restaurants = []
+        for i in range(n_restaurants):
+            name = f"{rng.choice(RESTAURANT_PREFIX)}{rng.choice(RESTAURANT_NAME)} {rng.choice(LOCATIONS)}"
+            while name in taken:
+                name = f"{name} {rng.randint(2, 999)}"
+            taken.add(name)
+            restaurants.append(Restaurant(
+                name=name, location=rng.choice(LOCATIONS), description="ข้อมูลจำลองสำหรับทดสอบโหลด",
+                is_active=rng.random() < 0.9, created_by=rng.choice(users),
+            ))
+        restaurants = self.bulk(Restaurant, restaurants)
+
+        menus = []
+        for r in restaurants:
+            for _ in range(max(1, int(rng.gauss(per_restaurant, per_restaurant / 4)))):
+                protein = rng.choice(PROTEINS)
+                status = rng.choices(
+                    [Menu.Status.APPROVED, Menu.Status.PENDING, Menu.Status.REJECTED], weights=[85, 10, 5],
+                )[0]
+                menus.append(Menu(
+                    restaurant=r, restaurant_name=r.name,
+                    name=f"{rng.choice(DISHES)}{protein}", description=f"{rng.choice(REVIEW_WORDS)} ใส่{protein}",
+                    price=_price(rng), status=status,
+                    is_halal=protein != "หมู" and rng.random() < 0.3,
+                    is_vegetarian=protein in ("เต้าหู้", "เห็ด"), no_alcohol=True,
+                    created_by=rng.choice(users),
+                ))
+        menus = self.bulk(Menu, menus)
+
+        through = Menu.ingredients.through
+        links = []
+        if ingredients:
+            for m in menus:
+                for ing in rng.sample(ingredients, min(len(ingredients), rng.randint(2, 6))):
+                    links.append(through(menu_id=m.pk, ingredient_id=ing.pk))
+        self.bulk(through, links)
+        self.report("restaurants", len(restaurants))
+        self.report("menus", len(menus))
+        self.report("menu-ingredient links", len(links))
+        return [m for m in menus if m.status == Menu.Status.APPROVED]
+
+    def make_recipes(self, users, ingredients, n):
+        rng = self.rng
+        recipes = self.bulk(Recipe, [
+            Recipe(
+                title=f"{rng.choice(DISHES)}{rng.choice(PROTEINS)} สูตร{rng.choice(FIRST_NAMES)}",
+                description=rng.choice(REVIEW_WORDS), servings=rng.randint(1, 4),
+                prep_minutes=rng.choice([5, 10, 15, 20]), cook_minutes=rng.choice([5, 10, 15, 30, 45]),
+                created_by=rng.choice(users),
+            )
+            for _ in range(n)
+        ])
+        rows = []
+        if ingredients:
+            for recipe in recipes:
+                for ing in rng.sample(ingredients, min(len(ingredients), rng.randint(3, 8))):
+                    grams = Decimal(rng.choice([10, 20, 50, 100, 150, 200, 300]))
+                    ppg = ing.price_per_gram or Decimal(0)
+                    rows.append(RecipeIngredient(
+                        recipe=recipe, ingredient=ing, quantity_grams=grams,
+                        price_per_gram_snapshot=ppg, cost_snapshot=(grams * ppg).quantize(Decimal("0.01")),
+                    ))
+        self.bulk(RecipeIngredient, rows)
+        self.report("recipes", len(recipes))
+        self.report("recipe ingredients", len(rows))
+
+    def make_budgets(self, users, menus, days):
+        if not menus:
+            return
+        rng = self.rng
+        today = timezone.localdate()
+        first_day = today - timedelta(days=days - 1)
+
+        plans = []
+        for u in users:
+            for _ in range(rng.randint(0, 3)):
+                plans.append(MealPlan(
+                    user=u, start_date=first_day + timedelta(days=rng.randrange(days)),
+                    days=rng.choice([1, 7, 7, 7]), budget_per_day=rng.choice([100, 150, 200, 300]),
+                    title="แผนจำลอง",
+                ))
+        plans = self.bulk(MealPlan, plans)
+
+        budgets = []
+        for p in plans:
+            for d in range(p.days):
+                budgets.append(DailyBudget(user=p.user, date=p.start_date + timedelta(days=d), amount=p.budget_per_day, plan=p))
+        self.bulk(DailyBudget, budgets)
+
+        plans_by_user = {}
+        for p in plans:
+            plans_by_user.setdefault(p.user_id, []).append(p)
+
+        spends, n_spends = [], 0
+        for u in users:
+            active = rng.random()  # บางคนบันทึกทุกวัน บางคนนาน ๆ ที
+            for d in range(days):
+                if rng.random() > active:
+                    continue
+                date = first_day + timedelta(days=d)
+                plan = next(
+                    (p for p in plans_by_user.get(u.pk, []) if p.start_date <= date < p.start_date + timedelta(days=p.days)),
+                    None,
+                )
+                for meal in rng.sample(MEALS, rng.randint(1, 3)):
+                    menu = rng.choice(menus)
+                    spends.append(BudgetSpend(
+                        user=u, date=date, amount=int(menu.price), menu=menu, note=meal, plan=plan,
+                    ))
+            if len(spends) >= self.batch * 5:  # ไม่ต้องถือทั้งหมดไว้ในหน่วยความจำ
+                self.bulk(BudgetSpend, spends)
+                n_spends += len(spends)
+                spends = []
+        self.bulk(BudgetSpend, spends)
+        n_spends += len(spends)
+        self.report("plans", len(plans))
+        self.report("daily budgets", len(budgets))
+        self.report("spends", n_spends)
+
+    def make_community(self, users, n_topics, mean_reviews):
+        rng = self.rng
+        now = timezone.now()
+        topics = []
+        for _ in range(n_topics):
+            t = Topic(
+                title=f"{rng.choice(DISHES)}{rng.choice(PROTEINS)} {rng.choice(RESTAURANT_PREFIX)}{rng.choice(RESTAURANT_NAME)}",
+                description=f"รีวิว{rng.choice(DISHES)}ย่าน{rng.choice(LOCATIONS)}",
+                created_by=rng.choice(users), created_at=now - timedelta(hours=rng.randint(1, 24 * 180)),
+                status=rng.choices(["approved", "pending"], weights=[95, 5])[0],
+            )
+            t.compute_simhash()  # bulk_create ไม่เรียก save()
+            topics.append(t)
+        topics = self.bulk(Topic, topics)
+
+        reviews = []
+        for t in topics:
+            n = _heavy_tail(rng, mean_reviews, cap=len(users) * 2)
+            t.reviews_count = n
+            for _ in range(n):
+                status = rng.choices(["approved", "pending", "rejected"], weights=[90, 7, 3])[0]
+                r = Review(
+                    topic=t, title=rng.choice(REVIEW_WORDS),
+                    body=" ".join(rng.sample(REVIEW_WORDS, 3)), price=_price(rng),
+                    rating=rng.choices([1, 2, 3, 4, 5], weights=RATING_WEIGHTS)[0], author=rng.choice(users),
+                    created_at=t.created_at + timedelta(hours=rng.randint(0, 24 * 30)), status=status,
+                )
+                r.compute_simhash()
+                reviews.append(r)
+        reviews = self.bulk(Review, reviews)
+
+        likes, comments = [], []
+        for r in reviews:
+            likers = rng.sample(users, min(len(users), int(rng.expovariate(1 / 4))))
+            likes += [Like(review=r, user=u) for u in likers]
+            r.likes_count = len(likers)
+            r.comments_count = int(rng.expovariate(1 / 2))
+            comments += [
+                Comment(review=r, user=rng.choice(users), message=rng.choice(REVIEW_WORDS))
+                for _ in range(r.comments_count)
+            ]
+        self.bulk(Like, likes)
+        self.bulk(Comment, comments)
+        Review.objects.bulk_update(reviews, ["likes_count", "comments_count"], batch_size=self.batch)
+        Topic.objects.bulk_update(topics, ["reviews_count"], batch_size=self.batch)
+
+        self.report("topics", len(topics))
+        self.report("reviews", len(reviews))
+        self.report("likes", len(likes))
+        self.report("comments", len(comments))
+        return [t.pk for t in topics]
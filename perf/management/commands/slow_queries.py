@@ -0,0 +1,127 @@
+import glob
+import json
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from perf.utils import percentile
+
+SORT_KEYS = {
+    "total": lambda g: g["total"],
+    "count": lambda g: g["count"],
+    "max": lambda g: g["max"],
+    "p95": lambda g: g["p95"],
+}
+
+
+def read_entries(path: str, rotated: bool = True):
+    """อ่านบรรทัด JSON จาก log (รวมไฟล์ที่ถูก rotate: .1 .2 ...) ข้ามบรรทัดที่อ่านไม่ได้"""
+    paths = [path]
+    if rotated:
+        paths += sorted(glob.glob(glob.escape(path) + ".*"))
+    for p in paths:
+        try:
+            with open(p, encoding="utf-8") as fh:
+                for line in fh:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue
+        except FileNotFoundError:
+            continue
+
+
+def aggregate(entries) -> list[dict]:
+    groups = {}
+    for e in entries:
+        g = groups.setdefault(e["fingerprint"], {
+            "fingerprint": e["fingerprint"],
+            "normalized": e.get("normalized", ""),
+            "times": [],
+            "views": Counter(),
+            "stacks": Counter(),
+            "slowest": e,
+        })
+        g["times"].append(e["ms"])
+        g["views"][e.get("view") or "-"] += 1
+        if e.get("stack"):
+            g["stacks"][e["stack"][0]] += 1
+        if e["ms"] > g["slowest"]["ms"]:
+            g["slowest"] = e
+
+    rows = []
+    for g in groups.values():
+        times = sorted(g.pop("times"))
+        g.update(
+            count=len(times),
+            total=sum(times),
+            mean=sum(times) / len(times),
+            p95=percentile(times, 95),
+            max=times[-1],
+        )
+        rows.append(g)
+    return rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Summarise the slow query log (PERF_SLOW_QUERY_LOG) by SQL fingerprint: "
+        "count, total/mean/p95/max time, views and code locations"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--log", help="Log file (default: settings.PERF_SLOW_QUERY_LOG)")
+        parser.add_argument("--no-rotated", action="store_true", help="Ignore rotated files (.1, .2, ...)")
+        parser.add_argument("--top", type=int, default=20)
+        parser.add_argument("--sort", choices=sorted(SORT_KEYS), default="total")
+        parser.add_argument("--since-hours", type=float, help="Only entries from the last N hours")
+        parser.add_argument("--view", help="Only entries whose view contains this text")
+        parser.add_argument("--details", action="store_true",
+                            help="Print full SQL, slowest params and the app stack for each fingerprint")
+
+    def handle(self, *args, **options):
+        path = options["log"] or getattr(settings, "PERF_SLOW_QUERY_LOG", None)
+        if not path:
+            raise CommandError("No log file: pass --log or set PERF_SLOW_QUERY_LOG")
+
+        entries = read_entries(path, rotated=not options["no_rotated"])
+        if options["since_hours"]:
+            cutoff = time.time() - options["since_hours"] * 3600
+            entries = (e for e in entries if e.get("ts", 0) >= cutoff)
+        if options["view"]:
+            entries = (e for e in entries if options["view"] in (e.get("view") or ""))
+
+        rows = aggregate(entries)
+        if not rows:
+            self.stdout.write(f"No slow queries in {path}")
+            return
+        rows.sort(key=SORT_KEYS[options["sort"]], reverse=True)
+
+        self.stdout.write(
+            f"{len(rows)} fingerprints, {sum(r['count'] for r in rows)} slow queries (sorted by {options['sort']})"
+        )
+        self.stdout.write(
+            f"{'fingerprint':<13} {'count':>6} {'total ms':>10} {'mean':>8} {'p95':>8} {'max':>8}  top view"
+        )
+        for row in rows[:options["top"]]:
+            view, n = row["views"].most_common(1)[0]
+            self.stdout.write(
+                f"{row['fingerprint']:<13} {row['count']:>6} {row['total']:>10.1f} {row['mean']:>8.1f} "
+                f"{row['p95']:>8.1f} {row['max']:>8.1f}  {view} ({n})"
+            )
+            if options["details"]:
+                self.print_details(row)
+            else:
+                self.stdout.write(f"  {row['normalized'][:160]}")
+
+    def print_details(self, row):
+        slowest = row["slowest"]
+        self.stdout.write(f"  SQL:    {row['normalized']}")
+        self.stdout.write(f"  params: {slowest.get('params')} ({slowest['ms']} ms)")
+        for view, n in row["views"].most_common(5):
+            self.stdout.write(f"  view:   {view} x{n}")
+        for frame in slowest.get("stack") or []:
+            self.stdout.write(f"    {frame}")
+        self.stdout.write("")
@@ -0,0 +1,131 @@
+# perf/metrics.py
+"""
+เก็บตัวเลขประสิทธิภาพของ request ปัจจุบัน
+- DB: จำนวน query, เวลารวม, query ที่ช้าที่สุด (ผ่าน connection.execute_wrapper)
+- template: เวลา render รวม (นับเฉพาะ template นอกสุด ไม่นับ include/extends ซ้ำ)
+- CPU: thread_time() ของ thread ที่รัน request
+- cache: hit / miss ของ caching.services
+ค่าเก็บใน contextvar -> ไม่มี request ที่วัดอยู่ = ไม่ทำอะไรเพิ่ม
+"""
+import contextvars
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.db import connections
+
+SQL_PREVIEW_CHARS = 300
+
+_current = contextvars.ContextVar("perf_metrics", default=None)
+
+
+class RequestMetrics:
+    __slots__ = (
+        "started", "cpu_started", "queries", "db_time", "slowest_sql", "slowest_time",
+        "template_time", "_template_depth", "total_time", "cpu_time", "query_log",
+        "cache_hits", "cache_misses",
+    )
+
+    def __init__(self, keep_queries: bool = False):
+        self.started = time.perf_counter()
+        self.cpu_started = time.thread_time()
+        self.queries = 0
+        self.db_time = 0.0
+        self.slowest_sql = ""
+        self.slowest_time = 0.0
+        self.template_time = 0.0
+        self._template_depth = 0
+        self.total_time = 0.0
+        self.cpu_time = 0.0
+        self.query_log = [] if keep_queries else None  # [(sql, params, seconds)] เฉพาะตอน profile
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def finish(self):
+        self.total_time = time.perf_counter() - self.started
+        self.cpu_time = time.thread_time() - self.cpu_started
+
+    def record_query(self, sql, params, elapsed):
+        if self.query_log is not None:
+            self.query_log.append((sql, params, elapsed))
+        self.queries += 1
+        self.db_time += elapsed
+        if elapsed > self.slowest_time:
+            self.slowest_time = elapsed
+            self.slowest_sql = sql
+
+    def record_cache(self, hit: bool):
+        if hit:
+            self.cache_hits += 1
+        else:
+            self.cache_misses += 1
+
+    def as_dict(self) -> dict:
+        return {
+            "total_ms": round(self.total_time * 1000, 2),
+            "cpu_ms": round(self.cpu_time * 1000, 2),
+            "queries": self.queries,
+            "db_ms": round(self.db_time * 1000, 2),
+            "slowest_query_ms": round(self.slowest_time * 1000, 2),
+            "slowest_query": (self.slowest_sql or "")[:SQL_PREVIEW_CHARS],
+            "template_ms": round(self.template_time * 1000, 2),
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+        }
+
+
+def current_metrics():
+    return _current.get()
+
+
+def _query_timer(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.record_query(sql, params, time.perf_counter() - start)
+
+
+@contextmanager
+def collect(keep_queries: bool = False):
+    """วัดทุกอย่างภายใน with -> ได้ RequestMetrics (finish() ให้แล้วตอนออก)"""
+    metrics = RequestMetrics(keep_queries)
+    token = _current.set(metrics)
+    try:
+        with ExitStack() as stack:
+            for conn in connections.all():
+                stack.enter_context(conn.execute_wrapper(_query_timer))
+            yield metrics
+    finally:
+        metrics.finish()
+        _current.reset(token)
+
+
+def instrument_templates():
+    """
+    ห่อ django.template.base.Template.render เพื่อจับเวลา render
+    (signal template_rendered ของ Django ส่งเฉพาะตอนรันเทสต์ ใช้วัดบน production ไม่ได้)
+    """
+    from django.template.base import Template
+
+    if getattr(Template.render, "_perf_instrumented", False):
+        return
+    original = Template.render
+
+    def render(self, context):
+        metrics = _current.get()
+        if metrics is None:
+            return original(self, context)
+        metrics._template_depth += 1
+        start = time.perf_counter()
+        try:
+            return original(self, context)
+        finally:
+            metrics._template_depth -= 1
+            if metrics._template_depth == 0:
+                metrics.template_time += time.perf_counter() - start
+
+    render._perf_instrumented = True
+    Template.render = render
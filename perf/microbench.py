@@ -0,0 +1,126 @@
+# perf/microbench.py
+"""
+microbenchmark ของฟังก์ชัน pure-Python บน hot path (แนวเดียวกับ pyperf)
+- ลงทะเบียนด้วย @bench("ชื่อ") (ดู perf/bench_cases.py)
+- จับเวลาด้วย timeit: autorange หาจำนวนรอบให้ได้ >= min_time แล้ววัดซ้ำ repeat ครั้ง
+- เก็บผลเป็น JSON (perf/baselines/<name>.json) แล้วเทียบกับ baseline ด้วยค่ามัธยฐาน
+"""
+import json
+import platform
+import statistics
+import timeit
+from datetime import datetime
+from pathlib import Path
+
+import django
+
+BASELINE_DIR = Path(__file__).resolve().parent / "baselines"
+DEFAULT_REPEAT = 7
+DEFAULT_MIN_TIME = 0.2
+DEFAULT_THRESHOLD = 0.10  # ช้าลงเกิน 10% ถือว่า regression
+
+BENCHMARKS = {}
+
+
+def bench(name: str):
+    """ลงทะเบียนฟังก์ชันไม่มีอาร์กิวเมนต์ (เตรียมข้อมูลไว้นอกฟังก์ชัน)"""
+    def register(fn):
+        BENCHMARKS[name] = fn
+        return fn
+    return register
+
+
+def load_cases():
+    from . import bench_cases  # noqa: F401 (import เพื่อให้ @bench ลงทะเบียน)
+    return BENCHMARKS
+
+
+def measure(fn, *, repeat: int = DEFAULT_REPEAT, min_time: float = DEFAULT_MIN_TIME) -> dict:
+    timer = timeit.Timer(fn)
+    loops = 1
+    while True:  # แบบ Timer.autorange แต่ใช้ min_time ที่กำหนดได้
+        if timer.timeit(loops) >= min_time:
+            break
+        loops *= 2 if loops < 10 else 5
+    values = [t / loops for t in timer.repeat(repeat=repeat, number=loops)]
+    return {
+        "loops": loops,
+        "values": values,
+        "median": statistics.median(values),
+        "min": min(values),
+        "stdev": statistics.stdev(values) if len(values) > 1 else 0.0,
+    }
+
+
+def run(names=None, **kwargs) -> dict:
+    cases = load_cases()
+    results = {}
+    for name, fn in cases.items():
+        if names and not any(n in name for n in names):
+            continue
+        results[name] = measure(fn, **kwargs)
+    return {
+        "meta": {
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "django": django.get_version(),
+            "machine": platform.machine(),
+            "platform": platform.platform(terse=True),
+        },
+        "benchmarks": results,
+    }
+
+
+def baseline_path(name: str) -> Path:
+    path = Path(name)
+    if path.suffix == ".json" or path.parent != Path("."):
+        return path
+    return BASELINE_DIR / f"{name}.json"
+
+
+def save(result: dict, name: str) -> Path:
+    path = baseline_path(name)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(result, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+    return path
+
+
+def load(name: str) -> dict:
+    return json.loads(baseline_path(name).read_text(encoding="utf-8"))
+
+
+def compare(base: dict, new: dict, threshold: float = DEFAULT_THRESHOLD) -> list[dict]:
+    """
+    เทียบค่ามัธยฐานทีละ benchmark
+    status: faster / slower / same (เปลี่ยนไม่เกิน threshold) / new / missing
+    """
+    rows = []
+    base_b, new_b = base.get("benchmarks", {}), new.get("benchmarks", {})
+    for name in sorted(set(base_b) | set(new_b)):
+        b, n = base_b.get(name), new_b.get(name)
+        if b is None or n is None:
+            rows.append({"name": name, "status": "new" if b is None else "missing",
+                         "base": b and b["median"], "new": n and n["median"], "ratio": None})
+            continue
+        ratio = n["median"] / b["median"] if b["median"] else float("inf")
+        # ต้องเกินทั้ง threshold และเกินสัญญาณรบกวน (2 เท่าของ stdev รวม) ถึงจะนับ
+        noisy = abs(n["median"] - b["median"]) <= 2 * (b.get("stdev", 0) + n.get("stdev", 0))
+        if ratio > 1 + threshold and not noisy:
+            status = "slower"
+        elif ratio < 1 - threshold and not noisy:
+            status = "faster"
+        else:
+            status = "same"
+        rows.append({"name": name, "status": status, "base": b["median"], "new": n["median"], "ratio": ratio})
+    return rows
+
+
+def format_time(seconds) -> str:
+    if seconds is None:
+        return "-"
+    if seconds < 1e-6:
+        return f"{seconds * 1e9:.0f} ns"
+    if seconds < 1e-3:
+        return f"{seconds * 1e6:.2f} us"
+    return f"{seconds * 1e3:.2f} ms"
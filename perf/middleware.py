@@ -0,0 +1,141 @@
+# perf/middleware.py
+import json
+import logging
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.shortcuts import render
+
+from . import profiler, slowlog
+from .metrics import collect
+
+logger = logging.getLogger("perf.request")
+
+DEFAULT_THRESHOLDS = {"queries": 50, "total_ms": 1000}
+
+
+def thresholds_for(match) -> dict:
+    """
+    เกณฑ์ของ view นี้จาก PERF_THRESHOLDS
+    key เป็น path ของฟังก์ชัน ("budgets.views.budget_table") หรือชื่อ url ("budgets:home") ก็ได้
+    """
+    per_view = getattr(settings, "PERF_THRESHOLDS", {})
+    limits = dict(getattr(settings, "PERF_DEFAULT_THRESHOLDS", DEFAULT_THRESHOLDS))
+    if match is not None:
+        limits.update(per_view.get(match._func_path) or per_view.get(match.view_name) or {})
+    return limits
+
+
+def over_threshold(data: dict, limits: dict) -> list[str]:
+    return [f"{key} {data[key]} > {limit}" for key, limit in limits.items() if key in data and data[key] > limit]
+
+
+def server_timing(data: dict) -> str:
+    return ", ".join([
+        f'db;dur={data["db_ms"]};desc="{data["queries"]} queries"',
+        f'tpl;dur={data["template_ms"]};desc="templates"',
+        f'cpu;dur={data["cpu_ms"]};desc="python cpu"',
+        f'cache;desc="{data["cache_hits"]} hit / {data["cache_misses"]} miss"',
+        f'total;dur={data["total_ms"]}',
+    ])
+
+
+def _flag(name: str) -> bool:
+    """ค่า setting แบบ True/False หรือ None = ตาม DEBUG"""
+    value = getattr(settings, name, None)
+    return settings.DEBUG if value is None else bool(value)
+
+
+class PerformanceMiddleware:
+    """
+    วัด query / เวลา DB / query ช้าสุด / เวลา render template / CPU ของทุก request
+    - ใส่ header Server-Timing ให้ staff (ดูได้ใน DevTools > Network > Timing) คนทั่วไปไม่เห็นจำนวน query/เวลา
+    - log JSON หนึ่งบรรทัดต่อ request ที่ logger "perf.request"
+    - เกิน PERF_THRESHOLDS -> log ระดับ WARNING พร้อมรายการที่เกิน
+    - ผูก request ไว้ให้ slow query log (perf/slowlog.py) ระบุ view ได้ (ทำเสมอแม้ปิดการวัด)
+    ปิดทั้งหมดด้วย PERF_INSTRUMENTATION = False (None = ตาม DEBUG)
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = _flag("PERF_INSTRUMENTATION")
+        self.ignore = tuple(getattr(settings, "PERF_IGNORE_PATHS", ()))
+        self.add_header = _flag("PERF_SERVER_TIMING")
+
+    def __call__(self, request):
+        token = slowlog.bind_request(request)  # ให้ slow query log รู้ว่ามาจาก view ไหน
+        try:
+            return self.measure(request)
+        finally:
+            slowlog.unbind_request(token)
+
+    def measure(self, request):
+        if not self.enabled or (self.ignore and request.path.startswith(self.ignore)):
+            return self.get_response(request)
+
+        with collect() as metrics:
+            response = self.get_response(request)
+
+        match = request.resolver_match
+        data = metrics.as_dict()
+        if self.add_header and getattr(getattr(request, "user", None), "is_staff", False):
+            response.headers["Server-Timing"] = server_timing(data)
+
+        exceeded = over_threshold(data, thresholds_for(match))
+        line = {
+            "method": request.method,
+            "path": request.path,
+            "view": match._func_path if match else None,
+            "status": response.status_code,
+            **data,
+        }
+        if exceeded:
+            line["exceeded"] = exceeded
+            logger.warning(json.dumps(line, ensure_ascii=False))
+        else:
+            logger.info(json.dumps(line, ensure_ascii=False))
+        return response
+
+
+class ProfilerMiddleware:
+    """
+    profile request เดียวตามสั่ง (เฉพาะ staff): ต่อท้าย URL ด้วย ?_profile=1 หรือส่ง header X-Profile: 1
+    - response ถูกแทนด้วยรายงาน (flame graph, ฟังก์ชันที่กินเวลา, SQL + เวลา)
+    - บันทึก .prof/.json ไว้ที่ PERF_PROFILE_DIR (เทียบกันด้วย manage.py compare_profiles)
+    - ?_profile=save -> บันทึกอย่างเดียว ส่ง response เดิมกลับ (ใช้กับ POST/redirect)
+    request ปกติเสียแค่เช็ค string หนึ่งครั้ง, PERF_PROFILER = False -> ไม่อยู่ใน chain เลย
+    ต้องอยู่หลัง AuthenticationMiddleware (ใช้ request.user)
+    """
+
+    PARAM = "_profile"
+    HEADER = "HTTP_X_PROFILE"
+
+    def __init__(self, get_response):
+        if not getattr(settings, "PERF_PROFILER", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def requested_mode(self, request):
+        if self.PARAM + "=" in request.META.get("QUERY_STRING", ""):
+            return request.GET.get(self.PARAM)
+        return request.META.get(self.HEADER)
+
+    def __call__(self, request):
+        mode = self.requested_mode(request)
+        if not mode or mode == "0" or not request.user.is_staff:
+            return self.get_response(request)
+
+        try:
+            response, stats, metrics = profiler.run(self.get_response, request)
+        except ValueError:
+            # มี profiler ตัวอื่นทำงานอยู่ใน process นี้ (Python 3.12+ ยอมให้มีตัวเดียว)
+            logger.warning("profiler busy, serving %s without profiling", request.path)
+            return self.get_response(request)
+
+        report = profiler.build_report(request, response, stats, metrics)
+        saved = profiler.save(report, stats)
+        logger.info(json.dumps({"profile": str(saved), **report["meta"]}, ensure_ascii=False))
+        if mode == "save":
+            response.headers["X-Profile-File"] = saved.name
+            return response
+        return render(request, "perf/profile.html", {"report": report, "saved": saved})
@@ -0,0 +1,193 @@
+# perf/profiler.py
+"""
+profile request เดียวแบบ on-demand (ใช้กับ ProfilerMiddleware)
+- ใช้ cProfile (deterministic, มีใน stdlib) + perf.metrics.collect(keep_queries=True) เก็บ SQL ทุกตัว
+- สร้างรายงาน: สรุปเวลา, SQL ตามลำดับที่รัน, ฟังก์ชันที่กินเวลาสุด, flame graph (icicle) จาก caller -> callee
+- บันทึก .prof (เปิดด้วย pstats/snakeviz ได้) + .json สรุป ไว้ที่ PERF_PROFILE_DIR
+"""
+import cProfile
+import json
+import os
+import pstats
+import re
+from datetime import datetime
+from pathlib import Path
+
+from django.conf import settings
+
+from .metrics import SQL_PREVIEW_CHARS, collect
+
+FLAME_MIN_FRACTION = 0.01  # node ที่กินเวลา < 1% ของทั้งหมด ไม่แสดง
+FLAME_MAX_DEPTH = 60
+TOP_FUNCTIONS = 40
+
+
+def profile_dir() -> Path:
+    return Path(getattr(settings, "PERF_PROFILE_DIR", Path(settings.BASE_DIR) / "profiles"))
+
+
+def func_label(func) -> str:
+    filename, line, name = func
+    if filename == "~":  # built-in เช่น <method 'execute' of 'sqlite3.Cursor' objects>
+        return name
+    return f"{name} ({short_path(filename)}:{line})"
+
+
+def short_path(filename: str) -> str:
+    """ตัด prefix ของ project / site-packages ออกให้อ่านง่าย"""
+    base = str(settings.BASE_DIR) + os.sep
+    if filename.startswith(base):
+        return filename[len(base):]
+    marker = "site-packages" + os.sep
+    idx = filename.find(marker)
+    if idx != -1:
+        return filename[idx + len(marker):]
+    return filename
+
+
+def run(get_response, request):
+    """รัน request ภายใต้ profiler -> (response, pstats.Stats, RequestMetrics)"""
+    profiler = cProfile.Profile()
+    with collect(keep_queries=True) as metrics:
+        profiler.enable()
+        try:
+            response = get_response(request)
+            # TemplateResponse render ตอนออกจาก middleware -> render ตรงนี้ให้อยู่ใน profile ด้วย
+            if hasattr(response, "render") and callable(response.render):
+                response.render()
+        finally:
+            profiler.disable()
+    return response, pstats.Stats(profiler), metrics
+
+
+def top_functions(stats: pstats.Stats, limit: int = TOP_FUNCTIONS) -> list[dict]:
+    rows = []
+    for func, (cc, nc, tt, ct, _callers) in stats.stats.items():
+        rows.append({
+            "function": func_label(func),
+            "calls": nc,
+            "primitive_calls": cc,
+            "self_ms": round(tt * 1000, 3),
+            "cumulative_ms": round(ct * 1000, 3),
+        })
+    rows.sort(key=lambda r: r["self_ms"], reverse=True)
+    return rows[:limit]
+
+
+def flame_tree(stats: pstats.Stats) -> dict:
+    """
+    แปลง caller edges ของ pstats เป็นต้นไม้ (icicle)
+    เวลาของแต่ละ edge = cumulative time ที่ caller เรียก callee นั้น
+    cProfile ไม่เก็บ stack เต็ม -> ฟังก์ชันที่ถูกเรียกจากหลายที่จะแสดงทุกที่ตามสัดส่วนของ edge นั้น
+    """
+    children = {}
+    for func, (_cc, _nc, _tt, _ct, callers) in stats.stats.items():
+        for caller, edge in callers.items():
+            children.setdefault(caller, []).append((func, edge[3]))
+    if not stats.stats:
+        return {"name": "request", "ms": 0, "pct": 100, "width": 100, "children": []}
+
+    # จุดเริ่มคือฟังก์ชันที่ cumulative สูงสุด (get_response ของ middleware ถัดไป)
+    # หา "ฟังก์ชันที่ไม่มีผู้เรียก" ไม่ได้ เพราะ middleware chain เรียกวนกันเอง (inner <-> __call__)
+    entry = max(stats.stats, key=lambda f: stats.stats[f][3])
+    total = stats.stats[entry][3] or 1e-9
+    cutoff = total * FLAME_MIN_FRACTION
+
+    def build(func, seconds, parent_seconds, path, depth):
+        node = {
+            "name": func_label(func),
+            "ms": round(seconds * 1000, 3),
+            "pct": round(seconds / total * 100, 2),
+            "width": round(min(seconds / parent_seconds, 1.0) * 100, 3) if parent_seconds else 100,
+            "children": [],
+        }
+        if depth >= FLAME_MAX_DEPTH:
+            return node
+        path = path | {func}
+        for child, child_seconds in sorted(children.get(func, ()), key=lambda c: c[1], reverse=True):
+            # ตัด recursion (cycle) และ node เล็ก ๆ
+            if child in path or child_seconds < cutoff:
+                continue
+            node["children"].append(build(child, child_seconds, seconds, path, depth + 1))
+        return node
+
+    return build(entry, total, total, frozenset(), 1)
+
+
+def build_report(request, response, stats: pstats.Stats, metrics) -> dict:
+    match = request.resolver_match
+    queries = [
+        {
+            "n": i,
+            "ms": round(elapsed * 1000, 3),
+            "sql": sql[:SQL_PREVIEW_CHARS * 4],
+            "params": repr(params)[:SQL_PREVIEW_CHARS],
+        }
+        for i, (sql, params, elapsed) in enumerate(metrics.query_log or [], start=1)
+    ]
+    return {
+        "meta": {
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "method": request.method,
+            "path": request.get_full_path(),
+            "view": match._func_path if match else None,
+            "status": response.status_code,
+            "user": request.user.get_username(),
+        },
+        "metrics": metrics.as_dict(),
+        "profiled_calls": stats.total_calls,
+        "queries": queries,
+        "slowest_queries": sorted(queries, key=lambda q: q["ms"], reverse=True)[:10],
+        "top_functions": top_functions(stats),
+        "flame": flame_tree(stats),
+    }
+
+
+def save(report: dict, stats: pstats.Stats) -> Path:
+    """บันทึก <วันเวลา>-<path>.prof + .json -> คืน path ของ .prof"""
+    directory = profile_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    slug = re.sub(r"[^A-Za-z0-9]+", "-", report["meta"]["path"].split("?")[0]).strip("-") or "root"
+    stem = f"{datetime.now():%Y%m%d-%H%M%S-%f}-{slug[:60]}"
+    prof_path = directory / f"{stem}.prof"
+    stats.dump_stats(prof_path)
+    (directory / f"{stem}.json").write_text(
+        json.dumps(report, ensure_ascii=False, indent=1), encoding="utf-8",
+    )
+    return prof_path
+
+
+def resolve_profile(name: str) -> Path:
+    """รับ path เต็มหรือชื่อไฟล์ใน PERF_PROFILE_DIR (ไม่ใส่ .prof ก็ได้)"""
+    path = Path(name)
+    if path.exists():
+        return path
+    candidate = profile_dir() / name
+    if candidate.suffix != ".prof":
+        candidate = candidate.with_name(candidate.name + ".prof")
+    return candidate
+
+
+def load_stats(name: str) -> pstats.Stats:
+    return pstats.Stats(str(resolve_profile(name)))
+
+
+def diff_stats(before: pstats.Stats, after: pstats.Stats, key: str = "self") -> list[dict]:
+    """เทียบเวลาต่อฟังก์ชัน (ms) ของ profile สองชุด เรียงตามค่าที่เปลี่ยนมากสุด"""
+    index = 2 if key == "self" else 3  # (cc, nc, tt, ct, callers)
+    rows = []
+    for func in set(before.stats) | set(after.stats):
+        b = before.stats.get(func)
+        a = after.stats.get(func)
+        b_ms = b[index] * 1000 if b else 0.0
+        a_ms = a[index] * 1000 if a else 0.0
+        rows.append({
+            "function": func_label(func),
+            "before_ms": b_ms,
+            "after_ms": a_ms,
+            "delta_ms": a_ms - b_ms,
+            "before_calls": b[1] if b else 0,
+            "after_calls": a[1] if a else 0,
+        })
+    rows.sort(key=lambda r: abs(r["delta_ms"]), reverse=True)
+    return rows
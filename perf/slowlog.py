@@ -0,0 +1,134 @@
+# perf/slowlog.py
+"""
+slow query log: query ที่ช้ากว่า PERF_SLOW_QUERY_MS -> log JSON หนึ่งบรรทัดที่ logger "perf.slow_sql"
+แต่ละบรรทัดมี fingerprint ของ SQL (แทนค่าคงที่ด้วย ?), params, เวลา, view ที่เรียก
+และ stack เฉพาะโค้ดของโปรเจกต์ (ตัด Django / site-packages ออก) -> รู้ว่าบรรทัดไหนสร้าง query
+ติดตั้งเป็น execute wrapper ถาวรทุก connection (signal connection_created) -> ครอบคลุม management command / worker ด้วย
+สรุปด้วย manage.py slow_queries
+"""
+import contextvars
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+import time
+
+from django.conf import settings
+
+logger = logging.getLogger("perf.slow_sql")
+
+STACK_LIMIT = 8
+PARAMS_PREVIEW_CHARS = 500
+SQL_MAX_CHARS = 4000
+
+_request = contextvars.ContextVar("perf_slowlog_request", default=None)
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w\"])-?\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%s|\?")
+_IN_LIST = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_VALUES_LIST = re.compile(r"\bVALUES\s*\((?:\s*\?\s*,?)+\)(?:\s*,\s*\((?:\s*\?\s*,?)+\))*", re.IGNORECASE)
+_SPACES = re.compile(r"\s+")
+
+
+def fingerprint(sql: str) -> str:
+    """
+    ทำ SQL ให้เป็นรูปแบบเดียวกันเมื่อต่างกันแค่ค่า
+    'abc' / 123 / %s -> ?, IN (?, ?, ?) -> IN (...), VALUES (...) หลายแถว -> VALUES (...)
+    """
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _PLACEHOLDER.sub("?", sql)
+    sql = _IN_LIST.sub("IN (...)", sql)
+    sql = _VALUES_LIST.sub("VALUES (...)", sql)
+    return _SPACES.sub(" ", sql).strip()
+
+
+def fingerprint_id(normalized: str) -> str:
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:12]
+
+
+# frame ของตัววัดเอง (wrapper / middleware) ไม่ช่วยบอกว่า query มาจากไหน
+_SKIP_FILES = {
+    "manage.py",
+    *(os.path.join("perf", name) for name in ("slowlog.py", "metrics.py", "middleware.py", "profiler.py")),
+}
+
+
+def _is_app_file(filename: str, base: str) -> bool:
+    if not filename.startswith(base) or filename[len(base):] in _SKIP_FILES:
+        return False
+    return "site-packages" not in filename and f"{os.sep}.venv{os.sep}" not in filename
+
+
+def app_stack(limit: int = STACK_LIMIT) -> list[str]:
+    """frame ของโค้ดในโปรเจกต์ (ในสุดก่อน) เช่น "menus/utils.py:57 in filter_by_plan" """
+    base = str(settings.BASE_DIR) + os.sep
+    frames = []
+    frame = sys._getframe(1)
+    while frame is not None and len(frames) < limit:
+        filename = frame.f_code.co_filename
+        if _is_app_file(filename, base):
+            frames.append(f"{filename[len(base):]}:{frame.f_lineno} in {frame.f_code.co_name}")
+        frame = frame.f_back
+    return frames
+
+
+def origin() -> str | None:
+    """view ที่กำลังรัน (จาก request ที่ PerformanceMiddleware ผูกไว้) หรือชื่อ management command"""
+    request = _request.get()
+    if request is not None:
+        match = getattr(request, "resolver_match", None)
+        return match._func_path if match else request.path
+    if len(sys.argv) > 1 and sys.argv[0].endswith("manage.py"):
+        return f"manage.py {sys.argv[1]}"
+    return None
+
+
+def bind_request(request):
+    """ผูก request กับ context ปัจจุบัน -> คืน token ไว้ reset"""
+    return _request.set(request)
+
+
+def unbind_request(token):
+    _request.reset(token)
+
+
+def _slow_query_logger(threshold: float):
+    def wrapper(execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            if elapsed >= threshold:
+                log_query(sql, params, many, elapsed, context["connection"].alias)
+    return wrapper
+
+
+def log_query(sql, params, many, elapsed, alias):
+    normalized = fingerprint(sql)
+    line = {
+        "ts": round(time.time(), 3),
+        "ms": round(elapsed * 1000, 2),
+        "fingerprint": fingerprint_id(normalized),
+        "normalized": normalized[:SQL_MAX_CHARS],
+        "sql": sql[:SQL_MAX_CHARS],
+        "params": repr(params)[:PARAMS_PREVIEW_CHARS],
+        "many": many,
+        "db": alias,
+        "view": origin(),
+        "stack": app_stack(),
+    }
+    logger.warning(json.dumps(line, ensure_ascii=False))
+
+
+def install(sender=None, connection=None, **kwargs):
+    """receiver ของ connection_created: ใส่ wrapper ครั้งเดียวต่อ connection"""
+    threshold_ms = getattr(settings, "PERF_SLOW_QUERY_MS", None)
+    if not threshold_ms or connection is None or getattr(connection, "_perf_slowlog", False):
+        return
+    connection.execute_wrappers.append(_slow_query_logger(threshold_ms / 1000))
+    connection._perf_slowlog = True
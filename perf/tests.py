@@ -0,0 +1,88 @@
+import json
+import shutil
+import tempfile
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+
+class ServerTimingTests(TestCase):
+
+    def get(self, user=None):
+        if user is not None:
+            self.client.force_login(user)
+        return self.client.get(reverse("menus:menu_list"))
+
+    def get_logged(self, user=None):
+        with self.assertLogs("perf.request", "INFO"):
+            return self.get(user)
+
+    @override_settings(PERF_INSTRUMENTATION=True, PERF_SERVER_TIMING=True)
+    def test_staff_gets_server_timing(self):
+        response = self.get_logged(User.objects.create(username="staff", is_staff=True))
+        self.assertIn("queries", response["Server-Timing"])
+
+    @override_settings(PERF_INSTRUMENTATION=True, PERF_SERVER_TIMING=True)
+    def test_hidden_from_other_users(self):
+        self.assertNotIn("Server-Timing", self.get_logged())
+        self.assertNotIn("Server-Timing", self.get_logged(User.objects.create(username="diner")))
+
+    @override_settings(DEBUG=False, PERF_INSTRUMENTATION=None, PERF_SERVER_TIMING=None)
+    def test_follows_debug_by_default(self):
+        with self.assertNoLogs("perf.request"):
+            response = self.get(User.objects.create(username="staff", is_staff=True))
+        self.assertNotIn("Server-Timing", response)
+
+
+class ProfilerTests(TestCase):
+
+    def setUp(self):
+        self.profile_dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.profile_dir, ignore_errors=True)
+        override = self.settings(PERF_PROFILER=True, PERF_PROFILE_DIR=self.profile_dir)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.staff = User.objects.create(username="staff", is_staff=True)
+
+    def get(self, user, params=None, **headers):
+        self.client.force_login(user)
+        return self.client.get(reverse("menus:menu_list"), params, headers=headers)
+
+    def get_profiled(self, user, params=None, **headers):
+        with self.assertLogs("perf.request", "INFO"):  # log บรรทัดละ profile ที่บันทึก
+            return self.get(user, params, **headers)
+
+    def saved(self, suffix):
+        return sorted(p.name for p in self.profile_dir.glob(f"*{suffix}"))
+
+    def test_staff_query_param_gets_report(self):
+        response = self.get_profiled(self.staff, {"_profile": "1"})
+        self.assertTemplateUsed(response, "perf/profile.html")
+        self.assertEqual(len(self.saved(".prof")), 1)
+        report = json.loads((self.profile_dir / self.saved(".json")[0]).read_text(encoding="utf-8"))
+        self.assertEqual(report["meta"]["path"], reverse("menus:menu_list") + "?_profile=1")
+
+    def test_header_and_save_mode(self):
+        response = self.get_profiled(self.staff, X_Profile="save")
+        self.assertTemplateUsed(response, "menus/menu_list.html")
+        self.assertTemplateNotUsed(response, "perf/profile.html")
+        self.assertEqual(response["X-Profile-File"], self.saved(".prof")[0])
+
+    def test_not_triggered(self):
+        for user, params in [
+            (User.objects.create(username="diner"), {"_profile": "1"}),  # ไม่ใช่ staff
+            (self.staff, {"_profile": "0"}),
+            (self.staff, None),
+        ]:
+            with self.subTest(user=user.username, params=params):
+                response = self.get(user, params)
+                self.assertTemplateNotUsed(response, "perf/profile.html")
+        self.assertEqual(self.saved(".prof"), [])
+
+    def test_disabled_removes_middleware(self):
+        with self.settings(PERF_PROFILER=False):
+            response = self.get(self.staff, {"_profile": "1"})
+        self.assertTemplateNotUsed(response, "perf/profile.html")
+        self.assertEqual(self.saved(".prof"), [])
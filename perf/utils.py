@@ -0,0 +1,11 @@
+# perf/utils.py
+import math
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    """nearest-rank percentile ของลิสต์ที่เรียงแล้ว (ลิสต์ว่าง -> 0)"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
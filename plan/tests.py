@@ -1,3 +1,63 @@
+import json
+from datetime import timedelta
+
+from django.contrib.auth.models import User
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from budgets.models import BudgetSpend, DailyBudget, MealPlan
+from menus.models import Menu
+
+# session, user, เมนูที่เลือก (in_bulk), เช็คแผนเดิม, สร้างแผน, DailyBudget (bulk), BudgetSpend (bulk),
+# save session (SAVEPOINT + UPDATE + RELEASE)
+SAVE_PLAN_QUERIES = 10
+# + ลบแผนเดิม: BudgetSpend, DailyBudget, ดึงแผน, cascade daily_budgets/spends/items, DELETE แผน
+SAVE_PLAN_REPLACE_QUERIES = 17
+
+
+class SavePlanQueryCountTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(username="plan-user")
+        self.client.force_login(self.user)
+        self.today = timezone.localdate()
+
+    def start_plan(self, days):
+        session = self.client.session
+        session["plan"] = {"days": days, "budget": 10000 * days, "start_date": self.today.isoformat()}
+        session.save()
+
+    def selected(self, n, days):
+        menus = [Menu.objects.create(name=f"เมนู {i}", price=40 + i) for i in range(n)]
+        return json.dumps([
+            {"id": m.id, "price": float(m.price), "meal": "มื้อเที่ยง", "day_offset": i % days}
+            for i, m in enumerate(menus)
+        ])
+
+    def test_save_plan_small(self):
+        self.start_plan(days=1)
+        payload = self.selected(1, days=1)
+        with self.assertNumQueries(SAVE_PLAN_QUERIES):
+            response = self.client.post(reverse("plan:save_plan"), {"menus": payload})
+        self.assertRedirects(response, reverse("budgets:home"), fetch_redirect_response=False)
+        self.assertEqual(BudgetSpend.objects.filter(user=self.user).count(), 1)
+
+    def test_save_plan_large(self):
+        self.start_plan(days=7)
+        payload = self.selected(21, days=7)
+        with self.assertNumQueries(SAVE_PLAN_QUERIES):
+            self.client.post(reverse("plan:save_plan"), {"menus": payload})
+        self.assertEqual(DailyBudget.objects.filter(user=self.user).count(), 7)
+        self.assertEqual(BudgetSpend.objects.filter(user=self.user).count(), 21)
+        last_day = self.today + timedelta(days=6)
+        self.assertEqual(BudgetSpend.objects.filter(user=self.user, date=last_day).count(), 3)
 
-# Create your tests here.
+    def test_save_plan_replaces_existing_plan(self):
+        self.start_plan(days=7)
+        self.client.post(reverse("plan:save_plan"), {"menus": self.selected(7, days=7)})
+        payload = self.selected(21, days=7)
+        with self.assertNumQueries(SAVE_PLAN_REPLACE_QUERIES):
+            self.client.post(reverse("plan:save_plan"), {"menus": payload})
+        self.assertEqual(MealPlan.objects.filter(user=self.user).count(), 1)
+        self.assertEqual(BudgetSpend.objects.filter(user=self.user).count(), 21)
@@ -11,8 +11,9 @@ from django.views.decorators.http import require_POST
 from django.utils import timezone
 
 from budgets.models import BudgetSpend, DailyBudget, MealPlan
+from caching.services import invalidate
 from menus.models import Menu, Restaurant
-from menus.utils import filter_by_plan
+from menus.utils import eligible_menu_ids, keep_eligible
 
 
 # ----------------- helpers -----------------
@@ -200,12 +201,17 @@ def mealplan_summary(request):
     data: List[Tuple[Restaurant, List[Menu]]] = []
     price_limit = daily_budget if daily_budget > 0 else None
 
+    # งบกรองใน SQL, ข้อจำกัดอาหารตัดด้วยชุด id ที่ cache ไว้ต่อชุดข้อจำกัด (ใช้ร่วมกับ menu_list)
+    menus_qs = Menu.objects.filter(restaurant_id__in=picked_ids)
+    if total_budget > 0:
+        menus_qs = menus_qs.filter(price__lte=total_budget)
+    if price_limit:
+        menus_qs = menus_qs.filter(price__lte=price_limit)
+    menus_by_restaurant = {}
+    for m in keep_eligible(menus_qs, eligible_menu_ids(plan)):
+        menus_by_restaurant.setdefault(m.restaurant_id, []).append(m)
     for r in restaurants:
-        menus_qs = Menu.objects.filter(restaurant=r)
-        menus_qs = filter_by_plan(menus_qs, plan)
-        if price_limit:
-            menus_qs = menus_qs.filter(price__lte=price_limit)
-        data.append((r, list(menus_qs)))
+        data.append((r, menus_by_restaurant.get(r.id, [])))
 
     selected_menus = request.session.get("selected_menus", [])
 
@@ -267,13 +273,16 @@ def save_plan(request):
     daily_budget = _daily_budget(total_budget, days)
     end_date_inclusive = _plan_end_date(start_date, days)
 
+    # ดึงเมนูที่เลือกทั้งหมดใน query เดียว
+    menu_ids = {_parse_int(m.get("id"), 0) for m in menus}
+    menu_map = Menu.objects.in_bulk([i for i in menu_ids if i > 0])
+
     # 3) ✅ VALIDATE: รวมเงินต่อวันห้ามเกิน daily_budget
     # ถ้า daily_budget = 0 ให้ผ่าน (เผื่อบางเคสยังไม่กรอกงบ)
     if daily_budget > 0:
         sums = {}  # {date: float}
         for m in menus:
-            menu_id = m.get("id")
-            menu = Menu.objects.filter(pk=menu_id).first()
+            menu = menu_map.get(_parse_int(m.get("id"), 0))
             if not menu:
                 continue
 
@@ -325,20 +334,16 @@ def save_plan(request):
         title=sess.get("title", "") or "",
     )
 
-    # 6) สร้าง DailyBudget ครบทุกวัน
-    for i in range(days):
-        d = start_date + timedelta(days=i)
-        DailyBudget.objects.update_or_create(
-            user=request.user,
-            date=d,
-            plan=plan_obj,
-            defaults={"amount": daily_budget},
-        )
+    # 6) สร้าง DailyBudget ครบทุกวัน (แผนเพิ่งสร้าง ยังไม่มีแถวเดิม -> bulk_create ได้เลย)
+    DailyBudget.objects.bulk_create([
+        DailyBudget(user=request.user, date=start_date + timedelta(days=i), plan=plan_obj, amount=daily_budget)
+        for i in range(days)
+    ])
 
     # 7) บันทึก BudgetSpend ตามวันจริง
+    spends = []
     for m in menus:
-        menu_id = m.get("id")
-        menu = Menu.objects.filter(pk=menu_id).first()
+        menu = menu_map.get(_parse_int(m.get("id"), 0))
         if not menu:
             continue
 
@@ -349,14 +354,18 @@ def save_plan(request):
             spend_date = end_date_inclusive
 
         meal_label = (m.get("meal") or "").strip()
-        BudgetSpend.objects.create(
+        spends.append(BudgetSpend(
             user=request.user,
             date=spend_date,
             amount=menu.price,
             menu=menu,
             plan=plan_obj,
             note=meal_label,
-        )
+        ))
+    BudgetSpend.objects.bulk_create(spends)
+    # ลบ/bulk_create ไม่ส่ง signal -> ล้าง cache สรุปงบของผู้ใช้คนนี้เอง
+    invalidate(DailyBudget, request.user.id)
+    invalidate(BudgetSpend, request.user.id)
 
     # 8) อัปเดต session
     sess["daily_budget"] = daily_budget
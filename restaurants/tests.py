@@ -1,3 +1,41 @@
+from django.contrib.auth.models import User
 from django.test import TestCase
+from django.urls import reverse
 
-# Create your tests here.
+from menus.models import Menu
+from .models import Restaurant
+
+# session, user, ร้าน, เมนู (join created_by) -> ไม่โตตามจำนวนเมนู
+RESTAURANT_DETAIL_QUERIES = 4
+
+
+class RestaurantDetailQueryCountTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(username="diner")
+        self.client.force_login(self.user)
+        self.restaurant = Restaurant.objects.create(name="ร้านป้าแดง", is_active=True)
+
+    def seed_menus(self, n):
+        for i in range(n):
+            owner = User.objects.create(username=f"owner{i}")
+            Menu.objects.create(
+                restaurant=self.restaurant, name=f"เมนู {i}", price=50,
+                status=Menu.Status.APPROVED, created_by=owner,
+            )
+        Menu.objects.create(restaurant=self.restaurant, name="เมนูของฉัน", price=45, created_by=self.user)
+
+    def get_detail(self):
+        with self.assertNumQueries(RESTAURANT_DETAIL_QUERIES):
+            return self.client.get(reverse("restaurants:restaurant_detail", args=[self.restaurant.pk]))
+
+    def test_restaurant_detail_small(self):
+        self.seed_menus(1)
+        response = self.get_detail()
+        self.assertEqual(len(response.context["menus"]), 2)
+
+    def test_restaurant_detail_large(self):
+        self.seed_menus(40)
+        response = self.get_detail()
+        self.assertEqual(len(response.context["menus"]), 41)
+        self.assertContains(response, "owner39")
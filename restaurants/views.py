@@ -2,6 +2,7 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib.admin.views.decorators import staff_member_required
+from django.http import Http404
 from django.views.decorators.http import require_POST
 from django.contrib import messages
 from django.db.models import Q, Case, When, Value, CharField
@@ -9,6 +10,7 @@ from django.db.models import Q, Case, When, Value, CharField
 from .models import Restaurant
 from .forms import RestaurantForm
 from menus.models import Menu
+from moderation.services import moderate
 
 
 # ===================== ผู้ใช้ทั่วไป =====================
@@ -31,12 +33,13 @@ def restaurant_detail(request, pk):
     restaurant = get_object_or_404(Restaurant, pk=pk, is_active=True)
 
     # ดึงเมนูของร้านนี้ ตามสิทธิ์ผู้ใช้
+    # created_by ใช้แสดง "สร้างโดย" ทุกการ์ด -> join มาเลย ไม่ให้ query ต่อเมนู
+    base_qs = Menu.objects.filter(restaurant=restaurant).select_related('created_by')
     if request.user.is_staff:
-        menus_qs = Menu.objects.filter(restaurant=restaurant).order_by('-created_at')
+        menus_qs = base_qs.order_by('-created_at')
     else:
         menus_qs = (
-            Menu.objects
-            .filter(restaurant=restaurant)
+            base_qs
             .filter(
                 Q(status=Menu.Status.APPROVED) |
                 Q(created_by=request.user)
@@ -184,9 +187,8 @@ def admin_delete_restaurant(request, pk: int):
 @staff_member_required
 @require_POST
 def admin_approve_restaurant(request, pk: int):
-    r = get_object_or_404(Restaurant, pk=pk)
-    r.is_active = True
-    r.save(update_fields=["is_active"])
+    if not moderate("restaurant", [pk], "approve", request.user):
+        raise Http404()
     messages.success(request, "อนุมัติร้านอาหารเรียบร้อยแล้ว")
     return redirect("restaurants:admin_restaurant_list")
 
@@ -194,8 +196,7 @@ def admin_approve_restaurant(request, pk: int):
 @staff_member_required
 @require_POST
 def admin_reject_restaurant(request, pk: int):
-    r = get_object_or_404(Restaurant, pk=pk)
-    r.is_active = False
-    r.save(update_fields=["is_active"])
+    if not moderate("restaurant", [pk], "reject", request.user):
+        raise Http404()
     messages.success(request, "ปิดการแสดงผล/ปฏิเสธ ร้านอาหารเรียบร้อยแล้ว")
     return redirect("restaurants:admin_restaurant_list")
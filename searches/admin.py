@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import SearchHistory
+from .models import SavedSearch, SearchHistory, SearchHistoryDaily, SearchRollup
 
 
 @admin.register(SearchHistory)
@@ -8,3 +8,27 @@ class SearchHistoryAdmin(admin.ModelAdmin):
     list_filter = ("path", "updated_at")
     search_fields = ("keyword", "user__username")
     ordering = ("-updated_at",)
+
+
+@admin.register(SearchHistoryDaily)
+class SearchHistoryDailyAdmin(admin.ModelAdmin):
+    list_display = ("day", "keyword", "path", "total_count", "rows_folded", "avg_result_count")
+    list_filter = ("path", "day")
+    search_fields = ("keyword",)
+    ordering = ("-day", "-total_count")
+
+
+@admin.register(SearchRollup)
+class SearchRollupAdmin(admin.ModelAdmin):
+    list_display = ("bucket", "period", "keyword", "scope", "searches", "zero_results")
+    list_filter = ("period", "scope")
+    search_fields = ("keyword",)
+    ordering = ("-bucket", "-searches")
+
+
+@admin.register(SavedSearch)
+class SavedSearchAdmin(admin.ModelAdmin):
+    list_display = ("id", "user", "keyword", "scope", "new_count", "last_run_at", "badge_refreshed_at")
+    list_filter = ("scope",)
+    search_fields = ("keyword", "user__username")
+    ordering = ("-created_at",)
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from searches.services import (
+    COMPACT_BATCH_SIZE,
+    HISTORY_KEEP_PER_USER,
+    HISTORY_RETENTION_DAYS,
+    compact_history,
+)
+
+
+class Command(BaseCommand):
+    help = "Compact SearchHistory: fold old / over-cap rows into SearchHistoryDaily, then delete in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--keep-per-user", type=int, default=HISTORY_KEEP_PER_USER,
+                            help="จำนวนแถวล่าสุดที่เก็บไว้ต่อ user (0 = ไม่จำกัด)")
+        parser.add_argument("--retention-days", type=int, default=HISTORY_RETENTION_DAYS,
+                            help="ลบแถวที่ไม่ได้ค้นซ้ำนานกว่ากี่วัน (0 = ไม่จำกัด)")
+        parser.add_argument("--batch-size", type=int, default=COMPACT_BATCH_SIZE)
+        parser.add_argument("--dry-run", action="store_true", help="นับอย่างเดียว ไม่ลบ")
+
+    def handle(self, *args, **options):
+        stats = compact_history(
+            keep_per_user=options["keep_per_user"],
+            retention_days=options["retention_days"],
+            batch_size=options["batch_size"],
+            dry_run=options["dry_run"],
+        )
+
+        verb = "would compact" if options["dry_run"] else "compacted"
+        self.stdout.write(self.style.SUCCESS(
+            f"SearchHistory {verb}: expired={stats['expired']}, over_cap={stats['over_cap']}, "
+            f"hourly rollups pruned={stats['rollup_pruned']}"
+        ))
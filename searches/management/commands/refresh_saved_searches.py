@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from searches.services import SAVED_BADGE_BATCH_SIZE, refresh_saved_search_badges
+
+
+class Command(BaseCommand):
+    help = "Refresh 'new since last run' badge counts for all saved searches (one query per scope per batch)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=SAVED_BADGE_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        updated = refresh_saved_search_badges(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Saved search badges refreshed: {updated}"))
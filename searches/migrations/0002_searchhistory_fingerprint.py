@@ -0,0 +1,91 @@
+import hashlib
+import json
+
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def _normalize_filters(filters):
+    # สำเนาแช่แข็งของ searches.services.normalize_filters ณ ตอนเขียน migration นี้
+    # (ห้าม import ของจริง: แก้ทีหลังแล้ว migration เก่าจะให้ผลต่างไป)
+    cleaned = {}
+    for k, v in (filters or {}).items():
+        if v is None:
+            continue
+        if isinstance(v, str) and not v.strip():
+            continue
+        if isinstance(v, (list, tuple)):
+            vv = [x for x in v if x not in (None, "", [])]
+            if not vv:
+                continue
+            try:
+                vv = sorted(vv)
+            except Exception:
+                pass
+            cleaned[k] = vv
+        else:
+            cleaned[k] = v
+    return cleaned
+
+
+def _fingerprint(path, keyword, filters):
+    # สำเนาแช่แข็งของ searches.services.search_fingerprint
+    payload = json.dumps(
+        [path or "", (keyword or "").strip(), _normalize_filters(filters or {})],
+        sort_keys=True,
+        ensure_ascii=False,
+        separators=(",", ":"),
+        default=str,
+    )
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def fill_fingerprints(apps, schema_editor):
+    """คำนวณ fingerprint ให้ record เดิม และรวม record ที่ซ้ำกันเป็นแถวเดียว (รวม count)"""
+    SearchHistory = apps.get_model("searches", "SearchHistory")
+
+    keep = {}  # (user_id, fingerprint) -> [id, count] ของ record ล่าสุด (เก็บแค่ตัวเลข ไม่ถือทั้ง object)
+    duplicates = []
+    rows = (
+        SearchHistory.objects.order_by("-updated_at", "-id")
+        .values_list("id", "user_id", "path", "keyword", "filters_json", "count")
+    )
+    for pk, user_id, path, keyword, filters, count in rows.iterator(chunk_size=BATCH_SIZE):
+        fp = _fingerprint(path, keyword, filters if isinstance(filters, dict) else {})
+        key = (user_id, fp)
+        if key in keep:
+            keep[key][1] = (keep[key][1] or 1) + (count or 1)
+            duplicates.append(pk)
+        else:
+            keep[key] = [pk, count]
+
+    # ลบ/อัปเดตหลังอ่านครบ (ไม่แก้ตารางระหว่างที่ cursor ยังเปิดอยู่) ทีละ batch
+    for i in range(0, len(duplicates), BATCH_SIZE):
+        SearchHistory.objects.filter(pk__in=duplicates[i:i + BATCH_SIZE]).delete()
+
+    updates = [
+        SearchHistory(pk=pk, fingerprint=fp, count=count)
+        for (_user_id, fp), (pk, count) in keep.items()
+    ]
+    SearchHistory.objects.bulk_update(updates, ["fingerprint", "count"], batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('searches', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='searchhistory',
+            name='fingerprint',
+            field=models.CharField(blank=True, default='', max_length=40),
+        ),
+        migrations.RunPython(fill_fingerprints, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='searchhistory',
+            constraint=models.UniqueConstraint(fields=('user', 'fingerprint'), name='searches_history_user_fingerprint_uniq'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('searches', '0002_searchhistory_fingerprint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchHistoryDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('path', models.CharField(blank=True, default='', max_length=255)),
+                ('keyword', models.CharField(blank=True, default='', max_length=255)),
+                ('total_count', models.PositiveIntegerField(default=0)),
+                ('rows_folded', models.PositiveIntegerField(default=0)),
+                ('result_count_sum', models.PositiveBigIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['-day', '-total_count'],
+                'constraints': [models.UniqueConstraint(fields=('day', 'path', 'keyword'), name='searches_daily_day_path_keyword_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('searches', '0003_searchhistorydaily'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('H', 'Hour'), ('D', 'Day')], max_length=1)),
+                ('bucket', models.DateTimeField()),
+                ('scope', models.CharField(blank=True, default='', max_length=50)),
+                ('keyword', models.CharField(max_length=255)),
+                ('searches', models.PositiveIntegerField(default=0)),
+                ('zero_results', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['-bucket', '-searches'],
+                'indexes': [models.Index(fields=['period', '-bucket'], name='searches_se_period_47a482_idx')],
+                'constraints': [models.UniqueConstraint(fields=('period', 'bucket', 'scope', 'keyword'), name='searches_rollup_period_bucket_scope_keyword_uniq')],
+            },
+        ),
+    ]
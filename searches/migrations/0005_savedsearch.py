@@ -0,0 +1,35 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('searches', '0004_searchrollup'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SavedSearch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('keyword', models.CharField(max_length=255)),
+                ('scope', models.CharField(default='all', max_length=50)),
+                ('last_menu_id', models.BigIntegerField(default=0)),
+                ('last_restaurant_id', models.BigIntegerField(default=0)),
+                ('last_recipe_id', models.BigIntegerField(default=0)),
+                ('last_topic_id', models.BigIntegerField(default=0)),
+                ('new_count', models.PositiveIntegerField(default=0)),
+                ('badge_refreshed_at', models.DateTimeField(blank=True, null=True)),
+                ('last_run_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='saved_searches', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'constraints': [models.UniqueConstraint(fields=('user', 'keyword', 'scope'), name='searches_saved_user_keyword_scope_uniq')],
+            },
+        ),
+    ]
@@ -20,6 +20,9 @@ class SearchHistory(models.Model):
     # ถ้าค้นซ้ำแบบเดิมติดกัน ให้ increment ตรงนี้แทนการสร้าง record ใหม่รัวๆ
     count = models.PositiveIntegerField(default=1)
 
+    # แฮชของ (path, keyword, filters) -> ใช้หา record เดิมผ่าน index แทนการเทียบ JSON
+    fingerprint = models.CharField(max_length=40, blank=True, default="")
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -28,6 +31,105 @@ class SearchHistory(models.Model):
         indexes = [
             models.Index(fields=["user", "-updated_at"]),
         ]
+        constraints = [
+            models.UniqueConstraint(fields=["user", "fingerprint"], name="searches_history_user_fingerprint_uniq"),
+        ]
 
     def __str__(self):
         return f"{self.user.username}: {self.keyword} ({self.path})"
+
+
+class SearchHistoryDaily(models.Model):
+    """
+    ยอดรวมรายวันของประวัติที่ถูก compact ออกจาก SearchHistory แล้ว
+    (ไม่ผูกกับ user -> ใช้ดูสถิติย้อนหลังได้โดยไม่ต้องเก็บแถวดิบไว้ตลอด)
+    """
+    day = models.DateField()
+    path = models.CharField(max_length=255, blank=True, default="")
+    keyword = models.CharField(max_length=255, blank=True, default="")
+
+    # จำนวนครั้งที่ค้นรวม (sum ของ SearchHistory.count)
+    total_count = models.PositiveIntegerField(default=0)
+
+    # ใช้หา average result_count = result_count_sum / rows_folded
+    rows_folded = models.PositiveIntegerField(default=0)
+    result_count_sum = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        ordering = ["-day", "-total_count"]
+        constraints = [
+            models.UniqueConstraint(fields=["day", "path", "keyword"], name="searches_daily_day_path_keyword_uniq"),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.keyword} ({self.path}) x{self.total_count}"
+
+    @property
+    def avg_result_count(self) -> float:
+        if not self.rows_folded:
+            return 0.0
+        return round(self.result_count_sum / self.rows_folded, 2)
+
+
+class SearchRollup(models.Model):
+    """
+    ยอดค้นหาแบบ rollup รายชั่วโมง/รายวัน ต่อ keyword (normalize แล้ว) + scope
+    อัปเดตแบบ incremental จาก log_search -> dashboard/trending ไม่ต้อง GROUP BY ตาราง SearchHistory
+    """
+    class Period(models.TextChoices):
+        HOUR = "H", "Hour"
+        DAY = "D", "Day"
+
+    period = models.CharField(max_length=1, choices=Period.choices)
+    bucket = models.DateTimeField()  # เวลาเริ่มของชั่วโมง/วัน (UTC)
+    scope = models.CharField(max_length=50, blank=True, default="")
+    keyword = models.CharField(max_length=255)
+
+    searches = models.PositiveIntegerField(default=0)
+    zero_results = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ["-bucket", "-searches"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["period", "bucket", "scope", "keyword"],
+                name="searches_rollup_period_bucket_scope_keyword_uniq",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["period", "-bucket"]),
+        ]
+
+    def __str__(self):
+        return f"{self.get_period_display()} {self.bucket:%Y-%m-%d %H:00} {self.keyword} ({self.scope}) x{self.searches}"
+
+
+class SavedSearch(models.Model):
+    """
+    การค้นที่ผู้ใช้บันทึกไว้ + high-water mark (id สูงสุดที่เคยเห็น) แยกตาม scope
+    -> ค้นซ้ำแล้ว query เฉพาะแถวที่ใหม่กว่า mark ได้ และนับ badge "มีใหม่ N รายการ" ได้ถูกๆ
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="saved_searches")
+    keyword = models.CharField(max_length=255)
+    scope = models.CharField(max_length=50, default="all")
+
+    last_menu_id = models.BigIntegerField(default=0)
+    last_restaurant_id = models.BigIntegerField(default=0)
+    last_recipe_id = models.BigIntegerField(default=0)
+    last_topic_id = models.BigIntegerField(default=0)
+
+    # จำนวนผลลัพธ์ใหม่ตั้งแต่รันครั้งล่าสุด (อัปเดตโดย refresh_saved_searches)
+    new_count = models.PositiveIntegerField(default=0)
+    badge_refreshed_at = models.DateTimeField(null=True, blank=True)
+
+    last_run_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        constraints = [
+            models.UniqueConstraint(fields=["user", "keyword", "scope"], name="searches_saved_user_keyword_scope_uniq"),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username}: {self.keyword} ({self.scope})"
@@ -1,6 +1,25 @@
-from datetime import timedelta
+import hashlib
+import json
+from datetime import timedelta, timezone as dt_timezone
+
+from django.db import connection, transaction
+from django.db.models import Count, F, Max, Q, Sum, Window
+from django.db.models.functions import RowNumber, TruncDate
 from django.utils import timezone
-from .models import SearchHistory
+from menus.models import Menu
+from restaurants.models import Restaurant
+from recipes.models import Recipe
+from community.models import Topic
+from .models import SavedSearch, SearchHistory, SearchHistoryDaily, SearchRollup
+
+
+# ค่าเริ่มต้นของการเก็บประวัติ (หน้า history_list ก็แสดงไม่เกินจำนวนนี้)
+HISTORY_KEEP_PER_USER = 200
+HISTORY_RETENTION_DAYS = 180
+COMPACT_BATCH_SIZE = 500
+
+# rollup รายชั่วโมงใช้แค่ trending ระยะสั้น เก็บไว้ไม่นาน (รายวันเก็บตลอด)
+ROLLUP_HOURLY_RETENTION_DAYS = 14
 
 
 def normalize_filters(filters: dict) -> dict:
@@ -30,38 +49,480 @@ def normalize_filters(filters: dict) -> dict:
     return cleaned
 
 
-def log_search(*, user, path: str, keyword: str, filters: dict, result_count: int, dedup_minutes: int = 2):
+def search_fingerprint(path: str, keyword: str, filters: dict) -> str:
     """
-    บันทึกประวัติการค้น
-    - ถ้าภายใน X นาทีล่าสุด user ค้นเหมือนเดิม (keyword+filters+path) -> update record เดิม (count++)
-    - ถ้าไม่เหมือน -> create ใหม่
+    แฮชคงที่ของ (path, keyword, normalize_filters(filters))
+    - ใช้เป็น key ของ record ประวัติ แทนการเทียบ filters_json ตรงๆ
     """
-    if not user or not user.is_authenticated:
-        return
+    payload = json.dumps(
+        [path or "", (keyword or "").strip(), normalize_filters(filters or {})],
+        sort_keys=True,
+        ensure_ascii=False,
+        separators=(",", ":"),
+        default=str,
+    )
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def normalize_keyword(keyword: str) -> str:
+    """ตัวพิมพ์เล็ก + ยุบช่องว่าง ใช้เป็น key ของ rollup"""
+    return " ".join((keyword or "").lower().split())[:255]
+
+
+def search_scope(path: str, filters: dict) -> str:
+    """
+    scope ของการค้น:
+    - /search/ ส่ง scope มาใน filters อยู่แล้ว
+    - หน้าอื่นใช้ segment แรกของ path เช่น /menus/ -> menus
+    """
+    scope = (filters or {}).get("scope")
+    if isinstance(scope, str) and scope.strip():
+        return scope.strip()[:50]
+    first = (path or "").strip("/").split("/")[0]
+    return (first or "all")[:50]
 
+
+def _upsert(model, values, *, conflict: list[str], add=(), replace=()):
+    """
+    INSERT ... ON CONFLICT (conflict) DO UPDATE คำสั่งเดียว (รองรับทั้ง PostgreSQL / SQLite)
+    - values: {field_name: ค่า} หรือ list ของ dict (หลายแถวใน INSERT เดียว, key ต้องเหมือนกันทุกแถว)
+    - add: field ที่ต้องบวกเพิ่มด้วยค่าที่ insert (col = col + EXCLUDED.col)
+    - replace: field ที่แทนค่าด้วยค่าที่ insert
+    """
+    opts = model._meta
+    qn = connection.ops.quote_name
+    table = qn(opts.db_table)
+
+    rows = [values] if isinstance(values, dict) else list(values)
+    fields = [opts.get_field(name) for name in rows[0]]
+    columns = [qn(field.column) for field in fields]
+    params = [
+        field.get_db_prep_save(row[field.name], connection)
+        for row in rows
+        for field in fields
+    ]
+
+    def col(name):
+        return qn(opts.get_field(name).column)
+
+    sets = [f"{col(n)} = {table}.{col(n)} + EXCLUDED.{col(n)}" for n in add]
+    sets += [f"{col(n)} = EXCLUDED.{col(n)}" for n in replace]
+
+    sql = (
+        f"INSERT INTO {table} ({', '.join(columns)}) "
+        f"VALUES {', '.join(['(' + ', '.join(['%s'] * len(columns)) + ')'] * len(rows))} "
+        f"ON CONFLICT ({', '.join(col(n) for n in conflict)}) DO UPDATE SET {', '.join(sets)}"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+def log_search(*, user, path: str, keyword: str, filters: dict, result_count: int):
+    """
+    บันทึกประวัติการค้น
+    - ค้นเหมือนเดิม (path+keyword+filters) -> count++ / อัปเดต result_count, updated_at
+    - ไม่เหมือน -> create ใหม่
+    ทำเป็น upsert คำสั่งเดียวบน unique (user, fingerprint) จึงไม่มี race ตอนค้นพร้อมกัน
+    ผู้ใช้ที่ไม่ได้ล็อกอินไม่มีประวัติ แต่ยังนับเข้า rollup (trending ต้องเห็นการค้นของทุกคน)
+    """
+    path = path or ""
     keyword = (keyword or "").strip()
     nf = normalize_filters(filters or {})
+    result_count = int(result_count or 0)
     now = timezone.now()
-    since = now - timedelta(minutes=dedup_minutes)
 
-    last = (
-        SearchHistory.objects
-        .filter(user=user, updated_at__gte=since)
-        .order_by("-updated_at")
-        .first()
+    record_rollup(
+        scope=search_scope(path, nf),
+        keyword=keyword,
+        result_count=result_count,
+        when=now,
     )
 
-    if last and last.path == (path or "") and last.keyword == keyword and (last.filters_json or {}) == nf:
-        last.result_count = int(result_count or 0)
-        last.count = (last.count or 1) + 1
-        last.save(update_fields=["result_count", "count", "updated_at"])
+    if not user or not user.is_authenticated:
         return
 
-    SearchHistory.objects.create(
-        user=user,
-        path=path or "",
-        keyword=keyword,
-        filters_json=nf,
-        result_count=int(result_count or 0),
-        count=1,
+    _upsert(
+        SearchHistory,
+        {
+            "user": user.pk,
+            "path": path,
+            "keyword": keyword,
+            "filters_json": nf,
+            "fingerprint": search_fingerprint(path, keyword, nf),
+            "result_count": result_count,
+            "count": 1,
+            "created_at": now,
+            "updated_at": now,
+        },
+        conflict=["user", "fingerprint"],
+        add=["count"],
+        replace=["result_count", "updated_at"],
+    )
+
+
+def record_rollup(*, scope: str, keyword: str, result_count: int, when=None):
+    """
+    บวกยอดเข้า rollup รายชั่วโมง + รายวัน (สองแถวใน upsert คำสั่งเดียว)
+    ไม่มีคำค้น -> ไม่นับ (เป็นการกรองล้วนๆ)
+    """
+    kw = normalize_keyword(keyword)
+    if not kw:
+        return
+
+    when = (when or timezone.now()).astimezone(dt_timezone.utc)
+    hour = when.replace(minute=0, second=0, microsecond=0)
+    day = hour.replace(hour=0)
+    zero = 1 if int(result_count or 0) == 0 else 0
+
+    _upsert(
+        SearchRollup,
+        [
+            {
+                "period": period,
+                "bucket": bucket,
+                "scope": scope or "",
+                "keyword": kw,
+                "searches": 1,
+                "zero_results": zero,
+            }
+            for period, bucket in ((SearchRollup.Period.HOUR, hour), (SearchRollup.Period.DAY, day))
+        ],
+        conflict=["period", "bucket", "scope", "keyword"],
+        add=["searches", "zero_results"],
     )
+
+
+def top_searches(*, days: int = 7, scope: str = "", limit: int = 20, zero_only: bool = False) -> list[dict]:
+    """
+    คำค้นยอดนิยม (หรือคำค้นที่ไม่เจอผลลัพธ์ ถ้า zero_only) จาก rollup รายวัน
+    """
+    today = timezone.now().astimezone(dt_timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    since = today - timedelta(days=max(int(days or 1), 1) - 1)
+
+    qs = SearchRollup.objects.filter(period=SearchRollup.Period.DAY, bucket__gte=since)
+    if scope:
+        qs = qs.filter(scope=scope)
+
+    qs = qs.values("keyword").annotate(total=Sum("searches"), zero=Sum("zero_results"))
+    if zero_only:
+        qs = qs.filter(zero__gt=0).order_by("-zero", "-total", "keyword")
+    else:
+        qs = qs.order_by("-total", "keyword")
+
+    return [
+        {
+            "keyword": r["keyword"],
+            "searches": r["total"] or 0,
+            "zero_results": r["zero"] or 0,
+            "zero_rate": round((r["zero"] or 0) / r["total"], 3) if r["total"] else 0.0,
+        }
+        for r in qs[:limit]
+    ]
+
+
+def trending_keywords(*, hours: int = 24, limit: int = 8) -> list[str]:
+    """คำค้นที่ถูกค้นบ่อยใน X ชั่วโมงล่าสุด (ตัดคำที่ไม่เคยเจอผลลัพธ์ออก) สำหรับหน้าแรก"""
+    since = timezone.now() - timedelta(hours=max(int(hours or 1), 1))
+    rows = (
+        SearchRollup.objects
+        .filter(period=SearchRollup.Period.HOUR, bucket__gte=since)
+        .values("keyword")
+        .annotate(total=Sum("searches"), zero=Sum("zero_results"))
+        .filter(total__gt=F("zero"))
+        .order_by("-total", "keyword")[:limit]
+    )
+    return [r["keyword"] for r in rows]
+
+
+def _fold_and_delete(ids: list[int]) -> int:
+    """
+    พับแถวชุดหนึ่งลง SearchHistoryDaily แล้วลบทิ้ง (1 transaction ต่อ batch)
+    คืนจำนวนแถวที่ลบ
+    """
+    with transaction.atomic():
+        rows = (
+            SearchHistory.objects
+            .filter(id__in=ids)
+            .annotate(day=TruncDate("updated_at"))
+            .values("day", "path", "keyword")
+            .annotate(
+                total=Sum("count"),
+                rows=Count("id"),
+                results=Sum("result_count"),
+            )
+            .order_by()
+        )
+        for r in rows:
+            updated = SearchHistoryDaily.objects.filter(
+                day=r["day"], path=r["path"], keyword=r["keyword"],
+            ).update(
+                total_count=F("total_count") + (r["total"] or 0),
+                rows_folded=F("rows_folded") + (r["rows"] or 0),
+                result_count_sum=F("result_count_sum") + (r["results"] or 0),
+            )
+            if not updated:
+                SearchHistoryDaily.objects.create(
+                    day=r["day"],
+                    path=r["path"],
+                    keyword=r["keyword"],
+                    total_count=r["total"] or 0,
+                    rows_folded=r["rows"] or 0,
+                    result_count_sum=r["results"] or 0,
+                )
+
+        deleted, _ = SearchHistory.objects.filter(id__in=ids).delete()
+    return deleted
+
+
+def _drain(qs, batch_size: int, dry_run: bool) -> int:
+    """วนพับ+ลบทีละ batch จน qs ว่าง (dry_run = นับอย่างเดียว)"""
+    if dry_run:
+        return qs.count()
+
+    total = 0
+    while True:
+        ids = list(qs.order_by("id").values_list("id", flat=True)[:batch_size])
+        if not ids:
+            break
+        total += _fold_and_delete(ids)
+    return total
+
+
+def _over_cap_cutoffs(keep_per_user: int) -> list[tuple]:
+    """
+    [(user_id, updated_at, id)] ของแถวสุดท้ายที่เก็บไว้ ต่อ user ที่มีเกิน keep_per_user
+    คำนวณครั้งเดียวก่อนเริ่มลบ (window เฉพาะ user ที่เกิน cap) ไม่ใช่ sort ทั้งตารางใหม่ทุก batch
+    ระหว่างลบมีการค้นซ้ำ -> updated_at ขยับขึ้นพ้น cutoff เอง แถวนั้นไม่ถูกลบ
+    """
+    heavy_users = (
+        SearchHistory.objects.values("user_id")
+        .annotate(n=Count("id"))
+        .filter(n__gt=keep_per_user)
+        .values("user_id")
+    )
+    return list(
+        SearchHistory.objects
+        .filter(user_id__in=heavy_users)
+        .annotate(rank=Window(
+            RowNumber(),
+            partition_by=[F("user_id")],
+            order_by=[F("updated_at").desc(), F("id").desc()],
+        ))
+        .filter(rank=keep_per_user)
+        .values_list("user_id", "updated_at", "id")
+    )
+
+
+def compact_history(
+    *,
+    keep_per_user: int = HISTORY_KEEP_PER_USER,
+    retention_days: int = HISTORY_RETENTION_DAYS,
+    batch_size: int = COMPACT_BATCH_SIZE,
+    dry_run: bool = False,
+) -> dict:
+    """
+    ลดขนาด SearchHistory:
+      1) แถวที่ไม่ได้ค้นซ้ำนานกว่า retention_days
+      2) แถวที่เกิน keep_per_user ของแต่ละ user (เก็บล่าสุดไว้)
+      3) rollup รายชั่วโมงที่เก่ากว่า ROLLUP_HOURLY_RETENTION_DAYS
+    ทุกแถวที่ลบจะถูกพับเข้า SearchHistoryDaily ก่อน และลบทีละ batch เพื่อไม่ล็อกตารางนาน
+    """
+    batch_size = max(int(batch_size or COMPACT_BATCH_SIZE), 1)
+    stats = {"expired": 0, "over_cap": 0, "rollup_pruned": 0}
+
+    if retention_days and retention_days > 0:
+        cutoff = timezone.now() - timedelta(days=retention_days)
+        expired = SearchHistory.objects.filter(updated_at__lt=cutoff)
+        stats["expired"] = _drain(expired, batch_size, dry_run)
+
+    if keep_per_user and keep_per_user > 0:
+        for user_id, updated_at, last_id in _over_cap_cutoffs(keep_per_user):
+            # แถวที่เก่ากว่าแถวสุดท้ายที่เก็บ (ตามลำดับ updated_at, id) -> range scan บน index (user, -updated_at)
+            older = SearchHistory.objects.filter(user_id=user_id).filter(
+                Q(updated_at__lt=updated_at) | Q(updated_at=updated_at, id__lt=last_id)
+            )
+            stats["over_cap"] += _drain(older, batch_size, dry_run)
+
+    old_hourly = SearchRollup.objects.filter(
+        period=SearchRollup.Period.HOUR,
+        bucket__lt=timezone.now() - timedelta(days=ROLLUP_HOURLY_RETENTION_DAYS),
+    )
+    if dry_run:
+        stats["rollup_pruned"] = old_hourly.count()
+    else:
+        while True:
+            ids = list(old_hourly.order_by("id").values_list("id", flat=True)[:batch_size])
+            if not ids:
+                break
+            deleted, _ = SearchRollup.objects.filter(id__in=ids).delete()
+            stats["rollup_pruned"] += deleted
+
+    return stats
+
+
+# ================== SAVED SEARCH ==================
+SEARCH_SCOPES = ("menus", "restaurants", "recipes", "community")
+
+# scope -> (model, field high-water mark ใน SavedSearch)
+# ข้อจำกัด: mark เป็น id สูงสุด ไม่ใช่เวลาที่แถวเริ่มมองเห็น -> หัวข้อ community ที่สร้างก่อน mark
+# แต่เพิ่งได้รับอนุมัติทีหลังจะไม่นับเป็น "ใหม่" (ยังหาเจอใน /search/ ปกติ)
+# scope อื่นไม่มีเงื่อนไขการมองเห็นใน scope_q จึงไม่โดน; ถ้าต้องการให้ครบต้องมี approved_at ใน Topic แล้วใช้เป็น mark แทน id
+SCOPE_SOURCES = {
+    "menus": (Menu, "last_menu_id"),
+    "restaurants": (Restaurant, "last_restaurant_id"),
+    "recipes": (Recipe, "last_recipe_id"),
+    "community": (Topic, "last_topic_id"),
+}
+SAVED_MARK_FIELDS = [field for _, field in SCOPE_SOURCES.values()]
+
+SAVED_BADGE_BATCH_SIZE = 200
+
+
+def scopes_for(scope: str) -> list[str]:
+    """all -> ทุก scope, scope เดี่ยว -> [scope], ไม่รู้จัก -> []"""
+    if scope == "all":
+        return list(SEARCH_SCOPES)
+    return [scope] if scope in SEARCH_SCOPES else []
+
+
+def scope_q(scope: str, q: str, *, staff: bool = False) -> Q:
+    """เงื่อนไขค้นหาของแต่ละ scope (ใช้ร่วมกันทั้ง /search/ และ saved search)"""
+    if scope == "menus":
+        return Q(name__icontains=q) | Q(restaurant_name__icontains=q)
+    if scope == "restaurants":
+        return Q(name__icontains=q)
+    if scope == "recipes":
+        return (
+            Q(title__icontains=q) |
+            Q(description__icontains=q) |
+            Q(ingredients__icontains=q) |
+            Q(steps__icontains=q)
+        )
+    if scope == "community":
+        cond = Q(title__icontains=q) | Q(description__icontains=q)
+        # คนทั่วไปเห็นเฉพาะ approved
+        if not staff:
+            cond &= Q(status="approved")
+        return cond
+    raise ValueError(f"unknown scope: {scope}")
+
+
+def search_querysets(q: str, scope: str, *, staff: bool = False) -> dict:
+    """{scope: queryset ที่ match คำค้น} (ยังไม่ order / slice)"""
+    return {
+        sc: SCOPE_SOURCES[sc][0].objects.filter(scope_q(sc, q, staff=staff))
+        for sc in scopes_for(scope)
+    }
+
+
+def current_marks() -> dict:
+    """{mark field: id สูงสุดตอนนี้} ของทุก scope"""
+    return {
+        field: model.objects.aggregate(m=Max("id"))["m"] or 0
+        for model, field in SCOPE_SOURCES.values()
+    }
+
+
+def saved_search_new_querysets(saved: SavedSearch, *, staff: bool = False) -> dict:
+    """เฉพาะแถวที่ id > high-water mark (index range scan บน PK)"""
+    return {
+        sc: qs.filter(id__gt=getattr(saved, SCOPE_SOURCES[sc][1]))
+        for sc, qs in search_querysets(saved.keyword, saved.scope, staff=staff).items()
+    }
+
+
+def saved_search_batch(saved: SavedSearch, limit: int, *, staff: bool = False) -> tuple[dict, dict, bool]:
+    """
+    รายการใหม่ชุดถัดไปของ saved search: ต่อ scope เอา limit แถวแรกที่ id > mark (เก่าสุดก่อน)
+    คืน ({scope: [แถว ใหม่สุดก่อน]}, marks ที่เลื่อนได้หลังผู้ใช้เห็นชุดนี้, ยังมีรายการค้างอีกไหม)
+    - scope ที่เห็นครบ -> mark = id สูงสุดตอนนี้ (อ่าน "ก่อน" query: ของที่เข้ามาระหว่างนี้โผล่ซ้ำรอบหน้า ไม่หลุดหาย)
+    - scope ที่เกิน limit -> mark = id สูงสุดที่แสดงจริง (ที่เหลือไปชุดถัดไป ไม่ถูกข้าม)
+    """
+    marks = current_marks()
+    rows_by_scope = {}
+    more = False
+    for sc, qs in saved_search_new_querysets(saved, staff=staff).items():
+        field = SCOPE_SOURCES[sc][1]
+        rows = list(qs.order_by("id")[:limit + 1])
+        if len(rows) > limit:
+            rows = rows[:limit]
+            marks[field] = rows[-1].id
+            more = True
+        elif rows:
+            marks[field] = max(marks[field], rows[-1].id)
+        rows.reverse()
+        rows_by_scope[sc] = rows
+    return rows_by_scope, marks, more
+
+
+def advance_saved_search(saved: SavedSearch, marks: dict | None = None, *, staff: bool = False):
+    """
+    เลื่อน mark หลังผู้ใช้เห็นผลลัพธ์แล้ว (ไม่ถอยหลัง และไม่เกิน id สูงสุดตอนนี้)
+    new_count = รายการที่ยังค้างอยู่หลังเลื่อน (staff ต้องตรงกับ saved_search_batch ไม่งั้น badge นับคนละชุดกับที่เห็น)
+    """
+    current = current_marks()
+    for field in SAVED_MARK_FIELDS:
+        value = current[field] if marks is None else min(int(marks.get(field) or 0), current[field])
+        setattr(saved, field, max(getattr(saved, field), value))
+    saved.new_count = sum(qs.count() for qs in saved_search_new_querysets(saved, staff=staff).values())
+    saved.last_run_at = timezone.now()
+    saved.save(update_fields=[*SAVED_MARK_FIELDS, "new_count", "last_run_at"])
+
+
+def refresh_saved_search_badges(*, batch_size: int = SAVED_BADGE_BATCH_SIZE) -> int:
+    """
+    คำนวณ new_count ของ saved search ทั้งหมด
+    - ต่อ batch: 1 query ต่อ scope (COUNT แบบมี filter หลายคอลัมน์ใน SELECT เดียว)
+      แทนการ query แยกทีละ user
+    คืนจำนวน saved search ที่อัปเดต
+    """
+    batch_size = max(int(batch_size or SAVED_BADGE_BATCH_SIZE), 1)
+    updated = 0
+    last_id = 0
+
+    while True:
+        batch = list(
+            SavedSearch.objects
+            .filter(id__gt=last_id)
+            .order_by("id")
+            .select_related("user")
+            .only("id", "keyword", "scope", *SAVED_MARK_FIELDS, "user__is_staff")[:batch_size]
+        )
+        if not batch:
+            break
+        last_id = batch[-1].id
+
+        counts = {ss.id: 0 for ss in batch}
+        for sc in SEARCH_SCOPES:
+            model, field = SCOPE_SOURCES[sc]
+
+            # saved search ที่ keyword + mark (+ สิทธิ์ staff) เหมือนกัน ใช้ COUNT ตัวเดียวกัน
+            aliases = {}
+            owners = {}
+            for ss in batch:
+                if sc not in scopes_for(ss.scope):
+                    continue
+                key = (ss.keyword, getattr(ss, field), ss.user.is_staff)
+                if key not in aliases:
+                    aliases[key] = f"c{len(aliases)}"
+                owners.setdefault(aliases[key], []).append(ss.id)
+
+            if not aliases:
+                continue
+
+            result = model.objects.aggregate(**{
+                alias: Count("id", filter=scope_q(sc, kw, staff=staff) & Q(id__gt=mark))
+                for (kw, mark, staff), alias in aliases.items()
+            })
+            for alias, ids in owners.items():
+                for ss_id in ids:
+                    counts[ss_id] += result[alias] or 0
+
+        now = timezone.now()
+        for ss in batch:
+            ss.new_count = counts[ss.id]
+            ss.badge_refreshed_at = now
+        SavedSearch.objects.bulk_update(batch, ["new_count", "badge_refreshed_at"])
+        updated += len(batch)
+
+    return updated
@@ -1,3 +1,163 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from community.models import Topic
+from menus.models import Menu
+from .models import SavedSearch, SearchHistory, SearchHistoryDaily, SearchRollup
+from .services import compact_history, current_marks, log_search, record_rollup, refresh_saved_search_badges
+from .views import RESULT_LIMIT
+
+
+class SavedSearchRunTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(username="diner")
+        self.client.force_login(self.user)
+        self.saved = SavedSearch.objects.create(user=self.user, keyword="กะเพรา", scope="menus", **current_marks())
+
+    def seed(self, n):
+        return [Menu.objects.create(name=f"กะเพราหมู {i}", price=50).id for i in range(n)]
+
+    def run_saved(self):
+        return self.client.get(reverse("searches:saved_run", args=[self.saved.pk]))
+
+    def mark_seen(self, response):
+        return self.client.post(reverse("searches:saved_seen", args=[self.saved.pk]), response.context["seen_marks"])
+
+    def test_get_does_not_advance(self):
+        self.seed(3)
+        self.run_saved()
+        response = self.run_saved()
+        self.assertEqual(len(response.context["menus"]), 3)
+
+    def test_more_than_limit_is_not_skipped(self):
+        ids = self.seed(RESULT_LIMIT + 5)
+        response = self.run_saved()
+        self.assertTrue(response.context["has_more"])
+        self.assertEqual([m.id for m in response.context["menus"]], ids[:RESULT_LIMIT][::-1])
+
+        self.assertRedirects(self.mark_seen(response), reverse("searches:saved_run", args=[self.saved.pk]))
+        self.saved.refresh_from_db()
+        self.assertEqual(self.saved.last_menu_id, ids[RESULT_LIMIT - 1])
+        self.assertEqual(self.saved.new_count, 5)
+
+        response = self.run_saved()
+        self.assertFalse(response.context["has_more"])
+        self.assertEqual([m.id for m in response.context["menus"]], ids[RESULT_LIMIT:][::-1])
+        self.assertRedirects(self.mark_seen(response), reverse("searches:saved_list"))
+
+    def test_seen_mark_cannot_go_backwards(self):
+        ids = self.seed(2)
+        self.mark_seen(self.run_saved())
+        self.client.post(reverse("searches:saved_seen", args=[self.saved.pk]), {"last_menu_id": 0})
+        self.saved.refresh_from_db()
+        self.assertEqual(self.saved.last_menu_id, ids[-1])
+
+
+class StaffSavedSearchTests(TestCase):
+
+    def setUp(self):
+        self.staff = User.objects.create(username="mod", is_staff=True)
+        self.client.force_login(self.staff)
+        self.saved = SavedSearch.objects.create(user=self.staff, keyword="ก๋วยเตี๋ยว", scope="community", **current_marks())
+
+    def topics(self, n, status="pending"):
+        for i in range(n):
+            Topic.objects.create(title=f"ก๋วยเตี๋ยวเรือ {i}", created_by=self.staff, status=status)
+
+    def test_seen_counts_what_staff_sees(self):
+        # staff เห็นหัวข้อที่รออนุมัติด้วย -> new_count หลังเลื่อน mark ต้องนับแบบเดียวกัน
+        self.topics(RESULT_LIMIT + 2)
+        response = self.client.get(reverse("searches:saved_run", args=[self.saved.pk]))
+        self.assertTrue(response.context["has_more"])
+        response = self.client.post(reverse("searches:saved_seen", args=[self.saved.pk]), response.context["seen_marks"])
+        self.assertRedirects(response, reverse("searches:saved_run", args=[self.saved.pk]))
+        self.saved.refresh_from_db()
+        self.assertEqual(self.saved.new_count, 2)
+
+    def test_badges_follow_owner_visibility(self):
+        user = User.objects.create(username="diner")
+        other = SavedSearch.objects.create(user=user, keyword="ก๋วยเตี๋ยว", scope="community", **current_marks())
+        self.topics(3)
+        self.topics(1, status="approved")
+        self.assertEqual(refresh_saved_search_badges(), 2)
+        counts = dict(SavedSearch.objects.values_list("pk", "new_count"))
+        self.assertEqual((counts[self.saved.pk], counts[other.pk]), (4, 1))
+
+
+class LogSearchTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(username="searcher")
+
+    def log(self, filters, result_count):
+        log_search(user=self.user, path="/menus/", keyword=" ข้าวผัด ", filters=filters, result_count=result_count)
+
+    def test_repeat_search_bumps_one_row(self):
+        self.log({"max_price": "60", "diet": "vegan"}, 3)
+        first = SearchHistory.objects.get()
+        # ย้อนเวลาแถวแรก -> เห็นชัดว่าค้นซ้ำแล้ว updated_at ขยับจริง
+        SearchHistory.objects.filter(pk=first.pk).update(updated_at=first.updated_at - timedelta(hours=1))
+
+        self.log({"diet": "vegan", "max_price": "60"}, 5)  # ลำดับ filter ต่างกันแต่เป็นการค้นเดียวกัน
+        row = SearchHistory.objects.get()
+        self.assertEqual((row.pk, row.count, row.result_count), (first.pk, 2, 5))
+        self.assertGreater(row.updated_at, first.updated_at - timedelta(hours=1))
+        self.assertEqual(row.created_at, first.created_at)
+
+    def test_different_filters_are_separate_rows(self):
+        self.log({"max_price": "60"}, 3)
+        self.log({"max_price": "80"}, 3)
+        self.assertEqual(sorted(SearchHistory.objects.values_list("count", flat=True)), [1, 1])
+
+
+class CompactHistoryTests(TestCase):
+
+    def seed(self, user, n):
+        now = timezone.now()
+        for i in range(n):
+            row = SearchHistory.objects.create(user=user, path="/menus/", keyword=f"คำค้น {i}", fingerprint=f"fp{i}")
+            # i มาก = ค้นล่าสุด (updated_at เป็น auto_now -> ตั้งผ่าน update)
+            SearchHistory.objects.filter(pk=row.pk).update(updated_at=now - timedelta(minutes=n - i))
+
+    def test_keeps_latest_per_user(self):
+        heavy = User.objects.create(username="heavy")
+        light = User.objects.create(username="light")
+        self.seed(heavy, 7)
+        self.seed(light, 2)
+
+        stats = compact_history(keep_per_user=3, retention_days=0, batch_size=2)
+
+        self.assertEqual(stats["over_cap"], 4)
+        kept = SearchHistory.objects.filter(user=heavy).values_list("keyword", flat=True)
+        self.assertEqual(sorted(kept), ["คำค้น 4", "คำค้น 5", "คำค้น 6"])
+        self.assertEqual(SearchHistory.objects.filter(user=light).count(), 2)
+        self.assertEqual(sum(SearchHistoryDaily.objects.values_list("rows_folded", flat=True)), 4)
+
+    def test_dry_run_counts_only(self):
+        user = User.objects.create(username="heavy")
+        self.seed(user, 5)
+        stats = compact_history(keep_per_user=2, retention_days=0, dry_run=True)
+        self.assertEqual(stats["over_cap"], 3)
+        self.assertEqual(SearchHistory.objects.count(), 5)
+
+
+class SearchRollupTests(TestCase):
+
+    def test_anonymous_search_is_counted(self):
+        self.client.get(reverse("menus:menu_list"), {"q": "ข้าวผัด"})
+        self.assertFalse(SearchHistory.objects.exists())
+        rollup = dict(SearchRollup.objects.values_list("period", "searches"))
+        self.assertEqual(rollup, {SearchRollup.Period.HOUR: 1, SearchRollup.Period.DAY: 1})
 
-# Create your tests here.
+    def test_hour_and_day_in_one_upsert(self):
+        with self.assertNumQueries(1):
+            record_rollup(scope="menus", keyword="ข้าวผัด", result_count=0)
+        with self.assertNumQueries(1):
+            record_rollup(scope="menus", keyword="  ข้าวผัด ", result_count=3)
+        rows = SearchRollup.objects.values_list("period", "searches", "zero_results")
+        self.assertEqual(sorted(rows), [(SearchRollup.Period.DAY, 2, 1), (SearchRollup.Period.HOUR, 2, 1)])
@@ -9,4 +9,16 @@ urlpatterns = [
     path("history/<int:pk>/delete/", views.history_delete, name="history_delete"),
     path("history/clear/", views.history_clear, name="history_clear"),
     path("history/<int:pk>/rerun/", views.history_rerun, name="history_rerun"),
+
+    # saved search
+    path("saved/", views.saved_search_list, name="saved_list"),
+    path("saved/add/", views.saved_search_create, name="saved_create"),
+    path("saved/<int:pk>/run/", views.saved_search_run, name="saved_run"),
+    path("saved/<int:pk>/seen/", views.saved_search_seen, name="saved_seen"),
+    path("saved/<int:pk>/badge/", views.saved_search_badge, name="saved_badge"),
+    path("saved/<int:pk>/delete/", views.saved_search_delete, name="saved_delete"),
+
+    # สถิติการค้น (staff)
+    path("search/analytics/", views.analytics_dashboard, name="analytics"),
+    path("search/analytics.json", views.analytics_json, name="analytics_json"),
 ]
@@ -3,15 +3,25 @@ import json
 from urllib.parse import urlencode
 
 from django.contrib.auth.decorators import login_required
-from django.db.models import Q
+from django.contrib.admin.views.decorators import staff_member_required
 from django.shortcuts import render, redirect, get_object_or_404
-from django.http import HttpResponseForbidden
+from django.http import HttpResponseForbidden, JsonResponse
 from django.utils import timezone
 
-from menus.models import Menu, Restaurant
-from recipes.models import Recipe
-from community.models import Topic
-from .models import SearchHistory
+from .models import SavedSearch, SearchHistory
+from .services import (
+    HISTORY_KEEP_PER_USER,
+    SAVED_MARK_FIELDS,
+    advance_saved_search,
+    current_marks,
+    log_search,
+    saved_search_batch,
+    saved_search_new_querysets,
+    search_querysets,
+    scopes_for,
+    top_searches,
+    trending_keywords,
+)
 
 
 def _to_display_value(v) -> str:
@@ -25,6 +35,25 @@ def _to_display_value(v) -> str:
     return str(v).strip()
 
 
+# scope -> (key ใน template, ordering)
+RESULT_ORDERING = {
+    "menus": ("menus", "-id"),
+    "restaurants": ("restaurants", "-id"),
+    "recipes": ("recipes", "-created_at"),
+    "community": ("topics", "-created_at"),
+}
+RESULT_LIMIT = 40
+
+
+def _ordered_results(querysets: dict) -> dict:
+    """เรียง + ตัดผลลัพธ์แต่ละ scope เป็น list (scope ที่ไม่ได้ค้น = list ว่าง)"""
+    results = {key: [] for key, _ in RESULT_ORDERING.values()}
+    for sc, qs in querysets.items():
+        key, order = RESULT_ORDERING[sc]
+        results[key] = list(qs.order_by(order)[:RESULT_LIMIT])
+    return results
+
+
 @login_required
 def search(request):
     """
@@ -33,85 +62,26 @@ def search(request):
     q = (request.GET.get("q") or "").strip()
     scope = (request.GET.get("scope") or "all").strip()
 
-    # --- base result sets ---
-    menus = Menu.objects.none()
-    restaurants = Restaurant.objects.none()
-    recipes = Recipe.objects.none()
-    topics = Topic.objects.none()
-
-    if q:
-        if scope in ("all", "menus"):
-            # ปรับ field ให้ตรงกับ Menu ของคุณ (เดิมคุณใช้ name/restaurant_name/price)
-            menus = Menu.objects.filter(
-                Q(name__icontains=q) |
-                Q(restaurant_name__icontains=q)
-            ).order_by("-id")[:40]
-
-        if scope in ("all", "restaurants"):
-            # ปรับ field ให้ตรงกับ Restaurant ของคุณ (สมมติ name)
-            restaurants = Restaurant.objects.filter(
-                Q(name__icontains=q)
-            ).order_by("-id")[:40]
-
-        if scope in ("all", "recipes"):
-            recipes = Recipe.objects.filter(
-                Q(title__icontains=q) |
-                Q(description__icontains=q) |
-                Q(ingredients__icontains=q) |
-                Q(steps__icontains=q)
-            ).order_by("-created_at")[:40]
-
-        if scope in ("all", "community"):
-            # ✅ FIX HERE: Topic ไม่มี content -> ใช้ title/description แทน
-            # และคุมสิทธิ์: คนทั่วไปเห็นเฉพาะ approved (ถ้าโปรเจกต์ใช้ status แบบนี้)
-            base_topics = Topic.objects.all()
-            if not request.user.is_staff:
-                # ถ้าโปรเจกต์คุณใช้ชื่อสถานะอื่น ให้เปลี่ยน 'approved' ให้ตรง
-                base_topics = base_topics.filter(status="approved")
-
-            topics = base_topics.filter(
-                Q(title__icontains=q) |
-                Q(description__icontains=q)
-            ).order_by("-created_at")[:40]
-
-    # --- save history (กันพังด้วยการใช้ fields ที่ "มีจริง" ตามที่คุณใช้ก่อนหน้า) ---
-    # ถ้าโมเดลคุณใช้ keyword/filters_json/path/result_count ให้แก้ด้านล่างให้ตรง
-    filters_json = {"scope": scope}
-    result_count = int(menus.count() + restaurants.count() + recipes.count() + topics.count())
-
-    # รองรับได้ 2 แบบ: SearchHistory มี field query หรือ keyword
-    create_kwargs = {
-        "user": request.user,
-        "path": request.path,
-        "filters_json": filters_json,
-        "result_count": result_count,
-    }
+    # --- result sets ---
+    results = _ordered_results(search_querysets(q, scope, staff=request.user.is_staff) if q else {})
+    menus = results["menus"]
+    restaurants = results["restaurants"]
+    recipes = results["recipes"]
+    topics = results["topics"]
 
-    # ใส่คำค้นให้ถูก field
-    if hasattr(SearchHistory, "query"):
-        create_kwargs["query"] = q
-    elif hasattr(SearchHistory, "keyword"):
-        create_kwargs["keyword"] = q
+    # --- save history ---
+    filters_json = {"scope": scope}
+    result_count = len(menus) + len(restaurants) + len(recipes) + len(topics)
 
-    # อัปเดตถ้ามี record เดิม “คำค้น+scope เดิม” เพื่อให้ updated_at ขยับ (UX ดี)
+    # upsert คำสั่งเดียว: ค้นซ้ำ "คำค้น+scope เดิม" -> count++ และ updated_at ขยับ (UX ดี)
     try:
-        # พยายาม match ตาม field ที่มีจริง
-        lookup = {"user": request.user, "path": request.path}
-        if "query" in create_kwargs:
-            lookup["query"] = q
-        if "keyword" in create_kwargs:
-            lookup["keyword"] = q
-        lookup["filters_json"] = filters_json
-
-        obj = SearchHistory.objects.filter(**lookup).first()
-        if obj:
-            obj.result_count = result_count
-            obj.filters_json = filters_json
-            obj.path = request.path
-            obj.updated_at = timezone.now()
-            obj.save(update_fields=["result_count", "filters_json", "path", "updated_at"])
-        else:
-            SearchHistory.objects.create(**create_kwargs)
+        log_search(
+            user=request.user,
+            path=request.path,
+            keyword=q,
+            filters=filters_json,
+            result_count=result_count,
+        )
     except Exception:
         # history พังไม่ควรทำให้ search พัง
         pass
@@ -124,12 +94,13 @@ def search(request):
         "recipes": recipes,
         "topics": topics,
         "total": result_count,
+        "is_saved": bool(q) and SavedSearch.objects.filter(user=request.user, keyword=q, scope=scope).exists(),
     })
 
 
 @login_required
 def history_list(request):
-    qs = SearchHistory.objects.filter(user=request.user).order_by("-updated_at", "-created_at")[:200]
+    qs = SearchHistory.objects.filter(user=request.user).order_by("-updated_at", "-created_at")[:HISTORY_KEEP_PER_USER]
 
     items = []
     for it in qs:
@@ -207,3 +178,140 @@ def history_rerun(request, pk):
     query = urlencode(params, doseq=True)
     url = f"{base_path}?{query}" if query else base_path
     return redirect(url)
+
+
+# ================== ANALYTICS (staff) ==================
+def _analytics_params(request):
+    try:
+        days = int(request.GET.get("days") or 7)
+    except (TypeError, ValueError):
+        days = 7
+    try:
+        limit = int(request.GET.get("limit") or 20)
+    except (TypeError, ValueError):
+        limit = 20
+    days = min(max(days, 1), 365)
+    limit = min(max(limit, 1), 100)
+    scope = (request.GET.get("scope") or "").strip()
+    return days, limit, scope
+
+
+@staff_member_required
+def analytics_dashboard(request):
+    days, limit, scope = _analytics_params(request)
+    return render(request, "searches/analytics.html", {
+        "days": days,
+        "limit": limit,
+        "scope": scope,
+        "popular": top_searches(days=days, scope=scope, limit=limit),
+        "zero_results": top_searches(days=days, scope=scope, limit=limit, zero_only=True),
+        "trending": trending_keywords(),
+    })
+
+
+@staff_member_required
+def analytics_json(request):
+    days, limit, scope = _analytics_params(request)
+    return JsonResponse({
+        "days": days,
+        "scope": scope,
+        "popular": top_searches(days=days, scope=scope, limit=limit),
+        "zero_results": top_searches(days=days, scope=scope, limit=limit, zero_only=True),
+        "trending": trending_keywords(limit=limit),
+    }, json_dumps_params={"ensure_ascii": False})
+
+
+# ================== SAVED SEARCH ==================
+@login_required
+def saved_search_list(request):
+    items = SavedSearch.objects.filter(user=request.user).order_by("-created_at")
+    return render(request, "searches/saved_list.html", {"items": items})
+
+
+@login_required
+def saved_search_create(request):
+    if request.method != "POST":
+        return redirect("searches:saved_list")
+
+    q = (request.POST.get("q") or "").strip()[:255]
+    scope = (request.POST.get("scope") or "all").strip()
+    if not q or not scopes_for(scope):
+        return redirect("searches:saved_list")
+
+    # mark เริ่มต้น = ปัจจุบัน -> badge นับเฉพาะของที่เพิ่มหลังบันทึก
+    SavedSearch.objects.get_or_create(
+        user=request.user,
+        keyword=q,
+        scope=scope,
+        defaults={**current_marks(), "last_run_at": timezone.now()},
+    )
+    return redirect("searches:saved_list")
+
+
+@login_required
+def saved_search_delete(request, pk):
+    item = get_object_or_404(SavedSearch, pk=pk, user=request.user)
+    if request.method == "POST":
+        item.delete()
+    return redirect("searches:saved_list")
+
+
+@login_required
+def saved_search_run(request, pk):
+    """
+    ค้นซ้ำแบบ incremental: แสดงเฉพาะรายการที่ใหม่กว่า high-water mark (ทีละ RESULT_LIMIT ต่อ scope)
+    GET ไม่เปลี่ยนอะไร -> mark เลื่อนตอนกด "เห็นแล้ว" (POST saved_seen) ไปถึงเฉพาะรายการที่แสดงจริง
+    """
+    saved = get_object_or_404(SavedSearch, pk=pk, user=request.user)
+    rows_by_scope, marks, more = saved_search_batch(saved, RESULT_LIMIT, staff=request.user.is_staff)
+
+    results = {key: [] for key, _ in RESULT_ORDERING.values()}
+    for sc, rows in rows_by_scope.items():
+        results[RESULT_ORDERING[sc][0]] = rows
+
+    return render(request, "searches/search_results.html", {
+        "q": saved.keyword,
+        "scope": saved.scope,
+        **results,
+        "total": sum(len(v) for v in results.values()),
+        "saved": saved,
+        "seen_marks": marks,
+        "has_more": more,
+        "is_saved": True,
+    })
+
+
+@login_required
+def saved_search_seen(request, pk):
+    """เลื่อน mark ไปถึงรายการที่ผู้ใช้เห็นในหน้า saved_run (ค่า mark ส่งมากับฟอร์ม)"""
+    saved = get_object_or_404(SavedSearch, pk=pk, user=request.user)
+    if request.method != "POST":
+        return redirect("searches:saved_run", pk=saved.pk)
+
+    marks = {}
+    for field in SAVED_MARK_FIELDS:
+        try:
+            marks[field] = int(request.POST.get(field) or 0)
+        except ValueError:
+            marks[field] = 0
+    advance_saved_search(saved, marks, staff=request.user.is_staff)
+
+    # ยังมีรายการค้าง -> ไปชุดถัดไป
+    if saved.new_count:
+        return redirect("searches:saved_run", pk=saved.pk)
+    return redirect("searches:saved_list")
+
+
+@login_required
+def saved_search_badge(request, pk):
+    """จำนวนรายการใหม่ตั้งแต่รันครั้งล่าสุด (COUNT ช่วง id > mark ต่อ scope)"""
+    saved = get_object_or_404(SavedSearch, pk=pk, user=request.user)
+    per_scope = {
+        sc: qs.count()
+        for sc, qs in saved_search_new_querysets(saved, staff=request.user.is_staff).items()
+    }
+    return JsonResponse({
+        "id": saved.id,
+        "new": sum(per_scope.values()),
+        "per_scope": per_scope,
+    })